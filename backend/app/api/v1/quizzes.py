@@ -9,10 +9,14 @@ from app.models.permission import StudentPermission
 from app.services.student_service import get_student, update_student_difficulty, get_student_by_email, update_student_state
 from app.services.rl_service import RLService
 from app.services.reward_service import compute_reward
+from app.services.question_bank import get_chapter_questions, get_chapter_topics, resolve_question_topics
+from app.services.sync_service import enqueue_sync, outbox_flusher
+from rl_model.config.env_config import EnvConfig
 import random
 import json
 import time
 import re
+import uuid
 from collections import defaultdict
 
 router = APIRouter()
@@ -154,27 +158,18 @@ def get_questions(
     db: Session = Depends(get_db)
 ):
     """
-    Fetch questions from Supabase (learning_content).
+    Fetch questions from the learning_content question bank (cached from Supabase).
     """
     # If Chapter is requested but Topic is NOT (Full Chapter Test)
     if chapter and not topic:
         # User requirement: questions for every chapter should come from common_test_question table
         db_chapter = get_db_chapter(chapter)
         try:
-            res_ct = supabase.table("common_test_questions").select("*").eq("chapter", db_chapter).execute()
-            if res_ct.data:
-                print(f"DEBUG: Found {len(res_ct.data)} questions in common_test_questions for {chapter}")
-                data = res_ct.data
+            data = get_chapter_questions("common_test_questions", db_chapter)
+            if data:
+                print(f"DEBUG: Found {len(data)} questions in common_test_questions for {chapter}")
                 if len(data) > limit:
                     data = random.sample(data, limit)
-                # Parse JSON if needed
-                import json as json_lib
-                for item in data:
-                    if 'data' in item and isinstance(item['data'], str):
-                        try:
-                            item['data'] = json_lib.loads(item['data'])
-                        except:
-                            pass
                 return data
         except Exception as e:
             print(f"Error fetching from common_test_questions in adaptive path: {e}")
@@ -183,13 +178,19 @@ def get_questions(
         # Map UI chapter name to database chapter name if needed
         db_chapter = CHAPTER_NAME_MAP.get(chapter, chapter)
         
-        # Fetch Subtopics accurately from DB (learning_content)
-        subtopics = []
+        # One projected fetch for the whole chapter (served from the question bank when warm)
+        chapter_rows = []
         try:
-            res = supabase.table("learning_content").select("topic").eq("chapter", db_chapter).execute()
-            subtopics = list(set([item['topic'] for item in res.data if item.get('topic')]))
+            chapter_rows = get_chapter_questions("learning_content", db_chapter)
         except Exception as e:
-            print(f"Error fetching dynamic subtopics: {e}")
+            print(f"Error fetching chapter questions: {e}")
+
+        # Group in memory by (topic, difficulty)
+        grouped = defaultdict(list)
+        for row in chapter_rows:
+            grouped[(row.get("topic"), row.get("difficulty"))].append(row)
+
+        subtopics = sorted(set(t for t, _ in grouped if t))
             
         # Fallback to static if DB fails
         if not subtopics and chapter in SUBTOPICS:
@@ -198,18 +199,21 @@ def get_questions(
         if subtopics:
             aggregated_data = []
             q_per_topic = max(1, limit // len(subtopics))
+
+            # Single mastery query for all of the student's subtopics in this chapter
+            mastery_by_subtopic = {
+                m.subtopic: m for m in db.query(SubtopicMastery).filter(
+                    SubtopicMastery.student_id == student_id,
+                    SubtopicMastery.chapter == chapter,
+                    SubtopicMastery.subtopic.in_(subtopics)
+                ).all()
+            }
             
             for sub in subtopics:
                 # Determine adaptive difficulty per subtopic
                 sub_diff = "easy"
                 
-                # Check DB for mastery
-                m_record = db.query(SubtopicMastery).filter(
-                    SubtopicMastery.student_id == student_id,
-                    SubtopicMastery.chapter == chapter,
-                    SubtopicMastery.subtopic == sub
-                ).first()
-                
+                m_record = mastery_by_subtopic.get(sub)
                 if m_record:
                     if m_record.accuracy > 0.8: sub_diff = "hard"
                     elif m_record.accuracy > 0.5: sub_diff = "medium"
@@ -219,16 +223,7 @@ def get_questions(
                 if difficulty:
                     sub_diff = difficulty.lower()
 
-                # Fetch specific to this subtopic
-                q = supabase.table("learning_content") \
-                    .select("*") \
-                    .eq("chapter", db_chapter) \
-                    .eq("topic", sub) \
-                    .eq("difficulty", sub_diff) \
-                    .limit(q_per_topic * 2) \
-                    .execute()
-                
-                subset = q.data
+                subset = grouped.get((sub, sub_diff), [])[:q_per_topic * 2]
                 if len(subset) > q_per_topic:
                      subset = random.sample(subset, q_per_topic)
                 aggregated_data.extend(subset)
@@ -236,13 +231,13 @@ def get_questions(
             # If we STILL need more questions (maybe subtopics didn't have enough)
             if len(aggregated_data) < limit:
                 needed = limit - len(aggregated_data)
-                q_extra = supabase.table("learning_content") \
-                    .select("*") \
-                    .eq("chapter", db_chapter) \
-                    .eq("difficulty", difficulty.lower() if difficulty else "medium") \
-                    .limit(needed) \
-                    .execute()
-                aggregated_data.extend(q_extra.data)
+                extra_diff = difficulty.lower() if difficulty else "medium"
+                picked = set(item.get("id") for item in aggregated_data)
+                q_extra = [
+                    row for row in chapter_rows
+                    if row.get("difficulty") == extra_diff and row.get("id") not in picked
+                ]
+                aggregated_data.extend(q_extra[:needed])
 
             random.shuffle(aggregated_data)
             if len(aggregated_data) > limit:
@@ -269,18 +264,25 @@ def get_questions(
                 diff_map = {0: "easy", 1: "medium", 2: "hard"}
                 difficulty = diff_map.get(student.current_difficulty, "medium")
     
-    query = supabase.table("learning_content").select("*")
-    if difficulty:
-        query = query.eq("difficulty", difficulty.lower())
-    if subject:
-        query = query.eq("subject", subject)
     if chapter:
-        query = query.eq("chapter", get_db_chapter(chapter))
-    if topic:
-        query = query.eq("topic", topic)
+        # Served from the process-local question bank
+        data = get_chapter_questions(
+            "learning_content", get_db_chapter(chapter), topic, difficulty.lower() if difficulty else None
+        )
+        if subject:
+            data = [item for item in data if item.get("subject") == subject]
+        data = data[:100]
+    else:
+        query = supabase.table("learning_content").select("*")
+        if difficulty:
+            query = query.eq("difficulty", difficulty.lower())
+        if subject:
+            query = query.eq("subject", subject)
+        if topic:
+            query = query.eq("topic", topic)
 
-    response = query.limit(100).execute()
-    data = response.data
+        response = query.limit(100).execute()
+        data = response.data
     
     if len(data) > limit:
         data = random.sample(data, limit)
@@ -302,29 +304,13 @@ def get_common_test_questions(
         # Map UI chapter name to database chapter name if needed
         db_chapter = get_db_chapter(chapter)
         
-        query = supabase.table("common_test_questions") \
-            .select("*") \
-            .eq("chapter", db_chapter)
+        # Question bank rows are already ordered by ID, so every student gets the same order
+        data = get_chapter_questions("common_test_questions", db_chapter)
             
         if subject:
-            query = query.eq("subject", subject)
-            
-        # Order by ID to ensure fixed order for every student
-        response = query.order("id").limit(limit).execute()
-        
-        if not response.data:
-            return []
+            data = [item for item in data if item.get("subject") == subject]
         
-        # Ensure 'data' field is properly parsed (JSONB might come as string)
-        import json as json_lib
-        for item in response.data:
-            if 'data' in item and isinstance(item['data'], str):
-                try:
-                    item['data'] = json_lib.loads(item['data'])
-                except:
-                    pass
-        
-        return response.data
+        return data[:limit]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -440,24 +426,15 @@ def get_topics(subject: str, chapter: str):
         # Use mapping for DB compatibility if needed, but try direct first
         db_chapter = CHAPTER_NAME_MAP.get(chapter, chapter)
         
-        # Query learning_content table for unique topics
-        response = supabase.table("learning_content") \
-            .select("topic") \
-            .eq("subject", subject) \
-            .eq("chapter", db_chapter) \
-            .execute()
+        # Unique topics from the learning_content question bank
+        topics = get_chapter_topics(db_chapter, subject)
         
-        if not response.data:
+        if not topics:
              # Try without mapping if it failed
              if db_chapter != chapter:
                  print(f"DEBUG: Retrying topic fetch with original name: {chapter}")
-                 response = supabase.table("learning_content") \
-                    .select("topic") \
-                    .eq("subject", subject) \
-                    .eq("chapter", chapter) \
-                    .execute()
+                 topics = get_chapter_topics(chapter, subject)
 
-        topics = sorted(list(set([item['topic'] for item in response.data if item.get('topic')])))
         print(f"DEBUG: Found {len(topics)} topics.")
         return topics
     except Exception as e:
@@ -495,17 +472,18 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
     - Bad (< 70%) -> Previous Topic (Easy)
     - If Hard Passed -> Next Subtopic (Easy)
     """
+    # Everything below runs as one unit of work: services only flush, one commit at the end.
     # 1. Resolve Student (by ID or Email)
     student = None
     if submission.email:
         student = get_student_by_email(db, submission.email)
     
     if not student:
-        student = get_student(db, submission.student_id)
+        student = get_student(db, submission.student_id, commit=False)
         
     if not student:
         from app.services.student_service import create_student
-        student = create_student(db, submission.student_id, submission.email or f"{submission.student_id}@example.com", 9)
+        student = create_student(db, submission.student_id, submission.email or f"{submission.student_id}@example.com", 9, commit=False)
 
     # 2. Calculate Accuracy & Reward
     # 2. Calculate Accuracy & Reward
@@ -524,7 +502,7 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
 
     # Reward Logic using Service (Clipped)
     perf_data = {
-        "correct": accuracy >= 0.7, 
+        "correct": accuracy >= EnvConfig.CORRECT_ACCURACY_THRESHOLD, 
         "accuracy": accuracy,
         "avg_time": avg_time_per_q,
         "failure_streak": 0
@@ -555,25 +533,25 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
     # 3. Topic-wise Performance Analysis (for Common Tests or multi-topic quizzes)
     topic_performance = defaultdict(lambda: {"correct": 0, "total": 0})
     if submission.answers:
+        # Resolve topics not provided in the answers (required for common test) in one batch
+        unresolved_ids = [
+            ans.get("question_id") for ans in submission.answers
+            if not ans.get("topic") and ans.get("question_id")
+        ]
+        resolved_topics = {}
+        if unresolved_ids:
+            try:
+                resolved_topics = resolve_question_topics(unresolved_ids)
+            except Exception as e:
+                print(f"Topic resolution failed: {e}")
+
         for ans in submission.answers:
             q_id = ans.get("question_id")
             is_correct = ans.get("is_correct")
             
-            # Fetch topic info from Supabase if not provided in answer (required for common test)
             q_topic = ans.get("topic")
             if not q_topic and q_id:
-                try:
-                    # Check common_test_questions first
-                    q_res = supabase.table("common_test_questions").select("topic").eq("id", q_id).execute()
-                    if q_res.data:
-                        q_topic = q_res.data[0].get("topic")
-                    else:
-                        # Fallback to learning_content
-                        q_res = supabase.table("learning_content").select("topic").eq("id", q_id).execute()
-                        if q_res.data:
-                            q_topic = q_res.data[0].get("topic")
-                except:
-                    pass
+                q_topic = resolved_topics.get(str(q_id))
             
             if q_topic:
                 print(f"DEBUG: Resolved Question {q_id} to Topic: '{q_topic}'")
@@ -584,6 +562,9 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
 
     # Identify Fallback Topics & Initialize Mastery
     is_common_test = not submission.subtopic or submission.subtopic == ""
+
+    # Mastery rows touched by this submission; only these are synced to Supabase
+    dirty_mastery = {}  # (chapter, subtopic) -> SubtopicMastery
     
     if is_common_test:
         # Fetch ALL subtopics for this chapter from learning_content to track them
@@ -595,24 +576,29 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
             if not all_chapter_subtopics:
                 # Fallback to DB fetch
                  try:
-                    res = supabase.table("learning_content").select("topic").eq("chapter", db_chapter).execute()
-                    all_chapter_subtopics = list(set([item['topic'] for item in res.data if item.get('topic')]))
+                    all_chapter_subtopics = get_chapter_topics(db_chapter)
                  except:
                     pass
 
-            for sub in all_chapter_subtopics:
-                # ONLY update or initialize if the subtopic was actually part of this test
-                if topic_performance[sub]["total"] == 0:
-                    continue
-                    
+            # ONLY update or initialize subtopics that were actually part of this test
+            tested_subtopics = [sub for sub in all_chapter_subtopics if topic_performance[sub]["total"] > 0]
+
+            # One query for all existing mastery records of the tested subtopics
+            existing_mastery = {
+                m.subtopic: m for m in db.query(SubtopicMastery).filter(
+                    SubtopicMastery.student_id == student.id,
+                    SubtopicMastery.chapter == submission.chapter,
+                    SubtopicMastery.subtopic.in_(tested_subtopics)
+                ).all()
+            } if tested_subtopics else {}
+
+            # Pass 1: update accuracy and build the RL state of every tested subtopic
+            sub_records, sub_accuracies, sub_states = [], [], []
+            for sub in tested_subtopics:
                 sub_acc = topic_performance[sub]["correct"] / topic_performance[sub]["total"]
                 print(f"DEBUG: Updating mastery for {sub} with acc {sub_acc}")
                 
-                m_record = db.query(SubtopicMastery).filter(
-                    SubtopicMastery.student_id == student.id,
-                    SubtopicMastery.chapter == submission.chapter,
-                    SubtopicMastery.subtopic == sub
-                ).first()
+                m_record = existing_mastery.get(sub)
                 
                 if not m_record:
                     m_record = SubtopicMastery(
@@ -641,12 +627,24 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                 }
                 
                 print(f"DEBUG: RL State for {sub}: {subtopic_state}")
-                
+                sub_records.append(m_record)
+                sub_accuracies.append(sub_acc)
+                sub_states.append(subtopic_state)
+
+            # One batched policy pass for all subtopics
+            # Action: 0(Easy/Prac), 1(Med/Prac), 2(Hard/Prac), 3(Easy/Rev), 4(Med/Adv)
+            sub_actions = None
+            if sub_states:
                 try:
-                    # Action: 0(Easy/Prac), 1(Med/Prac), 2(Hard/Prac), 3(Easy/Rev), 4(Med/Adv)
-                    # We map this to Target Difficulty: 0, 1, 2
-                    action_idx = rl_service.select_action(subtopic_state)
-                    print(f"DEBUG: RL Action for {sub}: {action_idx}")
+                    sub_actions = rl_service.select_actions(sub_states)
+                except Exception as e:
+                    print(f"RL Error for subtopics of {submission.chapter}: {e}")
+
+            # Pass 2: apply the decisions
+            for i, (sub, m_record, sub_acc) in enumerate(zip(tested_subtopics, sub_records, sub_accuracies)):
+                if sub_actions is not None:
+                    sub_action = sub_actions[i]
+                    print(f"DEBUG: RL Action for {sub}: {sub_action}")
                     
                     # Map Action to Target Difficulty
                     # 0->0(Easy), 1->1(Med), 2->2(Hard), 3->0(Easy), 4->1(Med/Adv - wait, 4 usually means explicit advance)
@@ -656,8 +654,8 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                     # As per user "decisive level to hit":
                     # If Action suggests Difficulty > Current Level => ADVANCE
                     
-                    target_diff = target_difficulty_map.get(action_idx, 0)
-                    if action_idx == 4: target_diff = m_record.level + 1 # Explicit Advance logic
+                    target_diff = target_difficulty_map.get(sub_action, 0)
+                    if sub_action == 4: target_diff = m_record.level + 1 # Explicit Advance logic
                     
                     # Decisive Logic
                     if target_diff > m_record.level:
@@ -670,8 +668,7 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                         # PPO Override: Even if accuracy is high, if RL says so, we RETRY.
                         m_record.last_action = "RETRY"
                         
-                except Exception as e:
-                    print(f"RL Error for subtopic {sub}: {e}")
+                else:
                     # Fallback Rule
                     if sub_acc >= 0.8:
                         if m_record.level < 2:
@@ -682,6 +679,8 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                     else:
                         m_record.last_action = "RETRY"
                 
+                dirty_mastery[(m_record.chapter, m_record.subtopic)] = m_record
+
                 # Add to fallback topics if RL/Rule decided RETRY
                 if m_record.last_action == "RETRY":
                     fallback_topics.append(sub)
@@ -722,6 +721,7 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                 is_completed=(accuracy >= 0.8 and submission.difficulty_level == 2)
             )
             db.add(m_record)
+        dirty_mastery[(m_record.chapter, m_record.subtopic)] = m_record
     
     # 4. RL-Driven Difficulty Adjustment
     student_state = prev_state
@@ -760,7 +760,7 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
     # If we promoted difficulty or stayed high, we might advance
     # distinct from simple accuracy check, but let's blend them
     
-    passed_threshold = accuracy >= 0.7
+    passed_threshold = accuracy >= EnvConfig.CORRECT_ACCURACY_THRESHOLD
     
     if passed_threshold:
         if new_difficulty > current_diff:
@@ -797,7 +797,7 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                  new_difficulty = min(2, current_diff + 1)
                  message = "Good work. Let's try the next level."
     else:
-        # Failed threshold (< 0.7)
+        # Failed threshold (< CORRECT_ACCURACY_THRESHOLD)
         action = "RETRY"
         if new_difficulty < current_diff:
             message = "Let's try an easier level to build confidence."
@@ -825,50 +825,38 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
         "avg_time": avg_time_per_q,
         "topic_mastery": (student.topic_mastery + accuracy) / 2 # Simple topic mastery aggregate
     }
-    update_student_state(db, student, performance_block)
-    update_student_difficulty(db, student.id, new_difficulty)
+    update_student_state(db, student, performance_block, commit=False)
+    update_student_difficulty(db, student.id, new_difficulty, commit=False)
     
-    # Store Action in Mastery Records
+    # Store Action in Mastery Records (m_record is this subtopic's record from the progression step)
     if not is_common_test and submission.subtopic:
-        m_rec = db.query(SubtopicMastery).filter(
-            SubtopicMastery.student_id == student.id,
-            SubtopicMastery.chapter == submission.chapter,
-            SubtopicMastery.subtopic == submission.subtopic
-        ).first()
-        if m_rec:
-            m_rec.last_action = action
+        m_record.last_action = action
+        dirty_mastery[(m_record.chapter, m_record.subtopic)] = m_record
     
     # Log Performance History (Per Question if details available, else aggregate)
     if submission.answers:
+        # Build every row first, then write them in one statement locally and one call to Supabase
+        perf_rows = []
         for ans in submission.answers:
-            perf_entry = PerformanceHistory(
-                student_id=student.id,
-                content_id=ans.get("question_id"),
-                accuracy=1.0 if ans.get("is_correct") else 0.0,
-                time_spent=avg_time_per_q, # Approximation if per-question time not tracked
-                difficulty_level=submission.difficulty_level,
-                chapter=submission.chapter,
-                subtopic=ans.get("topic") or submission.subtopic,
-                reward_score=reward_score, # Global reward applied to all for now, or calc individual? logic implies session reward
-                outcome=action
-            )
-            db.add(perf_entry)
+            perf_rows.append({
+                "student_id": student.id,
+                "content_id": ans.get("question_id"),
+                "accuracy": 1.0 if ans.get("is_correct") else 0.0,
+                "time_spent": avg_time_per_q, # Approximation if per-question time not tracked
+                "difficulty_level": submission.difficulty_level,
+                "chapter": submission.chapter,
+                "subtopic": ans.get("topic") or submission.subtopic,
+                "reward_score": reward_score, # Global reward applied to all for now, or calc individual? logic implies session reward
+                "outcome": action
+            })
+        db.bulk_insert_mappings(PerformanceHistory, perf_rows)
             
-            # Sync to Supabase
-            try:
-                supabase.table("performance_history").insert({
-                    "student_id": student.id,
-                    "content_id": ans.get("question_id"),
-                    "accuracy": 1.0 if ans.get("is_correct") else 0.0,
-                    "time_spent": avg_time_per_q,
-                    "difficulty_level": submission.difficulty_level,
-                    "chapter": submission.chapter,
-                    "topic": ans.get("topic") or submission.subtopic,
-                    "outcome": action,
-                    "reward_score": reward_score
-                }).execute()
-            except:
-                pass
+        # Sync to Supabase (write-behind via outbox, single multi-row upsert)
+        # Supabase names the 'subtopic' column 'topic'; sync_key makes a resent batch a no-op
+        enqueue_sync(db, student.id, "performance_history", [
+            {**{k: v for k, v in row.items() if k != "subtopic"}, "topic": row["subtopic"], "sync_key": uuid.uuid4().hex}
+            for row in perf_rows
+        ], operation="upsert", on_conflict="sync_key")
     else:
         # Fallback to aggregate if no detailed answers
         perf_entry = PerformanceHistory(
@@ -885,11 +873,15 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
         db.add(perf_entry)
 
     # Record Mastery (Legacy support for UI)
-    current_mastery = db.query(SubtopicMastery).filter(
-        SubtopicMastery.student_id == student.id,
-        SubtopicMastery.chapter == submission.chapter,
-        SubtopicMastery.subtopic == submission.subtopic
-    ).first()
+    if not is_common_test:
+        # Same (chapter, subtopic) record the progression step already loaded or created
+        current_mastery = m_record
+    else:
+        current_mastery = db.query(SubtopicMastery).filter(
+            SubtopicMastery.student_id == student.id,
+            SubtopicMastery.chapter == submission.chapter,
+            SubtopicMastery.subtopic == submission.subtopic
+        ).first()
 
     if not current_mastery:
         current_mastery = SubtopicMastery(
@@ -898,7 +890,7 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
             subtopic=submission.subtopic,
             accuracy=accuracy,
             level=submission.difficulty_level if hasattr(submission, 'difficulty_level') else 0,
-            is_completed=(accuracy >= 0.7)
+            is_completed=(accuracy >= EnvConfig.CORRECT_ACCURACY_THRESHOLD)
         )
         db.add(current_mastery)
     else:
@@ -906,35 +898,14 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
             current_mastery.accuracy = accuracy
         if hasattr(submission, 'difficulty_level'):
             current_mastery.level = submission.difficulty_level
-        if accuracy >= 0.7:
+        if accuracy >= EnvConfig.CORRECT_ACCURACY_THRESHOLD:
             current_mastery.is_completed = True
     
     # Calculate Mastery Score (0.0 to 1.0)
     # Formula: (level * 0.4) + (accuracy * 0.2)
     # level 0 -> 0.0-0.2 (Red), level 1 -> 0.4-0.6 (Orange), level 2 -> 0.8-1.0 (Green)
     current_mastery.mastery = (current_mastery.level * 0.4) + (current_mastery.accuracy * 0.2)
-    
-    # Sync to Supabase Mastery Table
-    try:
-        # Fetch updated mastery records for this chapter
-        chapter_mastery = db.query(SubtopicMastery).filter(
-            SubtopicMastery.student_id == student.id,
-            SubtopicMastery.chapter == submission.chapter
-        ).all()
-        
-        for m in chapter_mastery:
-            supabase.table("subtopic_mastery").upsert({
-                "student_id": m.student_id,
-                "chapter": m.chapter,
-                "subtopic": m.subtopic,
-                "accuracy": m.accuracy,
-                "mastery": m.mastery,
-                "level": m.level,
-                "is_completed": m.is_completed,
-                "last_action": m.last_action
-            }).execute()
-    except Exception as e:
-        print(f"Supabase mastery sync warning: {e}")
+    dirty_mastery[(current_mastery.chapter, current_mastery.subtopic)] = current_mastery
 
     # Update Permission Flag if Diagnostic or Common Test
     perm = db.query(StudentPermission).filter(StudentPermission.student_id == student.id).first()
@@ -967,6 +938,8 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
             print(f"DEBUG: Chapter already in list, skipping")
             
         # Also ensure chapter-level mastery record is marked completed
+        # (flush first so a chapter-level record created above is found, not duplicated)
+        db.flush()
         chapter_mastery = db.query(SubtopicMastery).filter(
             SubtopicMastery.student_id == student.id,
             SubtopicMastery.chapter == submission.chapter,
@@ -989,47 +962,43 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
                 chapter_mastery.accuracy = accuracy
             chapter_mastery.level = submission.difficulty_level
             chapter_mastery.mastery = (chapter_mastery.level * 0.4) + (chapter_mastery.accuracy * 0.2)
-        
-        # Sync chapter-level mastery to Supabase
-        try:
-            supabase.table("subtopic_mastery").upsert({
-                "student_id": student.id,
-                "chapter": submission.chapter,
-                "subtopic": None, # Represents chapter-level
-                "accuracy": chapter_mastery.accuracy,
-                "mastery": chapter_mastery.mastery,
-                "level": chapter_mastery.level,
-                "is_completed": True,
-                "last_action": chapter_mastery.last_action
-            }).execute()
-        except Exception as e:
-            print(f"Supabase chapter mastery sync warning: {e}")
+        dirty_mastery[(chapter_mastery.chapter, chapter_mastery.subtopic)] = chapter_mastery # subtopic None = chapter-level
 
-    db.commit()
+    # Sync changed mastery rows to Supabase as one multi-row upsert (write-behind via outbox)
+    if dirty_mastery:
+        db.flush() # Populate column defaults of newly created records
+        enqueue_sync(db, student.id, "subtopic_mastery", [
+            {
+                "student_id": m.student_id,
+                "chapter": m.chapter,
+                "subtopic": m.subtopic,
+                "accuracy": m.accuracy,
+                "mastery": m.mastery,
+                "level": m.level,
+                "is_completed": m.is_completed,
+                "last_action": m.last_action
+            }
+            for m in dirty_mastery.values()
+        ], operation="upsert", on_conflict="student_id,chapter,subtopic")
 
-    # 5. Sync with Supabase (Required by Spec)
-    try:
-        # Sync Permissions
-        print(f"DEBUG: Syncing to Supabase - student_id: {student.id}, completed_chapters: {perm.completed_chapters}")
-        supabase.table("student_permissions").upsert({
-            "student_id": student.id,
-            "has_taken_diagnostic": perm.has_taken_diagnostic,
-            "completed_chapters": perm.completed_chapters
-        }).execute()
-        print(f"DEBUG: Supabase sync successful!")
+    # 5. Sync with Supabase (Required by Spec) - staged in the outbox, sent after commit
+    print(f"DEBUG: Queueing Supabase sync - student_id: {student.id}, completed_chapters: {perm.completed_chapters}")
+    enqueue_sync(db, student.id, "student_permissions", {
+        "student_id": student.id,
+        "has_taken_diagnostic": perm.has_taken_diagnostic,
+        "completed_chapters": perm.completed_chapters
+    }, operation="upsert", on_conflict="student_id")
 
-        # Update RL State
-        supabase.table("rl_states").upsert({
-            "student_id": student.id,
-            "topic_mastery": student.topic_mastery,
-            "avg_accuracy_last_5": student.avg_accuracy_last_5,
-            "avg_time_per_question": student.avg_time_per_question,
-            "total_attempts": student.attempts,
-            "current_difficulty_index": new_difficulty,
-            "recent_improvement": student.recent_improvement
-        }).execute()
-    except Exception as e:
-        print(f"Supabase post-commit sync warning: {e}")
+    # Update RL State
+    enqueue_sync(db, student.id, "rl_states", {
+        "student_id": student.id,
+        "topic_mastery": student.topic_mastery,
+        "avg_accuracy_last_5": student.avg_accuracy_last_5,
+        "avg_time_per_question": student.avg_time_per_question,
+        "total_attempts": student.attempts,
+        "current_difficulty_index": new_difficulty,
+        "recent_improvement": student.recent_improvement
+    }, operation="upsert", on_conflict="student_id")
 
     # Log RL Transition
     next_state = {
@@ -1040,19 +1009,26 @@ def submit_adaptive_test(submission: AdaptiveTestSubmission, db: Session = Depen
         "attempts": student.attempts,
         "recent_improvement": student.recent_improvement
     }
+    # Best-effort: a savepoint keeps a logging failure from aborting the submission
     try:
         if 'action_idx' in locals():
-            rl_service.log_transition(
-                db=db,
-                student_id=student.id,
-                prev_state=prev_state,
-                action=action_idx,
-                reward=reward_score,
-                next_state=next_state
-            )
+            with db.begin_nested():
+                rl_service.log_transition(
+                    db=db,
+                    student_id=student.id,
+                    prev_state=prev_state,
+                    action=action_idx,
+                    reward=reward_score,
+                    next_state=next_state,
+                    commit=False
+                )
     except Exception as e:
         print(f"RL Logging Failed: {e}")
 
+    # Single commit for the whole submission
+    db.commit()
+    outbox_flusher.notify()
+
     return AdaptiveTestResponse(
         action=action,
         message=message,
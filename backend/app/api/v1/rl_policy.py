@@ -1,22 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
+import json
 import numpy as np
-from stable_baselines3 import PPO
 
 # Import from existing modules
+from app.core.config import settings
 from app.utils.state_encoder import StudentStateEncoder
-from app.utils.action_mask import get_allowed_actions
+from app.utils.action_mask import get_allowed_actions, get_allowed_actions_batch, apply_action_mask
 from app.core.database import supabase
+from app.schemas.rl_schema import NextActionsRequest
+from app.services.rl_service import RLService, inference_scheduler, decision_cache, predict_actions
+from rl_model.persistence.model_registry import get_model_registry
 
 router = APIRouter()
 
-# Load PPO model
-try:
-    model = PPO.load("rl_model/models/ppo_adaptive_learning.zip")
-except Exception:
-    model = None
+# Shared PPO model (loaded on first use, hot-swappable)
+model_registry = get_model_registry()
 
 state_encoder = StudentStateEncoder()
 
+# Max student ids per in_() query (keeps the PostgREST URL short)
+IN_QUERY_CHUNK = 200
+
 ACTION_MAP = {
     0: {"difficulty": "easy", "mode": "revise", "label": "Review Basics"},
     1: {"difficulty": "easy", "mode": "test", "label": "Starter Quiz"},
@@ -26,6 +30,33 @@ ACTION_MAP = {
     5: {"difficulty": "medium", "mode": "common_test", "label": "Full Chapter Challenge"},
 }
 
+COMMON_TEST_FIRST_MESSAGE = "Complete your first Full Chapter Challenge to unlock adaptive learning!"
+
+
+def _has_completed_any(perm_row: dict) -> bool:
+    """Whether a student_permissions row lists at least one completed chapter."""
+    if not perm_row:
+        return False
+    completed = perm_row.get("completed_chapters", "[]")
+    if isinstance(completed, str):
+        completed = json.loads(completed)
+    return len(completed) > 0
+
+
+def _to_student_data(db_state: dict) -> dict:
+    """
+    Map Supabase state to the format expected by utils (Encoder & Action Mask)
+    Adding defaults for fields not currently in DB to prevent breakage
+    """
+    return {
+        "avg_accuracy_last_5": db_state.get("avg_accuracy_last_5", 0.0),
+        "topic_mastery": db_state.get("topic_mastery", 0.0),
+        "attempts": db_state.get("total_attempts", 0),
+        "current_difficulty": db_state.get("current_difficulty_index", 0),
+        "avg_time_per_question": db_state.get("avg_time_per_question", 20.0), # Use DB value, fallback to 20
+        "recent_improvement": 0.0      # Defaulting for now
+    }
+
 @router.get("/next-action/{student_id}")
 def get_next_action(student_id: str):
     """
@@ -41,14 +72,7 @@ def get_next_action(student_id: str):
     # 1. Check if common test is completed for the current focus chapter
     # (For demo/logic simplicity, we check if the student has taken any common test recorded in permissions)
     perm_res = supabase.table("student_permissions").select("completed_chapters").eq("student_id", student_id).execute()
-    has_completed_any = False
-    if perm_res.data:
-        completed = perm_res.data[0].get("completed_chapters", "[]")
-        if isinstance(completed, str):
-            import json
-            completed = json.loads(completed)
-        if len(completed) > 0:
-            has_completed_any = True
+    has_completed_any = _has_completed_any(perm_res.data[0] if perm_res.data else None)
             
     # If no common test completed yet, override and suggest it first
     if not has_completed_any:
@@ -56,27 +80,18 @@ def get_next_action(student_id: str):
             "student_id": student_id,
             "recommended_action": ACTION_MAP[5],
             "state_snapshot": db_state,
-            "message": "Complete your first Full Chapter Challenge to unlock adaptive learning!"
+            "message": COMMON_TEST_FIRST_MESSAGE
         }
 
-    # Map Supabase state to the format expected by utils (Encoder & Action Mask)
-    # Adding defaults for fields not currently in DB to prevent breakage
-    student_data = {
-        "avg_accuracy_last_5": db_state.get("avg_accuracy_last_5", 0.0),
-        "topic_mastery": db_state.get("topic_mastery", 0.0),
-        "attempts": db_state.get("total_attempts", 0),
-        "current_difficulty": db_state.get("current_difficulty_index", 0),
-        "avg_time_per_question": db_state.get("avg_time_per_question", 20.0), # Use DB value, fallback to 20
-        "recent_improvement": 0.0      # Defaulting for now
-    }
+    student_data = _to_student_data(db_state)
 
     # Encode state for PPO
     state = state_encoder.encode(student_data)
     
     # PPO inference
+    version, model = model_registry.snapshot()
     if model:
-        action_id, _ = model.predict(state, deterministic=True)
-        action_id = int(action_id)
+        action_id = int(predict_actions(version, model, state.reshape(1, -1))[0])
     else:
         # Fallback logic if model is not trained yet (Rule-based)
         if student_data["avg_accuracy_last_5"] > 0.8:
@@ -100,3 +115,108 @@ def get_next_action(student_id: str):
         "recommended_action": ACTION_MAP[action_id],
         "state_snapshot": student_data
     }
+
+
+@router.post("/next-actions")
+def get_next_actions(request: NextActionsRequest):
+    """
+    Next best learning action for many students at once (dashboards, nightly planning).
+    One in_() read per table and a single batched policy pass.
+    Results follow the request order; ids without an RL state are listed in "missing".
+    """
+    student_ids = list(dict.fromkeys(request.student_ids))
+    if not student_ids:
+        return {"recommendations": [], "missing": []}
+
+    states_by_id, perms_by_id = {}, {}
+    for start in range(0, len(student_ids), IN_QUERY_CHUNK):
+        chunk = student_ids[start:start + IN_QUERY_CHUNK]
+        state_res = supabase.table("rl_states").select("*").in_("student_id", chunk).execute()
+        for row in state_res.data or []:
+            states_by_id[row["student_id"]] = row
+        perm_res = supabase.table("student_permissions") \
+            .select("student_id, completed_chapters") \
+            .in_("student_id", chunk) \
+            .execute()
+        for row in perm_res.data or []:
+            perms_by_id[row["student_id"]] = row
+
+    # Students who still need their first common test get it regardless of the policy
+    ready_ids = [
+        s_id for s_id in student_ids
+        if s_id in states_by_id and _has_completed_any(perms_by_id.get(s_id))
+    ]
+    student_data = {s_id: _to_student_data(states_by_id[s_id]) for s_id in ready_ids}
+
+    action_by_id = {}
+    if ready_ids:
+        batch = [student_data[s_id] for s_id in ready_ids]
+        state_batch = state_encoder.encode_batch(batch)
+        version, model = model_registry.snapshot()
+        if model:
+            actions = predict_actions(version, model, state_batch)
+        else:
+            actions = np.array([RLService._rule_based_action(s) for s in batch], dtype=np.int64)
+        # Action Masking (Safety check), vectorized
+        allowed = get_allowed_actions_batch(state_batch)
+        action_by_id = dict(zip(ready_ids, apply_action_mask(actions, allowed).tolist()))
+
+    recommendations = []
+    for s_id in student_ids:
+        if s_id not in states_by_id:
+            continue
+        if s_id in action_by_id:
+            recommendations.append({
+                "student_id": s_id,
+                "recommended_action": ACTION_MAP[action_by_id[s_id]],
+                "state_snapshot": student_data[s_id]
+            })
+        else:
+            recommendations.append({
+                "student_id": s_id,
+                "recommended_action": ACTION_MAP[5],
+                "state_snapshot": states_by_id[s_id],
+                "message": COMMON_TEST_FIRST_MESSAGE
+            })
+
+    return {
+        "recommendations": recommendations,
+        "missing": [s_id for s_id in student_ids if s_id not in states_by_id]
+    }
+
+
+@router.get("/model")
+def get_model_info():
+    """
+    Versions of the PPO model loaded in this worker.
+    """
+    return {
+        "current_version": model_registry.version,
+        "versions": model_registry.versions()
+    }
+
+@router.get("/metrics")
+def get_inference_metrics():
+    """
+    Inference metrics of this worker: batching (throughput, batch sizes, queue wait)
+    and decision cache hits/misses.
+    """
+    return {
+        "model_version": model_registry.version,
+        "batching": inference_scheduler.metrics() if inference_scheduler else None,
+        "decision_cache": decision_cache.stats() if decision_cache else None
+    }
+
+@router.post("/admin/reload-model")
+def reload_model(x_admin_token: str = Header(None)):
+    """
+    Hot-swap to the model artifact currently on disk without a restart.
+    In-flight requests finish on the model they started with.
+    """
+    if not settings.RL_ADMIN_TOKEN or x_admin_token != settings.RL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required.")
+    try:
+        version = model_registry.reload()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
+    return {"status": "reloaded", "version": version}
@@ -13,6 +13,30 @@ class Settings(BaseSettings):
 
     # RL Model
     PPO_MODEL_PATH: str = "rl_model/models/ppo_adaptive_learning.zip"
+    # Seconds between checks for a new model artifact (0 disables the file watch)
+    PPO_MODEL_WATCH_SECONDS: float = 30.0
+    # Micro-batch predict() calls across concurrent requests
+    RL_BATCH_INFERENCE: bool = False
+    RL_BATCH_MAX_SIZE: int = 32
+    RL_BATCH_MAX_WAIT_MS: float = 2.0
+    # LRU of decisions keyed on the quantized state (cleared on model swap)
+    RL_DECISION_CACHE: bool = False
+    RL_DECISION_CACHE_SIZE: int = 50000
+    RL_DECISION_CACHE_LEVELS: int = 100
+    # Required in X-Admin-Token for admin RL endpoints (empty disables them)
+    RL_ADMIN_TOKEN: str = ""
+
+    # Question Bank Cache (process-local)
+    QUESTION_BANK_TTL_SECONDS: int = 300
+    QUESTION_BANK_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Supabase write-behind outbox
+    SYNC_FLUSH_INTERVAL_SECONDS: float = 2.0
+    SYNC_BATCH_SIZE: int = 500
+    SYNC_MAX_ATTEMPTS: int = 20
+    SYNC_MAX_BACKOFF_SECONDS: int = 300
+    # Outbox lease: one worker drains at a time; others take over after expiry
+    SYNC_LEASE_SECONDS: float = 30.0
 
     class Config:
         env_file = ".env"
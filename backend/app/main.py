@@ -81,8 +81,23 @@ async def startup_event():
     """
     # Create Tables if they don't exist
     from app.core.database import engine, Base
-    from app.models import student, quiz, attempt, rl_transition, mastery, performance, permission
+    from app.models import student, quiz, attempt, rl_transition, mastery, performance, permission, sync_outbox
     Base.metadata.create_all(bind=engine)
+
+    # rl_transitions.created_at was added after the table; add it to older databases
+    from sqlalchemy import inspect, text
+    if "created_at" not in {c["name"] for c in inspect(engine).get_columns("rl_transitions")}:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE rl_transitions ADD COLUMN created_at DATETIME"))
+
+    # Start Supabase write-behind flusher
+    from app.services.sync_service import outbox_flusher
+    outbox_flusher.start()
+
+    # Pick up retrained PPO models without a restart
+    from app.core.config import settings
+    from rl_model.persistence.model_registry import get_model_registry
+    get_model_registry().start_watching(settings.PPO_MODEL_WATCH_SECONDS)
     
     print("🚀 Backend startup complete")
 
@@ -91,4 +106,14 @@ async def shutdown_event():
     """
     Cleanup resources
     """
+    from app.services.sync_service import outbox_flusher
+    outbox_flusher.stop()
+
+    from rl_model.persistence.model_registry import get_model_registry
+    get_model_registry().stop_watching()
+
+    from app.services.rl_service import inference_scheduler
+    if inference_scheduler:
+        inference_scheduler.stop()
+
     print("🛑 Backend shutdown complete")
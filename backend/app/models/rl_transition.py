@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy.sql import func
 from app.core.database import Base
 
 class RLTransition(Base):
@@ -26,3 +27,6 @@ class RLTransition(Base):
     ns_mastery = Column(Float)
     ns_attempts = Column(Integer)
     ns_improvement = Column(Float)
+
+    # Set on insert (client-side default, so it also works on tables migrated by ALTER)
+    created_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now())
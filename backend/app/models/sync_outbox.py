@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class SyncOutbox(Base):
+    __tablename__ = "sync_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(String, index=True)
+
+    # Supabase write to replay
+    table_name = Column(String, nullable=False)
+    operation = Column(String, nullable=False)  # insert / upsert
+    on_conflict = Column(String, nullable=True)  # e.g. "student_id" for upserts
+    payload = Column(Text, nullable=False)  # JSON list of rows
+
+    # Delivery
+    status = Column(String, default="pending", index=True)  # pending / failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(Float, default=0.0)  # epoch seconds
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SyncLease(Base):
+    """Time-limited lease naming the one process allowed to drain the outbox."""
+    __tablename__ = "sync_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=True)
+    expires_at = Column(Float, default=0.0)  # epoch seconds
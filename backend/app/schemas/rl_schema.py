@@ -0,0 +1,5 @@
+from pydantic import BaseModel
+from typing import List
+
+class NextActionsRequest(BaseModel):
+    student_ids: List[str]
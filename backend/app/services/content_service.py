@@ -6,6 +6,7 @@ import re
 from typing import List, Dict
 from app.core.database import supabase
 from app.core.config import settings
+from app.services.question_bank import question_bank
 
 # Configure Gemini
 # Using Gemini 1.5 Flash as requested for generation
@@ -249,6 +250,8 @@ class ContentGenerationService:
                 
                 supabase.table("common_test_questions").insert(mapped_common).execute()
                 print(f"Saved {len(mapped_common)} Common Test questions.")
+                for chapter in set(q["chapter"] for q in mapped_common):
+                    question_bank.invalidate(chapter)
             except Exception as e:
                 print(f"Error saving common test questions: {e}")
 
@@ -287,6 +290,8 @@ class ContentGenerationService:
             try:
                 # Supabase insert expects a list of dicts
                 res = supabase.table("learning_content").insert(all_questions).execute()
+                for chapter in set(q.get("chapter", chapter_name) for q in all_questions):
+                    question_bank.invalidate(chapter)
                 results["status"] = "success"
                 results["questions_generated"] = len(all_questions)
                 results["topics"] = topics
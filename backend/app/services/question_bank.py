@@ -0,0 +1,260 @@
+"""
+Process-local cache for the Supabase question bank
+(learning_content / common_test_questions).
+
+Rows are fetched once per (table, chapter) and slices are cached under
+(table, chapter, topic, difficulty). Entries expire after a TTL and the
+whole cache is bounded by an approximate byte budget (LRU eviction).
+Call `question_bank.invalidate(chapter)` after inserting new questions.
+
+Concurrent misses on one key share a single load (single-flight), so a TTL
+expiry under load costs one paged chapter fetch, not one per request. A load
+that overlaps an invalidate() of its chapter is returned to its callers but
+not cached, and later misses start a new load.
+Cached rows are never handed out directly: callers get copies they may mutate.
+"""
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.core.database import supabase
+
+# PostgREST caps a single response (default max-rows = 1000), so page through it
+PAGE_SIZE = 1000
+
+# Only the columns the quiz endpoints and the app actually use
+QUESTION_COLUMNS = {
+    "learning_content": "id, subject, chapter, topic, difficulty, question_type, data",
+    "common_test_questions": "id, subject, chapter, topic, question_type, data",
+}
+
+
+def _parse_row(row: dict) -> dict:
+    """Ensure 'data' field is properly parsed (JSONB might come as string)."""
+    if isinstance(row.get("data"), str):
+        try:
+            row["data"] = json.loads(row["data"])
+        except ValueError:
+            pass
+    return row
+
+
+def _estimate_size(rows: list) -> int:
+    """Rough in-memory footprint of a list of rows, based on its JSON length."""
+    return len(json.dumps(rows, default=str))
+
+
+class QuestionBankCache:
+    """
+    TTL + LRU cache of question rows keyed by (table, chapter, topic, difficulty).
+    A key with topic/difficulty set to None holds every row of the chapter.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, rows)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future of the load in progress
+        # Bumped by invalidate(); a load only caches if its key's generation is unchanged
+        self._generation = 0
+        self._chapter_generations = {}  # chapter -> int
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, rows = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def get_or_load(self, key, loader):
+        """
+        Cached rows for key, or loader() run once for all concurrent callers
+        missing the same key (followers wait for the leader's result).
+        """
+        rows = self.get(key)
+        if rows is not None:
+            return rows
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                generation = self._key_generation(key)
+        if not leader:
+            return future.result()
+        try:
+            rows = loader()
+            self.put(key, rows, generation=generation)
+            future.set_result(rows)
+            return rows
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                # invalidate() may already have replaced this load
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def put(self, key, rows: list, generation=None):
+        """Cache rows for key; skipped if `generation` (from before the load) is no longer current."""
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            # Caching this would evict everything else
+            return
+        with self._lock:
+            if generation is not None and generation != self._key_generation(key):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, rows)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, chapter: str = None):
+        """Drop every entry for a chapter (all tables), or the whole cache if chapter is None."""
+        with self._lock:
+            if chapter is None:
+                self._generation += 1
+                self._entries.clear()
+                self._size = 0
+                self._inflight.clear()
+            else:
+                self._chapter_generations[chapter] = self._chapter_generations.get(chapter, 0) + 1
+                for key in [k for k in self._entries if k[1] == chapter]:
+                    self._drop(key)
+                for key in [k for k in self._inflight if k[1] == chapter]:
+                    del self._inflight[key]
+        print(f"DEBUG: Question bank invalidated for chapter: {chapter or 'ALL'}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _key_generation(self, key) -> tuple:
+        return self._generation, self._chapter_generations.get(key[1], 0)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+
+# Singleton instance
+question_bank = QuestionBankCache(
+    ttl_seconds=settings.QUESTION_BANK_TTL_SECONDS,
+    max_bytes=settings.QUESTION_BANK_MAX_BYTES,
+)
+
+# A question never changes topic, so this map outlives the TTL'd cache entries.
+# { str(question_id): topic }, warmed whenever the question bank loads a chapter.
+_TOPIC_BY_ID = {}
+
+
+def _remember_topics(rows: list):
+    for row in rows:
+        if row.get("id") is not None and row.get("topic"):
+            _TOPIC_BY_ID[str(row["id"])] = row["topic"]
+
+
+def _copy_rows(rows: list) -> list:
+    """Copies of cached rows (including the nested 'data' payload) for callers to mutate freely."""
+    return [
+        {**row, "data": copy.deepcopy(row["data"])} if isinstance(row.get("data"), (dict, list)) else dict(row)
+        for row in rows
+    ]
+
+
+def _fetch_chapter(table: str, chapter: str) -> list:
+    """Fetch every row of a chapter from Supabase (projected columns), ordered by id."""
+    rows = []
+    start = 0
+    while True:
+        res = supabase.table(table) \
+            .select(QUESTION_COLUMNS.get(table, "*")) \
+            .eq("chapter", chapter) \
+            .order("id") \
+            .range(start, start + PAGE_SIZE - 1) \
+            .execute()
+        page = res.data or []
+        rows.extend(_parse_row(row) for row in page)
+        if len(page) < PAGE_SIZE:
+            break
+        start += PAGE_SIZE
+    _remember_topics(rows)
+    print(f"DEBUG: Question bank loaded {len(rows)} rows from {table} for {chapter}")
+    return rows
+
+
+def get_chapter_questions(table: str, chapter: str, topic: str = None, difficulty: str = None) -> list:
+    """
+    Return question rows for a chapter, optionally narrowed to a topic and/or difficulty.
+    Rows are in id order. The list and its rows are copies, safe to shuffle and modify.
+    """
+    def load():
+        if topic is None and difficulty is None:
+            return _fetch_chapter(table, chapter)
+        return [
+            row for row in _cached_chapter(table, chapter)
+            if (topic is None or row.get("topic") == topic)
+            and (difficulty is None or row.get("difficulty") == difficulty)
+        ]
+
+    return _copy_rows(question_bank.get_or_load((table, chapter, topic, difficulty), load))
+
+
+def _cached_chapter(table: str, chapter: str) -> list:
+    """The cached rows of a whole chapter (shared, read-only)."""
+    return question_bank.get_or_load((table, chapter, None, None), lambda: _fetch_chapter(table, chapter))
+
+
+def get_chapter_topics(chapter: str, subject: str = None) -> list:
+    """Sorted unique topics (subtopics) of a chapter from learning_content."""
+    rows = _cached_chapter("learning_content", chapter)
+    return sorted(set(
+        row["topic"] for row in rows
+        if row.get("topic") and (subject is None or row.get("subject") == subject)
+    ))
+
+
+def resolve_question_topics(question_ids: list) -> dict:
+    """
+    Map question ids to topics for a whole answer list.
+    Served from the in-memory id -> topic map; any misses cost one in_() lookup
+    per table (common_test_questions first, then learning_content).
+    Returns { str(question_id): topic } for every id that could be resolved.
+    """
+    ids = set(str(q_id) for q_id in question_ids if q_id is not None)
+    missing = [q_id for q_id in ids if q_id not in _TOPIC_BY_ID]
+
+    for table in ("common_test_questions", "learning_content"):
+        if not missing:
+            break
+        res = supabase.table(table).select("id, topic").in_("id", missing).execute()
+        _remember_topics(res.data or [])
+        missing = [q_id for q_id in missing if q_id not in _TOPIC_BY_ID]
+
+    if missing:
+        print(f"DEBUG: Could not resolve topics for {len(missing)} questions")
+    return {q_id: _TOPIC_BY_ID[q_id] for q_id in ids if q_id in _TOPIC_BY_ID}
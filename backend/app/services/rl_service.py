@@ -1,44 +1,100 @@
 import numpy as np
 from sqlalchemy.orm import Session
-from stable_baselines3 import PPO
 
 from app.core.config import settings
 from app.models.rl_transition import RLTransition
 from app.utils.state_encoder import StudentStateEncoder
-from app.utils.action_mask import get_allowed_actions
+from app.utils.action_mask import get_allowed_actions_batch, apply_action_mask
+from rl_model.persistence.model_registry import get_model_registry
+from rl_model.inference.batch_scheduler import InferenceScheduler
+from rl_model.inference.decision_cache import DecisionCache
+
+# Optional micro-batching of forward passes across concurrent requests; each
+# request submits the model it snapshotted, so batches never mix versions
+inference_scheduler = InferenceScheduler(
+    get_model_registry().get,
+    max_batch_size=settings.RL_BATCH_MAX_SIZE,
+    max_wait_ms=settings.RL_BATCH_MAX_WAIT_MS
+) if settings.RL_BATCH_INFERENCE else None
+
+# Optional cache of raw decisions for near-duplicate states
+decision_cache = DecisionCache(
+    max_entries=settings.RL_DECISION_CACHE_SIZE,
+    levels=settings.RL_DECISION_CACHE_LEVELS
+) if settings.RL_DECISION_CACHE else None
+if decision_cache:
+    get_model_registry().add_listener(decision_cache.clear)
+
+
+def predict_actions(version, model, state_batch: np.ndarray) -> np.ndarray:
+    """
+    Raw (unmasked) policy actions for an (N, 6) batch of encoded states.
+    Cached decisions are reused; the rest go through the scheduler or the model.
+    """
+    cached, keys = decision_cache.lookup(version, state_batch) if decision_cache else (None, None)
+    if cached is not None:
+        miss = cached < 0
+        if not miss.any():
+            return cached
+        state_batch = state_batch[miss]
+
+    if inference_scheduler:
+        actions, _ = inference_scheduler.predict(state_batch, deterministic=True, model=model)
+    else:
+        actions, _ = model.predict(state_batch, deterministic=True)
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+    if cached is None:
+        return actions
+
+    decision_cache.store(version, [key for key, m in zip(keys, miss) if m], actions)
+    cached[miss] = actions
+    return cached
+
 
 class RLService:
     def __init__(self):
-        try:
-            self.model = PPO.load(settings.PPO_MODEL_PATH)
-        except Exception as e:
-            print(f"Warning: RL Model not found at {settings.PPO_MODEL_PATH}. Using rule-based fallback.")
-            self.model = None
+        # Shared, lazily loaded and hot-swappable; None means rule-based fallback
+        self.registry = get_model_registry()
         self.encoder = StudentStateEncoder()
 
+    @property
+    def model(self):
+        return self.registry.get()
+
     def select_action(self, student_state: dict):
-        if self.model:
-            state_vec = self.encoder.encode(student_state)
-            action, _ = self.model.predict(state_vec, deterministic=True)
+        return self.select_actions([student_state])[0]
+
+    def select_actions(self, student_states: list) -> list:
+        """
+        Batched action selection: encodes all states into one (N, 6) array,
+        runs a single forward pass and applies the action mask vectorized.
+        """
+        if not student_states:
+            return []
+
+        # One model reference for the whole batch, even if a swap happens meanwhile
+        version, model = self.registry.snapshot()
+        if model:
+            state_batch = self.encoder.encode_batch(student_states)
+            actions = predict_actions(version, model, state_batch)
             
             # Apply Action Masking
-            allowed = get_allowed_actions(student_state)
-            if allowed[int(action)] == 0:
-                # Fallback to the first allowed action (usually Easy Practice)
-                valid_indices = [i for i, x in enumerate(allowed) if x == 1]
-                if valid_indices:
-                    action = valid_indices[0]
-            
-            return int(action)
+            # Disallowed actions fall back to the first allowed action (usually Easy Practice)
+            allowed = get_allowed_actions_batch(state_batch)
+            return apply_action_mask(actions, allowed).tolist()
         else:
-            # Rule-based fallback
-            accuracy = student_state.get("avg_accuracy_last_5", 0.0)
-            if accuracy > 0.8:
-                return 3 # Med Adv
-            elif accuracy < 0.4:
-                return 0 # Easy Revise
-            else:
-                return 1 # Easy Test
+            return [self._rule_based_action(s) for s in student_states]
+
+    @staticmethod
+    def _rule_based_action(student_state: dict) -> int:
+        # Rule-based fallback
+        accuracy = student_state.get("avg_accuracy_last_5", 0.0)
+        if accuracy > 0.8:
+            return 3 # Med Adv
+        elif accuracy < 0.4:
+            return 0 # Easy Revise
+        else:
+            return 1 # Easy Test
 
     def log_transition(
         self,
@@ -47,7 +103,8 @@ class RLService:
         prev_state: dict,
         action: int,
         reward: float,
-        next_state: dict
+        next_state: dict,
+        commit: bool = True
     ):
         transition = RLTransition(
             student_id=student_id,
@@ -71,4 +128,8 @@ class RLService:
         )
 
         db.add(transition)
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            # Part of the caller's unit of work
+            db.flush()
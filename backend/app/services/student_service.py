@@ -2,9 +2,19 @@ from sqlalchemy.orm import Session
 from app.models.student import Student
 from app.core.database import supabase
 
-def get_student(db: Session, student_id: str):
-    # Try Local Cache
-    student = db.query(Student).filter(Student.id == student_id).first()
+
+def _save(db: Session, obj, commit: bool):
+    """Commit and refresh, or (commit=False) only flush and leave the commit to the caller."""
+    if commit:
+        db.commit()
+        db.refresh(obj)
+    else:
+        db.flush()
+
+
+def get_student(db: Session, student_id: str, commit: bool = True):
+    # Try Local Cache (identity map first, so repeated lookups in one session don't re-select)
+    student = db.get(Student, student_id)
     if student:
         return student
         
@@ -22,8 +32,7 @@ def get_student(db: Session, student_id: str):
                 # Add other fields if synced
             )
             db.add(student)
-            db.commit()
-            db.refresh(student)
+            _save(db, student, commit)
             return student
     except Exception as e:
         print(f"Supabase student fetch error: {e}")
@@ -35,7 +44,7 @@ def get_student_by_email(db: Session, email: str):
     return db.query(Student).filter(Student.email == email).first()
 
 
-def create_student(db: Session, student_id: str, email: str, grade: int):
+def create_student(db: Session, student_id: str, email: str, grade: int, commit: bool = True):
     # 1. Create in Supabase (Source of Truth)
     try:
         supabase.table("students").upsert({
@@ -50,12 +59,11 @@ def create_student(db: Session, student_id: str, email: str, grade: int):
     # 2. Create Local Cache
     student = Student(id=student_id, email=email, grade=grade)
     db.add(student)
-    db.commit()
-    db.refresh(student)
+    _save(db, student, commit)
     return student
 
 
-def update_student_state(db: Session, student: Student, performance: dict):
+def update_student_state(db: Session, student: Student, performance: dict, commit: bool = True):
     prev_accuracy = student.avg_accuracy_last_5
 
     new_acc = performance.get("accuracy", 0.0)
@@ -72,15 +80,13 @@ def update_student_state(db: Session, student: Student, performance: dict):
     raw_improvement = student.avg_accuracy_last_5 - prev_accuracy
     student.recent_improvement = max(-1.0, min(1.0, raw_improvement))
 
-    db.commit()
-    db.refresh(student)
+    _save(db, student, commit)
     return student
 
 
-def update_student_difficulty(db: Session, student_id: str, new_difficulty: int):
-    student = get_student(db, student_id)
+def update_student_difficulty(db: Session, student_id: str, new_difficulty: int, commit: bool = True):
+    student = get_student(db, student_id, commit=commit)
     if student:
         student.current_difficulty = new_difficulty
-        db.commit()
-        db.refresh(student)
+        _save(db, student, commit)
     return student
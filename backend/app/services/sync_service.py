@@ -0,0 +1,298 @@
+"""
+Write-behind sync of local changes to Supabase.
+
+Request handlers stage Supabase writes in the local `sync_outbox` table with
+`enqueue_sync` so they commit in the same transaction as the local data.
+`OutboxFlusher` replays them from a background thread: pending entries are
+batched per (table, operation, on_conflict) into one Supabase call, retried
+with exponential backoff, and kept in id order per student (a student's
+later entries wait while an earlier one is being retried). A batch whose rows
+are rejected is bisected so only the offending entries back off; a batch that
+fails for any other reason (connection error, timeout, server error) backs off
+as a whole.
+
+Every uvicorn worker starts a flusher, but only the holder of the
+"outbox" lease in `sync_leases` drains; the others stand by and take over
+once the lease expires. The holder commits its progress and renews the lease
+before every Supabase call, and stops the round if the lease was lost.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import exists, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.core.database import SessionLocal, supabase
+from app.models.sync_outbox import SyncOutbox, SyncLease
+
+LEASE_NAME = "outbox"
+
+# SQLSTATE classes of errors caused by the rows themselves:
+# 22 data exception, 23 integrity constraint violation
+ROW_ERROR_SQLSTATES = ("22", "23")
+
+
+class LeaseLost(Exception):
+    """Another process took the outbox lease during a flush round."""
+
+
+def enqueue_sync(
+    db: Session,
+    student_id: str,
+    table_name: str,
+    rows,
+    operation: str = "insert",
+    on_conflict: str = None
+):
+    """
+    Stage a Supabase insert/upsert of one row (dict) or many rows (list).
+    Nothing is sent here; the entry is committed with the caller's transaction.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+    entry = SyncOutbox(
+        student_id=student_id,
+        table_name=table_name,
+        operation=operation,
+        on_conflict=on_conflict,
+        payload=json.dumps(rows),
+        status="pending",
+        attempts=0,
+        next_attempt_at=0.0
+    )
+    db.add(entry)
+    return entry
+
+
+def _dedupe_rows(rows: list, on_conflict: str) -> list:
+    """Keep only the last row per conflict key; Postgres rejects an upsert touching a row twice."""
+    if not on_conflict:
+        return rows
+    columns = [c.strip() for c in on_conflict.split(",")]
+    latest = OrderedDict()
+    for row in rows:
+        key = tuple(row.get(c) for c in columns)
+        latest.pop(key, None)
+        latest[key] = row
+    return list(latest.values())
+
+
+def _is_row_error(error: Exception) -> bool:
+    """
+    True if Supabase rejected the rows (4xx, constraint violation, bad data),
+    which bisection can isolate; False for connection errors, timeouts and 5xx.
+    """
+    code = str(getattr(error, "code", None) or "")
+    if code[:2] in ROW_ERROR_SQLSTATES or code.startswith("PGRST"):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and 400 <= status < 500
+
+
+class OutboxFlusher:
+    """
+    Background thread that drains the sync outbox to Supabase.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.SYNC_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = settings.SYNC_BATCH_SIZE,
+        max_attempts: int = settings.SYNC_MAX_ATTEMPTS,
+        max_backoff: float = settings.SYNC_MAX_BACKOFF_SECONDS,
+        lease_seconds: float = settings.SYNC_LEASE_SECONDS
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self):
+        """Wake the flusher right away (call after committing new outbox entries)."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Keep draining while full batches come back
+                while self.flush_once() >= self.batch_size and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                print(f"Outbox flush error: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        # Final best-effort drain on shutdown, then let another worker take over
+        try:
+            self.flush_once()
+            self._release_lease()
+        except Exception as e:
+            print(f"Outbox final flush error: {e}")
+
+    def _acquire_lease(self, db: Session, now: float) -> bool:
+        """Take or renew the outbox lease; False while another process holds it."""
+        claimed = db.query(SyncLease) \
+            .filter(SyncLease.name == LEASE_NAME) \
+            .filter((SyncLease.holder == self.holder_id) | (SyncLease.expires_at < now)) \
+            .update({"holder": self.holder_id, "expires_at": now + self.lease_seconds}, synchronize_session=False)
+        if not claimed:
+            if db.query(SyncLease).filter(SyncLease.name == LEASE_NAME).first() is not None:
+                db.rollback()
+                return False
+            db.add(SyncLease(name=LEASE_NAME, holder=self.holder_id, expires_at=now + self.lease_seconds))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process created the lease first
+            db.rollback()
+            return False
+        return True
+
+    def _release_lease(self):
+        db = SessionLocal()
+        try:
+            db.query(SyncLease) \
+                .filter(SyncLease.name == LEASE_NAME, SyncLease.holder == self.holder_id) \
+                .update({"expires_at": 0.0}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _due_entries(self, db: Session, now: float) -> list:
+        """
+        The first batch_size pending entries that are due, in id order, skipping
+        every entry of a student whose earlier (or same) entry is backing off.
+        """
+        waiting = aliased(SyncOutbox)
+        blocked_by_earlier = exists().where(
+            waiting.student_id == SyncOutbox.student_id,
+            waiting.status == "pending",
+            waiting.next_attempt_at > now,
+            waiting.id < SyncOutbox.id
+        )
+        return db.query(SyncOutbox) \
+            .filter(SyncOutbox.status == "pending") \
+            .filter(or_(SyncOutbox.next_attempt_at.is_(None), SyncOutbox.next_attempt_at <= now)) \
+            .filter(~blocked_by_earlier) \
+            .order_by(SyncOutbox.id) \
+            .limit(self.batch_size) \
+            .all()
+
+    def flush_once(self) -> int:
+        """Send one round of due entries. Returns the number of entries sent or retried."""
+        # Entries stay loaded across the per-send commits; only this lease holder changes them
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            now = time.time()
+            if not self._acquire_lease(db, now):
+                return 0
+            pending = self._due_entries(db, now)
+            if not pending:
+                return 0
+
+            batches = OrderedDict()  # (table, operation, on_conflict) -> [entries]
+            for entry in pending:
+                key = (entry.table_name, entry.operation, entry.on_conflict)
+                batches.setdefault(key, []).append(entry)
+
+            # Students whose entry failed this round; their later entries must wait
+            blocked = set()
+            processed = 0
+            try:
+                for key, entries in batches.items():
+                    processed += self._send_entries(db, key, entries, blocked, now)
+            except LeaseLost:
+                print("Outbox lease lost mid-round; stopping")
+                return processed
+
+            db.commit()
+            return processed
+        finally:
+            db.close()
+
+    def _keep_lease(self, db: Session):
+        """Commit the round's progress, then renew the lease; raises LeaseLost if another process holds it."""
+        db.commit()
+        if not self._acquire_lease(db, time.time()):
+            raise LeaseLost()
+
+    def _send_entries(self, db: Session, key: tuple, entries: list, blocked: set, now: float) -> int:
+        """
+        Send entries as one call. If Supabase rejects rows, bisect (halves in id
+        order) so only the entries that fail on their own back off and block
+        their student; any other failure backs off every entry in the call.
+        """
+        entries = [entry for entry in entries if entry.student_id not in blocked]
+        if not entries:
+            return 0
+        table_name, operation, on_conflict = key
+        rows = []
+        for entry in entries:
+            rows.extend(json.loads(entry.payload))
+        self._keep_lease(db)
+        try:
+            self._send(table_name, operation, on_conflict, rows)
+        except Exception as e:
+            if len(entries) == 1 or not _is_row_error(e):
+                print(f"Supabase sync to {table_name} failed ({len(entries)} entries, first id {entries[0].id}): {e}")
+                for entry in entries:
+                    self._mark_failed(entry, e, now)
+                    blocked.add(entry.student_id)
+                return len(entries)
+            mid = len(entries) // 2
+            return (
+                self._send_entries(db, key, entries[:mid], blocked, now)
+                + self._send_entries(db, key, entries[mid:], blocked, now)
+            )
+        for entry in entries:
+            db.delete(entry)
+        return len(entries)
+
+    def _send(self, table_name: str, operation: str, on_conflict: str, rows: list):
+        if operation == "upsert":
+            rows = _dedupe_rows(rows, on_conflict)
+            if on_conflict:
+                supabase.table(table_name).upsert(rows, on_conflict=on_conflict).execute()
+            else:
+                supabase.table(table_name).upsert(rows).execute()
+        else:
+            supabase.table(table_name).insert(rows).execute()
+
+    def _mark_failed(self, entry: SyncOutbox, error: Exception, now: float):
+        entry.attempts = (entry.attempts or 0) + 1
+        entry.last_error = str(error)[:1000]
+        if entry.attempts >= self.max_attempts:
+            # Parked for inspection instead of being dropped
+            entry.status = "failed"
+        else:
+            entry.next_attempt_at = now + min(self.max_backoff, 2 ** entry.attempts)
+
+
+# Singleton instance
+outbox_flusher = OutboxFlusher()
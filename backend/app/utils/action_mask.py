@@ -1,16 +1,50 @@
+import numpy as np
+
+from app.utils.state_encoder import STATE_FEATURES
+
+_ACCURACY = STATE_FEATURES.index("avg_accuracy_last_5")
+_MASTERY = STATE_FEATURES.index("topic_mastery")
+_IMPROVEMENT = STATE_FEATURES.index("recent_improvement")
+
+
 def get_allowed_actions(student_state: dict):
-    allowed = [1] * 5
+    return get_allowed_actions_batch([student_state])[0].astype(int).tolist()
+
+
+def get_allowed_actions_batch(student_states) -> np.ndarray:
+    """
+    Boolean (N, 5) action mask for a list of state dicts or an (N, 6) encoded state matrix.
+    """
+    if isinstance(student_states, np.ndarray):
+        states = student_states.reshape(-1, len(STATE_FEATURES))
+        accuracy = states[:, _ACCURACY]
+        mastery = states[:, _MASTERY]
+        improvement = states[:, _IMPROVEMENT]
+    else:
+        accuracy = np.array([s["avg_accuracy_last_5"] for s in student_states], dtype=np.float64)
+        mastery = np.array([s["topic_mastery"] for s in student_states], dtype=np.float64)
+        improvement = np.array([s["recent_improvement"] for s in student_states], dtype=np.float64)
+
+    allowed = np.ones((len(accuracy), 5), dtype=bool)
 
     # Cannot advance if mastery is low
-    if student_state["topic_mastery"] < 0.6:
-        allowed[4] = 0
+    allowed[:, 4] &= ~(mastery < 0.6)
 
     # Prevent hard questions for beginners
-    if student_state["avg_accuracy_last_5"] < 0.4:
-        allowed[2] = 0
+    allowed[:, 2] &= ~(accuracy < 0.4)
 
     # Force revision after repeated failures
-    if student_state["recent_improvement"] < -0.2:
-        allowed[3] = 1
+    allowed[:, 3] |= improvement < -0.2
 
     return allowed
+
+
+def apply_action_mask(actions: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+    """
+    Vectorized masking for a batch of predicted actions.
+    allowed is a boolean (N, 5) mask; disallowed actions fall back to the first allowed one.
+    """
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+    allowed = np.asarray(allowed, dtype=bool)
+    rows = np.arange(len(actions))
+    return np.where(allowed[rows, actions], actions, allowed.argmax(axis=1))
@@ -1,15 +1,29 @@
 import numpy as np
 
+# Column order of encoded states
+STATE_FEATURES = [
+    "avg_accuracy_last_5",
+    "avg_time_per_question",
+    "current_difficulty",
+    "topic_mastery",
+    "attempts",
+    "recent_improvement"
+]
+
 class StudentStateEncoder:
     def __init__(self):
-        self.state_dim = 6
+        self.state_dim = len(STATE_FEATURES)
 
     def encode(self, state: dict) -> np.ndarray:
-        return np.array([
-            state["avg_accuracy_last_5"],
-            state["avg_time_per_question"],
-            state["current_difficulty"],
-            state["topic_mastery"],
-            state["attempts"],
-            state["recent_improvement"]
-        ], dtype=np.float32)
+        return self.encode_batch([state])[0]
+
+    def encode_batch(self, states) -> np.ndarray:
+        """
+        Encode a list of state dicts (or pass through an (N, 6) array) as one (N, 6) float32 array.
+        """
+        if isinstance(states, np.ndarray):
+            return states.astype(np.float32, copy=False).reshape(-1, self.state_dim)
+        return np.array(
+            [[state[key] for key in STATE_FEATURES] for state in states],
+            dtype=np.float32
+        ).reshape(-1, self.state_dim)
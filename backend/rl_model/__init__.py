@@ -7,17 +7,44 @@ This package contains all modules required for:
 - Offline training and inference
 - State encoding, normalization, and validation
 - Model persistence and logging
+
+Submodules are imported on first attribute access so that serving code
+(e.g. rl_model.inference.numpy_policy) does not pull in torch/SB3.
 """
+import importlib
+
+# Expose key submodules for easy import: rl_model.<name> -> module path
+_SUBMODULES = {
+    "ppo_config": ".config.ppo_config",
+    "env_config": ".config.env_config",
+    "state_builder": ".data.state_builder",
+    "action_mapper": ".data.action_mapper",
+    "transition_exporter": ".data.transition_exporter",
+    "student_env": ".env.student_env",
+    "reward": ".env.reward",
+    "ppo_agent": ".model.ppo_agent",
+    "policy_loader": ".model.policy_loader",
+    "decision_engine": ".inference.decision_engine",
+    "numpy_policy": ".inference.numpy_policy",
+    "lookup_policy": ".inference.lookup_policy",
+    "model_store": ".persistence.model_store",
+    "rollout_logger": ".persistence.rollout_logger",
+    "transition_store": ".persistence.transition_store",
+    "normalizer": ".utils.normalizer",
+    "validators": ".utils.validators",
+    "trainer": ".training.trainer",
+    "callbacks": ".training.callbacks",
+    "dataset": ".training.dataset",
+}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module(_SUBMODULES[name], __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Expose key submodules for easy import
-from .config import ppo_config, env_config
-from .data import state_builder, action_mapper
-from .env import student_env, reward
-from .model import ppo_agent, policy_loader
-from .inference import decision_engine
-from .persistence import model_store, rollout_logger
-from .utils import normalizer, validators
-from .training import trainer, callbacks
 
 # Optional: define top-level version
 __version__ = "1.0.0"
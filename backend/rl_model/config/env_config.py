@@ -22,6 +22,9 @@ class EnvConfig:
     IMPROVEMENT_BONUS = 0.5
     TIME_EFFICIENCY_BONUS = 0.3
     FAILURE_STREAK_PENALTY = -1.0
+    FAILURE_STREAK_THRESHOLD = 3  # failed quizzes in a row before the penalty applies
+    REWARD_CLIP = 1.0  # rewards are clipped to [-REWARD_CLIP, REWARD_CLIP] for PPO
+    CORRECT_ACCURACY_THRESHOLD = 0.7  # quiz accuracy counted as "correct" (quiz submission)
 
     # Action space
     ACTIONS = 5  # 0: easy, 1: medium, 2: hard, 3: revise, 4: advance
@@ -1,4 +1,5 @@
 # rl_model/config/ppo_config.py
+import math
 
 class PPOConfig:
     """
@@ -8,10 +9,16 @@ class PPOConfig:
     # Training parameters
     LEARNING_RATE = 0.0003
     GAMMA = 0.99  # discount factor
+    GAE_LAMBDA = 0.95  # GAE bias/variance trade-off
+    # Timesteps per rollout summed over all envs; PPO's per-env n_steps is
+    # N_STEPS / n_envs (see rollout_kwargs), so one update still sees ~N_STEPS
+    # transitions however many simulated students run in parallel
     N_STEPS = 2048
     BATCH_SIZE = 64
     N_EPOCHS = 10
     CLIP_RANGE = 0.2
+    # Epochs fitting a new model's critic to logged discounted returns (trainer)
+    VALUE_PRETRAIN_EPOCHS = 5
 
     # Exploration / policy
     ENT_COEF = 0.01  # entropy bonus
@@ -20,8 +27,64 @@ class PPOConfig:
 
     # PPO model paths
     MODEL_PATH = "rl_model/persistence/ppo_model"
+    MODEL_EXPORT_PATH = "rl_model/models/ppo_adaptive_learning.zip"
+    # Torch-free actor weights served by rl_model.inference.numpy_policy
+    POLICY_EXPORT_PATH = "rl_model/models/ppo_adaptive_learning_policy.npz"
+    # Lookup grid distilled from the policy (rl_model/scripts/distill_policy.py)
+    LOOKUP_EXPORT_PATH = "rl_model/models/ppo_adaptive_learning_lookup.npz"
     LOG_PATH = "rl_model/persistence/logs"
 
+    # Simulated students: NUM_WORKERS processes (rl_model.training.parallel_env),
+    # each stepping ENVS_PER_WORKER students; worker i is seeded with SEED + i
+    NUM_WORKERS = 1
+    ENVS_PER_WORKER = 256
+
+    # Training length / checkpoints
+    TOTAL_TIMESTEPS = 1_000_000
+    CHECKPOINT_FREQ = 100_000
+    # Written asynchronously by TrainingCallback; best KEEP_TOP_K by score + latest are kept
+    CHECKPOINT_DIR = "rl_model/persistence/checkpoints"
+    KEEP_TOP_K = 3
+
+    # Incremental retraining (rl_model/scripts/train.py --incremental)
+    INCREMENTAL_TIMESTEPS = 100_000
+    REPLAY_RATIO = 1.0  # old transitions replayed per new transition
+    MIN_NEW_TRANSITIONS = 1000
+    MIN_IMPROVEMENT = 0.0  # doubly-robust value gain required to publish
+    GATE_HOLDOUT = 0.2  # latest share of new transitions kept out of training for the publish gate
+
     # Misc
     VERBOSE = 1
     SEED = 42
+
+    @classmethod
+    def rollout_kwargs(cls, n_envs: int = 1, n_steps: int = None, batch_size: int = None) -> dict:
+        """
+        PPO n_steps (per env) and batch_size for n_envs parallel envs: the rollout
+        n_steps * n_envs stays close to N_STEPS and is a multiple of the batch size.
+        """
+        n_steps = n_steps or cls.N_STEPS
+        batch_size = batch_size or cls.BATCH_SIZE
+        # Smallest per-env step count whose rollout divides into whole batches
+        granularity = batch_size // math.gcd(n_envs, batch_size)
+        per_env = max(granularity, round(n_steps / n_envs / granularity) * granularity)
+        return {"n_steps": per_env, "batch_size": batch_size}
+
+    @classmethod
+    def to_dict(cls, n_envs: int = 1) -> dict:
+        """
+        Keyword arguments for stable_baselines3.PPO on a VecEnv with n_envs envs.
+        """
+        return {
+            "learning_rate": cls.LEARNING_RATE,
+            "gamma": cls.GAMMA,
+            "gae_lambda": cls.GAE_LAMBDA,
+            **cls.rollout_kwargs(n_envs),
+            "n_epochs": cls.N_EPOCHS,
+            "clip_range": cls.CLIP_RANGE,
+            "ent_coef": cls.ENT_COEF,
+            "vf_coef": cls.VF_COEF,
+            "max_grad_norm": cls.MAX_GRAD_NORM,
+            "verbose": cls.VERBOSE,
+            "seed": cls.SEED,
+        }
@@ -1,4 +1,11 @@
 # rl_model/data/__init__.py
 
-from .state_builder import build_state_vector
 from .action_mapper import map_action_to_quiz
+
+
+def __getattr__(name):
+    # build_state_vector needs the app's SQLAlchemy models (and DB client); import on demand
+    if name == "build_state_vector":
+        from .state_builder import build_state_vector
+        return build_state_vector
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
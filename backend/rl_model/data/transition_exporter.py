@@ -0,0 +1,109 @@
+# rl_model/data/transition_exporter.py
+"""
+Incremental export of the `rl_transitions` SQL table into the columnar
+TransitionStore used for training.
+
+Rows are streamed in id order, in chunks, starting after the high-water
+mark saved in the store manifest. Each chunk's segment and the new mark
+are committed by the same manifest write, so a crash never duplicates or
+skips rows.
+
+Timestamps come from `created_at`. Rows logged before that column existed
+(NULL, or a database without the column) get their id as timestamp, which
+keeps them in id order and before every dated row.
+"""
+from datetime import timezone
+
+import numpy as np
+from sqlalchemy import DateTime, column, inspect, select, table
+
+from rl_model.persistence.transition_store import TransitionStore
+
+HIGH_WATER_KEY = "rl_transitions_high_water"
+
+# Flattened SQL columns in STATE_KEYS order
+STATE_COLUMNS = ["s_accuracy", "s_time", "s_difficulty", "s_mastery", "s_attempts", "s_improvement"]
+NEXT_STATE_COLUMNS = ["ns_accuracy", "ns_time", "ns_difficulty", "ns_mastery", "ns_attempts", "ns_improvement"]
+
+# Lightweight table clause; avoids importing the app models (and the Supabase client)
+rl_transitions = table(
+    "rl_transitions",
+    column("id"),
+    column("student_id"),
+    *[column(name) for name in STATE_COLUMNS],
+    column("action"),
+    column("reward"),
+    *[column(name) for name in NEXT_STATE_COLUMNS],
+    column("created_at", DateTime)
+)
+
+_NUMERIC_COLUMNS = STATE_COLUMNS + ["action", "reward"] + NEXT_STATE_COLUMNS
+
+
+def _timestamp(created_at, row_id: int) -> float:
+    if created_at is None:
+        return float(row_id)
+    if created_at.tzinfo is None:
+        # SQLite CURRENT_TIMESTAMP is UTC without an offset
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def export_transitions(engine, store: TransitionStore, chunk_size: int = 50000) -> dict:
+    """
+    Append every rl_transitions row newer than the store's high-water mark.
+    Returns {"exported", "skipped", "high_water"}.
+    """
+    high_water = int(store.get_meta(HIGH_WATER_KEY, 0))
+    has_created_at = "created_at" in {c["name"] for c in inspect(engine).get_columns("rl_transitions")}
+    query_columns = [rl_transitions.c.id, rl_transitions.c.student_id] + \
+        [rl_transitions.c[name] for name in _NUMERIC_COLUMNS]
+    if has_created_at:
+        query_columns.append(rl_transitions.c.created_at)
+    else:
+        print("Warning: rl_transitions has no created_at column; using row ids as timestamps")
+    exported = skipped = 0
+    n_state = len(STATE_COLUMNS)
+    n_numeric = len(_NUMERIC_COLUMNS)
+
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(
+                select(*query_columns)
+                .where(rl_transitions.c.id > high_water)
+                .order_by(rl_transitions.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+
+            ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            # NULLs become NaN and those rows are skipped
+            values = np.array([row[2:2 + n_numeric] for row in rows], dtype=np.float64)
+            valid = ~np.isnan(values).any(axis=1)
+            student_ids = [row[1] for row, ok in zip(rows, valid) if ok]
+            timestamps = np.array([
+                _timestamp(row[2 + n_numeric] if has_created_at else None, row[0])
+                for row, ok in zip(rows, valid) if ok
+            ], dtype=np.float64)
+            values = values[valid]
+
+            store.append_batch(
+                states=values[:, :n_state],
+                actions=values[:, n_state],
+                rewards=values[:, n_state + 1],
+                next_states=values[:, n_state + 2:],
+                student_ids=student_ids,
+                timestamps=timestamps
+            )
+            high_water = int(ids[-1])
+            # Committed together with this chunk's segment
+            store.set_meta(HIGH_WATER_KEY, high_water)
+            store.flush()
+
+            exported += len(values)
+            skipped += int((~valid).sum())
+            if len(rows) < chunk_size:
+                break
+
+    return {"exported": exported, "skipped": skipped, "high_water": high_water}
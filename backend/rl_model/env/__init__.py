@@ -1,4 +1,15 @@
 # rl_model/env/__init__.py
 
-from .student_env import StudentEnv
-from .reward import compute_reward
+from .reward import compute_reward, compute_reward_batch, relabel_rewards
+from .student_simulator import StudentSimulator, SimulatorParams
+
+
+def __getattr__(name):
+    # StudentEnv (real students) and VecStudentEnv (SB3) pull in the DB / SB3; import on demand
+    if name == "StudentEnv":
+        from .student_env import StudentEnv
+        return StudentEnv
+    if name == "VecStudentEnv":
+        from .vec_student_env import VecStudentEnv
+        return VecStudentEnv
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
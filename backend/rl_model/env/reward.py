@@ -1,32 +1,98 @@
 # rl_model/env/reward.py
+"""
+The reward function, shared by serving (app.services.reward_service), the
+real-student env, the simulator and offline relabelling.
 
-def compute_reward(previous_state: dict, performance: dict) -> float:
+reward = CORRECT_ANSWER_REWARD or INCORRECT_ANSWER_PENALTY
+       + IMPROVEMENT_BONUS      if quiz accuracy > previous avg accuracy
+       + TIME_EFFICIENCY_BONUS  if quiz time/question < previous avg time
+       + FAILURE_STREAK_PENALTY if failure streak >= FAILURE_STREAK_THRESHOLD
+clipped to [-REWARD_CLIP, REWARD_CLIP] unless clip=False.
+
+compute_reward is the scalar entry point for one request; compute_reward_batch
+takes (N,) columns and computes every reward in one pass.
+"""
+import numpy as np
+from rl_model.config.env_config import EnvConfig
+
+def compute_reward(previous_state: dict, performance: dict, clip: bool = True) -> float:
     """
     Converts student outcome into a numeric reward for PPO.
     Args:
         previous_state (dict): previous student state
         performance (dict): actual performance from quiz attempt
+        clip (bool): clip to [-REWARD_CLIP, REWARD_CLIP] to stabilize PPO
     Returns:
         float: reward
     """
-    reward = 0.0
-
-    # Correctness
-    reward += 1.0 if performance.get("correct", False) else -0.5
+    reward = EnvConfig.CORRECT_ANSWER_REWARD if performance.get("correct", False) else EnvConfig.INCORRECT_ANSWER_PENALTY
 
     # Accuracy improvement
     if performance.get("accuracy", 0) > previous_state.get("avg_accuracy_last_5", 0):
-        reward += 0.5
+        reward += EnvConfig.IMPROVEMENT_BONUS
 
     # Time efficiency
     if performance.get("avg_time", 999) < previous_state.get("avg_time_per_question", 999):
-        reward += 0.3
+        reward += EnvConfig.TIME_EFFICIENCY_BONUS
 
     # Penalty for repeated failure
-    if performance.get("failure_streak", 0) >= 3:
-        reward -= 1.0
+    if performance.get("failure_streak", 0) >= EnvConfig.FAILURE_STREAK_THRESHOLD:
+        reward += EnvConfig.FAILURE_STREAK_PENALTY
+
+    if clip:
+        reward = max(-EnvConfig.REWARD_CLIP, min(reward, EnvConfig.REWARD_CLIP))
+    return float(reward)
 
-    # Clip reward to [-1, 1] to stabilize PPO
-    reward = max(-1.0, min(reward, 1.0))
 
+def compute_reward_batch(prev_accuracy, prev_time, correct, accuracy, avg_time, failure_streak, clip: bool = True):
+    """
+    Vectorized compute_reward over (N,) arrays, one entry per transition.
+    """
+    reward = np.where(correct, EnvConfig.CORRECT_ANSWER_REWARD, EnvConfig.INCORRECT_ANSWER_PENALTY)
+    reward = reward + np.where(np.asarray(accuracy) > prev_accuracy, EnvConfig.IMPROVEMENT_BONUS, 0.0)
+    reward = reward + np.where(np.asarray(avg_time) < prev_time, EnvConfig.TIME_EFFICIENCY_BONUS, 0.0)
+    reward = reward + np.where(
+        np.asarray(failure_streak) >= EnvConfig.FAILURE_STREAK_THRESHOLD, EnvConfig.FAILURE_STREAK_PENALTY, 0.0
+    )
+    if clip:
+        reward = np.clip(reward, -EnvConfig.REWARD_CLIP, EnvConfig.REWARD_CLIP)
     return reward
+
+
+def failure_streaks(correct: np.ndarray, student: np.ndarray, timestamp: np.ndarray) -> np.ndarray:
+    """
+    Consecutive failed quizzes up to and including each transition, per student
+    in time order (transitions without a student, code -1, stand alone).
+    """
+    correct = np.asarray(correct, dtype=bool)
+    student = np.asarray(student, dtype=np.int64)
+    order = np.lexsort((np.asarray(timestamp), student))
+    s, c = student[order], correct[order]
+    rows = np.arange(len(order))
+
+    new_student = np.ones(len(order), dtype=bool)
+    new_student[1:] = (s[1:] != s[:-1]) | (s[1:] < 0)
+    # Last row before each one where the streak restarted from zero
+    reset = np.maximum.accumulate(np.where(c, rows, np.where(new_student, rows - 1, -1)))
+    streak = np.empty(len(order), dtype=np.int64)
+    streak[order] = rows - reset
+    return np.where(correct, 0, streak)
+
+
+def relabel_rewards(data: dict, correct_threshold: float = EnvConfig.CORRECT_ACCURACY_THRESHOLD, clip: bool = True):
+    """
+    Recompute rewards for logged transitions (TransitionStore.load()) with the
+    current EnvConfig parameters. Quiz accuracy and time per question are
+    recovered by inverting the state EMA update; failure streaks are rebuilt
+    per student. Returns (N,) float32 rewards in the input row order.
+    """
+    from rl_model.env.student_simulator import EMA_NEW, ACC, TIME
+
+    states = np.asarray(data["state"], dtype=np.float64)
+    next_states = np.asarray(data["next_state"], dtype=np.float64)
+    prev_accuracy, prev_time = states[:, ACC], states[:, TIME]
+    accuracy = np.clip((next_states[:, ACC] - (1 - EMA_NEW) * prev_accuracy) / EMA_NEW, 0.0, 1.0)
+    avg_time = (next_states[:, TIME] - (1 - EMA_NEW) * prev_time) / EMA_NEW
+    correct = accuracy >= correct_threshold
+    streak = failure_streaks(correct, data["student"], data["timestamp"])
+    return compute_reward_batch(prev_accuracy, prev_time, correct, accuracy, avg_time, streak, clip=clip).astype(np.float32)
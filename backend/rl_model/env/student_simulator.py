@@ -0,0 +1,193 @@
+# rl_model/env/student_simulator.py
+"""
+Vectorized simulator of student state dynamics for PPO training.
+
+N simulated students are stepped at once with NumPy arrays. Each step:
+- the action picks a difficulty/mode (rl_model.data.action_mapper.ACTION_MAP),
+- a quiz of EnvConfig.MAX_QUESTIONS_PER_QUIZ questions is sampled, with the
+  expected accuracy depending on the action and the student's topic mastery,
+- the state is updated with the same EMA rule as
+  app.services.student_service.update_student_state,
+- the reward comes from rl_model.env.reward.compute_reward_batch.
+
+Per-action parameters can be fitted from logged transitions
+(SimulatorParams.fit), since the EMA update can be inverted to recover the
+quiz accuracy and time behind each logged transition.
+"""
+import numpy as np
+
+from rl_model.config.env_config import EnvConfig
+from rl_model.data.action_mapper import ACTION_MAP
+from rl_model.env.reward import compute_reward_batch
+from rl_model.utils.normalizer import STATE_KEYS, STATE_LOW, STATE_HIGH
+
+# EMA weight of the newest quiz (student_service.update_student_state)
+EMA_NEW = 0.2
+
+# Column indices in STATE_KEYS order
+ACC, TIME, DIFF, MASTERY, ATTEMPTS, IMPROVEMENT = (STATE_KEYS.index(key) for key in (
+    "avg_accuracy_last_5", "avg_time_per_question", "current_difficulty",
+    "topic_mastery", "attempts", "recent_improvement"
+))
+
+ACTION_DIFFICULTY = np.array([ACTION_MAP[a]["difficulty"] for a in range(EnvConfig.ACTIONS)], dtype=np.int64)
+# New students start from the first action at the start difficulty
+START_ACTION = int(np.argmax(ACTION_DIFFICULTY == EnvConfig.START_DIFFICULTY))
+
+
+class SimulatorParams:
+    """
+    Per-action dynamics:
+      expected accuracy = clip(accuracy_intercept[a] + accuracy_slope[a] * mastery, 0, 1)
+      quiz time        ~ time_mean[a] * lognormal(0, time_sigma[a])
+      mastery         += mastery_gain[a] * (1 - mastery) * accuracy - mastery_decay
+    """
+
+    def __init__(
+        self,
+        accuracy_intercept=(0.55, 0.35, 0.15, 0.60, 0.20),
+        accuracy_slope=(0.40, 0.55, 0.75, 0.35, 0.65),
+        time_mean=(25.0, 40.0, 60.0, 30.0, 45.0),
+        time_sigma=(0.30, 0.30, 0.35, 0.30, 0.35),
+        mastery_gain=(0.04, 0.07, 0.10, 0.06, 0.08),
+        mastery_decay: float = 0.005,
+        correct_threshold: float = EnvConfig.CORRECT_ACCURACY_THRESHOLD
+    ):
+        self.accuracy_intercept = np.asarray(accuracy_intercept, dtype=np.float64)
+        self.accuracy_slope = np.asarray(accuracy_slope, dtype=np.float64)
+        self.time_mean = np.asarray(time_mean, dtype=np.float64)
+        self.time_sigma = np.asarray(time_sigma, dtype=np.float64)
+        self.mastery_gain = np.asarray(mastery_gain, dtype=np.float64)
+        self.mastery_decay = float(mastery_decay)
+        self.correct_threshold = float(correct_threshold)
+
+    def to_dict(self) -> dict:
+        return {
+            "accuracy_intercept": self.accuracy_intercept.tolist(),
+            "accuracy_slope": self.accuracy_slope.tolist(),
+            "time_mean": self.time_mean.tolist(),
+            "time_sigma": self.time_sigma.tolist(),
+            "mastery_gain": self.mastery_gain.tolist(),
+            "mastery_decay": self.mastery_decay,
+            "correct_threshold": self.correct_threshold,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SimulatorParams":
+        return cls(**data)
+
+    @classmethod
+    def fit(cls, data: dict, min_samples: int = 20) -> "SimulatorParams":
+        """
+        Fit per-action parameters from columnar transitions (TransitionStore.load()).
+        Actions with fewer than `min_samples` transitions keep the defaults.
+        """
+        params = cls()
+        states = np.asarray(data["state"], dtype=np.float64)
+        next_states = np.asarray(data["next_state"], dtype=np.float64)
+        actions = np.asarray(data["action"], dtype=np.int64)
+
+        # Invert the EMA update to recover the quiz outcome behind each transition
+        quiz_acc = np.clip((next_states[:, ACC] - (1 - EMA_NEW) * states[:, ACC]) / EMA_NEW, 0.0, 1.0)
+        quiz_time = (next_states[:, TIME] - (1 - EMA_NEW) * states[:, TIME]) / EMA_NEW
+        mastery = states[:, MASTERY]
+        mastery_delta = next_states[:, MASTERY] - mastery
+
+        for a in range(EnvConfig.ACTIONS):
+            rows = actions == a
+            if rows.sum() < min_samples:
+                continue
+            m, acc = mastery[rows], quiz_acc[rows]
+            if np.ptp(m) > 1e-6:
+                slope, intercept = np.polyfit(m, acc, 1)
+            else:
+                slope, intercept = 0.0, acc.mean()
+            params.accuracy_slope[a] = slope
+            params.accuracy_intercept[a] = intercept
+
+            times = quiz_time[rows]
+            times = times[times > 0]
+            if len(times) >= min_samples:
+                log_t = np.log(times)
+                params.time_mean[a] = float(np.exp(log_t.mean()))
+                params.time_sigma[a] = float(max(log_t.std(), 1e-3))
+
+            # mastery_delta ~ gain * (1 - m) * acc, least squares through the origin
+            x = (1 - m) * acc
+            if np.dot(x, x) > 1e-9:
+                params.mastery_gain[a] = float(max(np.dot(x, mastery_delta[rows] + params.mastery_decay) / np.dot(x, x), 0.0))
+        return params
+
+
+class StudentSimulator:
+    """
+    Batched student dynamics; all state is (n_students, ...) arrays.
+    Observations are raw states in STATE_KEYS order (like StudentStateEncoder).
+    """
+
+    def __init__(self, n_students: int, params: SimulatorParams = None, seed: int = None):
+        self.n = n_students
+        self.params = params or SimulatorParams()
+        self.rng = np.random.default_rng(seed)
+        self.state = np.zeros((n_students, len(STATE_KEYS)), dtype=np.float64)
+        self.failure_streak = np.zeros(n_students, dtype=np.int64)
+        self.steps = np.zeros(n_students, dtype=np.int64)
+
+    def seed(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, indices: np.ndarray = None) -> np.ndarray:
+        """Start new students (all, or the given indices). Returns the full observation matrix."""
+        idx = np.arange(self.n) if indices is None else np.asarray(indices)
+        k = len(idx)
+        if k:
+            s = self.state
+            s[idx, MASTERY] = self.rng.beta(2.0, 3.0, size=k)
+            p = self.params
+            base_acc = np.clip(p.accuracy_intercept[START_ACTION] + p.accuracy_slope[START_ACTION] * s[idx, MASTERY], 0.0, 1.0)
+            s[idx, ACC] = np.clip(base_acc + self.rng.normal(0.0, 0.1, size=k), 0.0, 1.0)
+            s[idx, TIME] = p.time_mean[START_ACTION] * self.rng.lognormal(0.0, 0.2, size=k)
+            s[idx, DIFF] = EnvConfig.START_DIFFICULTY
+            s[idx, ATTEMPTS] = 0
+            s[idx, IMPROVEMENT] = 0.0
+            self.failure_streak[idx] = 0
+            self.steps[idx] = 0
+        return self.observe()
+
+    def observe(self) -> np.ndarray:
+        return np.clip(self.state, STATE_LOW, STATE_HIGH).astype(np.float32)
+
+    def step(self, actions: np.ndarray):
+        """
+        Apply one action per student. Returns (obs, rewards, dones); finished
+        students are NOT reset here (the VecEnv wrapper does that).
+        """
+        p = self.params
+        a = np.asarray(actions, dtype=np.int64).reshape(-1)
+        s = self.state
+        prev_acc = s[:, ACC].copy()
+        prev_time = s[:, TIME].copy()
+
+        # Quiz outcome
+        expected = np.clip(p.accuracy_intercept[a] + p.accuracy_slope[a] * s[:, MASTERY], 0.0, 1.0)
+        n_questions = EnvConfig.MAX_QUESTIONS_PER_QUIZ
+        accuracy = self.rng.binomial(n_questions, expected) / n_questions
+        quiz_time = p.time_mean[a] * self.rng.lognormal(0.0, p.time_sigma[a])
+        correct = accuracy >= p.correct_threshold
+        self.failure_streak = np.where(correct, 0, self.failure_streak + 1)
+
+        # Same EMA rule as student_service.update_student_state
+        s[:, ACC] = prev_acc * (1 - EMA_NEW) + accuracy * EMA_NEW
+        s[:, TIME] = prev_time * (1 - EMA_NEW) + quiz_time * EMA_NEW
+        s[:, MASTERY] = np.clip(
+            s[:, MASTERY] + p.mastery_gain[a] * (1 - s[:, MASTERY]) * accuracy - p.mastery_decay, 0.0, 1.0
+        )
+        s[:, DIFF] = np.clip(ACTION_DIFFICULTY[a], EnvConfig.MIN_DIFFICULTY, EnvConfig.MAX_DIFFICULTY)
+        s[:, ATTEMPTS] += 1
+        s[:, IMPROVEMENT] = np.clip(s[:, ACC] - prev_acc, -1.0, 1.0)
+
+        rewards = compute_reward_batch(prev_acc, prev_time, correct, accuracy, quiz_time, self.failure_streak)
+
+        self.steps += 1
+        dones = self.steps >= EnvConfig.MAX_STEPS_PER_EPISODE
+        return self.observe(), rewards.astype(np.float32), dones
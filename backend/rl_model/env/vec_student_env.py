@@ -0,0 +1,114 @@
+# rl_model/env/vec_student_env.py
+"""
+SB3 VecEnv over the vectorized StudentSimulator: one NumPy step advances
+every simulated student, so PPO collects rollouts without per-env Python loops.
+"""
+import time
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from app.utils.action_mask import get_allowed_actions_batch, apply_action_mask
+from rl_model.config.env_config import EnvConfig
+from rl_model.env.student_simulator import StudentSimulator, SimulatorParams
+from rl_model.utils.normalizer import STATE_LOW, STATE_HIGH, normalize_states
+
+
+class VecStudentEnv(VecEnv):
+    """
+    num_envs simulated students stepped together.
+
+    normalize_obs: feed normalized [0, 1] states (DecisionEngine style) instead of
+                   raw states (RLService / StudentStateEncoder style).
+    apply_mask:    apply the serving action mask before simulating, so the policy
+                   is trained on the actions students actually receive.
+    """
+
+    def __init__(
+        self,
+        num_envs: int = 256,
+        params: SimulatorParams = None,
+        seed: int = None,
+        normalize_obs: bool = False,
+        apply_mask: bool = True
+    ):
+        self.render_mode = None
+        self.normalize_obs = normalize_obs
+        self.apply_mask = apply_mask
+        self.sim = StudentSimulator(num_envs, params=params, seed=seed)
+
+        if normalize_obs:
+            observation_space = spaces.Box(0.0, 1.0, shape=(EnvConfig.STATE_DIM,), dtype=np.float32)
+        else:
+            observation_space = spaces.Box(
+                STATE_LOW.astype(np.float32), STATE_HIGH.astype(np.float32), dtype=np.float32
+            )
+        super().__init__(num_envs, observation_space, spaces.Discrete(EnvConfig.ACTIONS))
+
+        self._actions = None
+        self._episode_returns = np.zeros(num_envs, dtype=np.float64)
+        self._episode_lengths = np.zeros(num_envs, dtype=np.int64)
+        self._start_time = time.time()
+
+    def _obs(self, raw: np.ndarray) -> np.ndarray:
+        return normalize_states(raw) if self.normalize_obs else raw
+
+    # -----------------------------
+    # VecEnv API
+    # -----------------------------
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.sim.seed(self._seeds[0])
+        self._reset_seeds()
+        self._episode_returns[:] = 0.0
+        self._episode_lengths[:] = 0
+        return self._obs(self.sim.reset())
+
+    def step_async(self, actions: np.ndarray):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+
+    def step_wait(self):
+        actions = self._actions
+        if self.apply_mask:
+            actions = apply_action_mask(actions, get_allowed_actions_batch(self.sim.observe()))
+
+        raw_obs, rewards, dones = self.sim.step(actions)
+        self._episode_returns += rewards
+        self._episode_lengths += 1
+
+        infos = [{} for _ in range(self.num_envs)]
+        done_idx = np.flatnonzero(dones)
+        if len(done_idx):
+            terminal_obs = self._obs(raw_obs[done_idx])
+            elapsed = round(time.time() - self._start_time, 6)
+            for j, i in enumerate(done_idx):
+                infos[i]["terminal_observation"] = terminal_obs[j]
+                # Episodes end on the step limit, not a terminal state
+                infos[i]["TimeLimit.truncated"] = True
+                infos[i]["episode"] = {
+                    "r": float(self._episode_returns[i]),
+                    "l": int(self._episode_lengths[i]),
+                    "t": elapsed,
+                }
+            self._episode_returns[done_idx] = 0.0
+            self._episode_lengths[done_idx] = 0
+            raw_obs = self.sim.reset(done_idx)
+
+        return self._obs(raw_obs), rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name: str, indices=None):
+        return [getattr(self, attr_name)] * len(list(self._get_indices(indices)))
+
+    def set_attr(self, attr_name: str, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(list(self._get_indices(indices)))
@@ -1,3 +1,14 @@
 # rl_model/inference/__init__.py
 
-from .decision_engine import DecisionEngine
\ No newline at end of file
+from .numpy_policy import NumpyPolicy
+from .batch_scheduler import InferenceScheduler
+from .decision_cache import DecisionCache
+from .lookup_policy import LookupPolicy
+
+
+def __getattr__(name):
+    # DecisionEngine pulls in the DB-backed env; import it only when asked for
+    if name == "DecisionEngine":
+        from .decision_engine import DecisionEngine
+        return DecisionEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,198 @@
+# rl_model/inference/batch_scheduler.py
+"""
+Micro-batching scheduler for policy inference.
+
+Concurrent callers submit their states; a single worker thread gathers them
+until `max_batch_size` rows are queued or `max_wait_ms` has passed since the
+first one arrived, runs one vectorized forward pass per model and resolves
+each caller's future with its slice of the actions. Callers may pass the model
+they snapshotted for their request, so a hot-swap never mixes models within a
+request; requests for different models in one gather window run separately.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets (rows per forward pass)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class InferenceScheduler:
+    """
+    Gathers predict() calls from many threads into batched forward passes.
+    Calls without a model use `model_provider()` (e.g. ModelRegistry.get),
+    looked up when their batch runs.
+    """
+
+    def __init__(self, model_provider, max_batch_size: int = 32, max_wait_ms: float = 2.0, wait_samples: int = 2048):
+        self.model_provider = model_provider
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # Metrics (updated by the worker thread only)
+        self._started_at = None
+        self._requests = 0
+        self._rows = 0
+        self._batches = 0
+        self._errors = 0
+        self._forward_seconds = 0.0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)  # last bucket: larger batches
+        self._queue_waits = deque(maxlen=wait_samples)
+
+    # -----------------------------
+    # Caller side
+    # -----------------------------
+    def submit(self, states, model=None) -> Future:
+        """
+        Queue states of shape (obs_dim,) or (N, obs_dim) for `model` (default:
+        model_provider() when the batch runs).
+        The future resolves to an int64 array of N actions.
+        """
+        self._ensure_started()
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim == 1:
+            states = states.reshape(1, -1)
+        future = Future()
+        self._queue.put((states, future, time.perf_counter(), model))
+        return future
+
+    def predict(self, observation, deterministic: bool = True, timeout: float = 5.0, model=None):
+        """
+        Drop-in for model.predict (deterministic only): blocks until the batch
+        containing this call has run. Returns (actions, None).
+        """
+        if not deterministic:
+            raise ValueError("InferenceScheduler only serves deterministic predictions")
+        obs = np.asarray(observation, dtype=np.float32)
+        actions = self.submit(obs, model).result(timeout=timeout)
+        return (actions if obs.ndim == 2 else actions[0]), None
+
+    # -----------------------------
+    # Worker side
+    # -----------------------------
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="rl-inference-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._queue.put(None)  # wake the worker
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._queue.get()
+            if item is None:
+                continue
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            self._run_batch(batch)
+
+        # Fail whatever is still queued so no caller waits forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Inference scheduler stopped"))
+
+    def _run_batch(self, batch: list):
+        started = time.perf_counter()
+        for _, _, enqueued_at, _ in batch:
+            self._queue_waits.append(started - enqueued_at)
+
+        # One forward pass per model; calls without a model share the provider's
+        groups = {}
+        for item in batch:
+            model = item[3]
+            groups.setdefault(None if model is None else id(model), (model, []))[1].append(item)
+        for model, items in groups.values():
+            self._run_group(model, items)
+
+    def _run_group(self, model, items: list):
+        started = time.perf_counter()
+        rows = sum(len(states) for states, _, _, _ in items)
+        try:
+            if model is None:
+                model = self.model_provider()
+            if model is None:
+                raise RuntimeError("No RL model loaded")
+            states = np.concatenate([states for states, _, _, _ in items])
+            actions, _ = model.predict(states, deterministic=True)
+            actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+        except Exception as e:
+            self._errors += 1
+            for _, future, _, _ in items:
+                future.set_exception(e)
+            return
+        finally:
+            self._forward_seconds += time.perf_counter() - started
+
+        offset = 0
+        for states, future, _, _ in items:
+            future.set_result(actions[offset:offset + len(states)])
+            offset += len(states)
+
+        self._requests += len(items)
+        self._rows += rows
+        self._batches += 1
+        bucket = next((i for i, upper in enumerate(BATCH_SIZE_BUCKETS) if rows <= upper), len(BATCH_SIZE_BUCKETS))
+        self._histogram[bucket] += 1
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+    def metrics(self) -> dict:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        waits_ms = np.array(self._queue_waits, dtype=np.float64) * 1000.0
+        labels = [f"<={upper}" for upper in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "requests": self._requests,
+            "rows": self._rows,
+            "batches": self._batches,
+            "errors": self._errors,
+            "queue_depth": self._queue.qsize(),
+            "throughput_rows_per_sec": self._rows / elapsed if elapsed > 0 else 0.0,
+            "mean_batch_size": self._rows / self._batches if self._batches else 0.0,
+            "mean_forward_ms": self._forward_seconds * 1000.0 / self._batches if self._batches else 0.0,
+            "batch_size_histogram": dict(zip(labels, self._histogram)),
+            "queue_wait_ms": {
+                "mean": float(waits_ms.mean()) if len(waits_ms) else 0.0,
+                "p50": float(np.percentile(waits_ms, 50)) if len(waits_ms) else 0.0,
+                "p95": float(np.percentile(waits_ms, 95)) if len(waits_ms) else 0.0,
+                "max": float(waits_ms.max()) if len(waits_ms) else 0.0,
+            },
+        }
@@ -0,0 +1,82 @@
+# rl_model/inference/decision_cache.py
+"""
+LRU cache of policy decisions keyed on a quantized student state.
+
+Each of the 6 state features is clipped to its STATE_RANGES interval and
+snapped to one of `levels` steps, so near-identical states share an entry.
+Keys include the model version; the cache is also cleared on model swap.
+Cached values are the raw policy actions (before masking), since the
+action mask depends on the exact state.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from rl_model.utils.normalizer import STATE_LOW, STATE_HIGH
+
+_LOW = STATE_LOW.astype(np.float32)
+_HIGH = STATE_HIGH.astype(np.float32)
+
+
+class DecisionCache:
+    """
+    Thread-safe LRU of (model_version, quantized state) -> action.
+    """
+
+    def __init__(self, max_entries: int = 50000, levels: int = 100):
+        self.max_entries = max_entries
+        self.levels = levels
+        self._scale = levels / (_HIGH - _LOW)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, states: np.ndarray) -> list:
+        """Quantized keys for a batch of raw states, shape (N, 6)."""
+        states = np.asarray(states, dtype=np.float32).reshape(-1, len(_LOW))
+        quantized = np.rint((np.clip(states, _LOW, _HIGH) - _LOW) * self._scale).astype(np.int16)
+        return [row.tobytes() for row in quantized]
+
+    def lookup(self, version, states: np.ndarray):
+        """
+        Returns (actions, keys): actions is an int64 array with -1 for misses.
+        """
+        keys = self.keys(states)
+        actions = np.full(len(keys), -1, dtype=np.int64)
+        with self._lock:
+            for i, key in enumerate(keys):
+                action = self._entries.get((version, key))
+                if action is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end((version, key))
+                actions[i] = action
+                self.hits += 1
+        return actions, keys
+
+    def store(self, version, keys: list, actions):
+        with self._lock:
+            for key, action in zip(keys, actions):
+                self._entries[(version, key)] = int(action)
+                self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, *_):
+        """Drop every entry (usable directly as a ModelRegistry listener)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "levels": self.levels,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
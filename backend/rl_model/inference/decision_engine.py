@@ -2,17 +2,28 @@
 import numpy as np
 from rl_model.model.ppo_agent import PPOAgent
 from rl_model.env.student_env import StudentEnv
-from rl_model.utils.action_mask import get_allowed_actions
+from app.utils.action_mask import get_allowed_actions
 from rl_model.utils.normalizer import normalize_state
+from rl_model.config.ppo_config import PPOConfig
 
 class DecisionEngine:
     """
     Inference engine to get next PPO action for a student.
     """
 
-    def __init__(self, db_session):
+    def __init__(self, db_session, mode: str = "ppo", lookup_path: str = PPOConfig.LOOKUP_EXPORT_PATH):
+        """
+        mode="ppo" serves the shared PPO model; mode="lookup" serves the
+        distilled grid from rl_model/scripts/distill_policy.py (--space normalized).
+        """
         self.db = db_session
-        self.agent = PPOAgent()             # Loads pre-trained PPO
+        if mode == "lookup":
+            from rl_model.inference.lookup_policy import LookupPolicy
+            self.agent = PPOAgent(model=LookupPolicy.load(lookup_path))
+        elif mode == "ppo":
+            self.agent = PPOAgent()         # Loads pre-trained PPO
+        else:
+            raise ValueError(f"Unknown decision mode '{mode}'")
         self.env = StudentEnv(db_session)
 
     def predict_next_quiz(self, student_obj, performance: dict = None):
@@ -0,0 +1,81 @@
+# rl_model/inference/lookup_policy.py
+"""
+Dense quantized lookup grid distilled from the PPO policy.
+The .npz artifact is produced by rl_model/scripts/distill_policy.py.
+A decision is a clip, a rounding and one array index.
+"""
+import os
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class LookupPolicy:
+    """
+    Action table over a regular grid: feature i is snapped to one of levels[i]
+    points spanning [low[i], high[i]] and the table holds the teacher's action there.
+    """
+
+    def __init__(self, table: np.ndarray, low: np.ndarray, high: np.ndarray):
+        self.table = np.ascontiguousarray(table, dtype=np.uint8)
+        self.levels = np.array(self.table.shape, dtype=np.int64)
+        self.low = np.asarray(low, dtype=np.float32)
+        self.high = np.asarray(high, dtype=np.float32)
+        self.obs_dim = len(self.levels)
+        self._scale = ((self.levels - 1) / (self.high - self.low)).astype(np.float32)
+        self._flat = self.table.reshape(-1)
+        # Row-major strides in cells, so a grid index is a dot product
+        self._strides = np.array(
+            [int(np.prod(self.levels[i + 1:])) for i in range(self.obs_dim)], dtype=np.int64
+        )
+        # Plain-Python copies for predict_one (table copy built on first use)
+        self._bounds = list(zip(self.low.tolist(), self.high.tolist(), self._scale.tolist(), self._strides.tolist()))
+        self._table_list = None
+
+    @classmethod
+    def load(cls, path: str) -> "LookupPolicy":
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported lookup format version {version}")
+            return cls(data["table"], data["low"], data["high"])
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            format_version=np.array(FORMAT_VERSION),
+            table=self.table,
+            low=self.low,
+            high=self.high,
+        )
+        os.replace(tmp_path, path)
+
+    def grid_points(self) -> np.ndarray:
+        """Every grid point in table order, shape (prod(levels), obs_dim)."""
+        axes = [np.linspace(lo, hi, n, dtype=np.float32) for lo, hi, n in zip(self.low, self.high, self.levels)]
+        mesh = np.meshgrid(*axes, indexing="ij")
+        return np.stack([m.reshape(-1) for m in mesh], axis=1)
+
+    def cell_indices(self, obs: np.ndarray) -> np.ndarray:
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        idx = np.rint((np.clip(x, self.low, self.high) - self.low) * self._scale).astype(np.int64)
+        return idx @ self._strides
+
+    def predict(self, observation, deterministic: bool = True):
+        """Same contract as PPO.predict: returns (actions, None)."""
+        obs = np.asarray(observation, dtype=np.float32)
+        if obs.ndim == 1:
+            return self.predict_one(obs), None
+        actions = self._flat[self.cell_indices(obs)].astype(np.int64)
+        return actions, None
+
+    def predict_one(self, observation) -> int:
+        """Single-state lookup in plain Python; avoids NumPy call overhead on the hot path."""
+        if self._table_list is None:
+            self._table_list = self._flat.tolist()
+        index = 0
+        for value, (low, high, scale, stride) in zip(observation, self._bounds):
+            value = low if value < low else high if value > high else value
+            index += int(round((float(value) - low) * scale)) * stride
+        return self._table_list[index]
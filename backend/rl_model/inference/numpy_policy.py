@@ -0,0 +1,91 @@
+# rl_model/inference/numpy_policy.py
+"""
+Pure-NumPy inference for an exported PPO actor network.
+The .npz artifact is produced by rl_model/scripts/export_model.py and holds the
+policy MLP + action head weights, so serving needs neither torch nor gym.
+"""
+import os
+import numpy as np
+
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, np.float32(0.0)),
+}
+
+FORMAT_VERSION = 1
+
+
+class NumpyPolicy:
+    """
+    Deterministic forward pass of a PPO MlpPolicy actor:
+    obs -> [Linear -> activation]* -> action logits -> argmax.
+    """
+
+    def __init__(self, weights: list, biases: list, activations: list):
+        if not (len(weights) == len(biases) == len(activations)):
+            raise ValueError("weights, biases and activations must have the same length")
+        for name in activations:
+            if name not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation '{name}'")
+        # Stored as (in, out) float32 so a forward pass is x @ W + b
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+        self.obs_dim = self.weights[0].shape[0]
+        self.n_actions = self.weights[-1].shape[1]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported policy format version {version}")
+            n_layers = int(data["n_layers"])
+            weights = [data[f"W{i}"] for i in range(n_layers)]
+            biases = [data[f"b{i}"] for i in range(n_layers)]
+            activations = [str(a) for a in data["activations"]]
+        return cls(weights, biases, activations)
+
+    def save(self, path: str):
+        arrays = {
+            "format_version": np.array(FORMAT_VERSION),
+            "n_layers": np.array(len(self.weights)),
+            "activations": np.array(self.activations),
+        }
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"W{i}"] = w
+            arrays[f"b{i}"] = b
+        # Write then rename so a watching server never loads a half-written file
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def logits(self, obs: np.ndarray) -> np.ndarray:
+        """Action logits for a batch of observations, shape (N, obs_dim) -> (N, n_actions)."""
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            x = ACTIVATIONS[activation](x @ w + b)
+        return x
+
+    def action_probabilities(self, obs: np.ndarray) -> np.ndarray:
+        """Softmax over the logits, shape (N, n_actions)."""
+        logits = self.logits(obs).astype(np.float64)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, observation, deterministic: bool = True, rng: np.random.Generator = None):
+        """
+        Same contract as PPO.predict: returns (actions, None).
+        A single observation (obs_dim,) gives a scalar action, a batch (N, obs_dim) gives (N,).
+        """
+        obs = np.asarray(observation, dtype=np.float32)
+        vectorized = obs.ndim == 2
+        if deterministic:
+            actions = self.logits(obs).argmax(axis=1)
+        else:
+            rng = rng or np.random.default_rng()
+            probs = self.action_probabilities(obs)
+            actions = (probs.cumsum(axis=1) > rng.random((len(probs), 1))).argmax(axis=1)
+        return (actions if vectorized else actions[0]), None
@@ -28,5 +28,6 @@ sample_transitions = [
 # Log transitions
 for t in sample_transitions:
     logger.log_transition(t)
+logger.flush()
 
 print("Sample transitions logged!")
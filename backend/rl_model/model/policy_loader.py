@@ -1,23 +1,42 @@
 # rl_model/model/policy_loader.py
-from stable_baselines3 import PPO
+import os
 from rl_model.config.ppo_config import PPOConfig
 
-def load_model(path: str = None):
+def load_model(path: str = None, env=None):
     """
     Load PPO model from file or create a new one.
+    A new model trains on the vectorized student simulator unless an env is given.
     """
+    from stable_baselines3 import PPO
+
     if path:
-        model = PPO.load(path)
+        if env is None:
+            model = PPO.load(path)
+        else:
+            # Rollout size follows the new env count, not the one the model was saved with
+            model = PPO.load(path, env=env, **PPOConfig.rollout_kwargs(env.num_envs))
     else:
-        from stable_baselines3.common.env_util import DummyVecEnv
-        import gym
-        # Placeholder env for initialization; replaced in real usage
-        dummy_env = DummyVecEnv([lambda: gym.make('CartPole-v1')])
-        model = PPO("MlpPolicy", dummy_env, **PPOConfig.to_dict())
+        if env is None:
+            from rl_model.env.vec_student_env import VecStudentEnv
+            env = VecStudentEnv(num_envs=PPOConfig.ENVS_PER_WORKER, seed=PPOConfig.SEED)
+        model = PPO("MlpPolicy", env, **PPOConfig.to_dict(env.num_envs))
     return model
 
-def save_model(model: PPO, path: str):
+def save_model(model, path: str):
     """
     Save PPO model to file.
     """
     model.save(path)
+
+def load_inference_policy(model_path: str, policy_path: str = None):
+    """
+    Load a policy for serving. Prefers the NumPy export (no torch/gym import)
+    unless the zip is newer (a model dropped in without re-exporting); then the
+    full SB3 model is used. Both expose predict(obs, deterministic=True).
+    """
+    if policy_path and os.path.exists(policy_path) and (
+        not os.path.exists(model_path) or os.path.getmtime(policy_path) >= os.path.getmtime(model_path)
+    ):
+        from rl_model.inference.numpy_policy import NumpyPolicy
+        return NumpyPolicy.load(policy_path)
+    return load_model(model_path)
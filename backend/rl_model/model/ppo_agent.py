@@ -1,19 +1,23 @@
 # rl_model/model/ppo_agent.py
 import numpy as np
-from stable_baselines3 import PPO
-from rl_model.utils.state_encoder import StudentStateEncoder
-from rl_model.config.ppo_config import settings
-from rl_model.model.policy_loader import load_model
+from app.utils.state_encoder import StudentStateEncoder
+from rl_model.persistence.model_registry import get_model_registry
 
 class PPOAgent:
     """
     PPO agent wrapper for real student inference.
     """
 
-    def __init__(self):
-        # Load pre-trained PPO
-        self.model: PPO = load_model(settings.PPO_MODEL_PATH)
+    def __init__(self, model=None):
+        # Pre-trained PPO from the shared registry (loaded once per process),
+        # unless a specific policy (e.g. a distilled LookupPolicy) is given
+        self.registry = get_model_registry()
         self.encoder = StudentStateEncoder()
+        self._model = model
+
+    @property
+    def model(self):
+        return self._model if self._model is not None else self.registry.get()
 
     def predict(self, state_vec: np.ndarray, mask: list = None) -> int:
         """
@@ -1,4 +1,6 @@
 # rl_model/persistence/__init__.py
 
 from .model_store import ModelStore
+from .model_registry import ModelRegistry
 from .rollout_logger import RolloutLogger
+from .transition_store import TransitionStore
@@ -0,0 +1,195 @@
+# rl_model/persistence/model_registry.py
+"""
+Process-wide registry of the serving PPO policy.
+
+Every consumer (RLService, the rl_policy router, PPOAgent) reads the model
+through one registry instead of loading its own copy. The model is loaded
+lazily on first use through ModelStore and can be hot-swapped: a new artifact
+is fully loaded before the current (version, model) reference is replaced,
+so in-flight requests keep the model they started with.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from rl_model.persistence.model_store import ModelStore
+
+
+class ModelRegistry:
+    """
+    Versioned, lazily loaded model holder with atomic swap.
+    """
+
+    def __init__(self, store: ModelStore, name: str, max_versions: int = 3):
+        self.store = store
+        self.name = name
+        self.max_versions = max_versions
+        self._lock = threading.Lock()     # serializes loads/swaps, never held by readers
+        self._current = (None, None)      # (version, model), replaced as a whole
+        self._versions = OrderedDict()    # version -> {"model", "name", "loaded_at", "mtime"}
+        self._next_version = 1
+        self._loaded_mtime = None
+        self._load_attempted = False
+        self._listeners = []
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+
+    # -----------------------------
+    # Read path
+    # -----------------------------
+    def get(self):
+        """Current model, or None if no artifact could be loaded."""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """
+        (version, model) pair read atomically. Use this when the version must
+        match the model that produced a result (e.g. as a cache key).
+        """
+        if not self._load_attempted:
+            self._load_initial()
+        return self._current
+
+    @property
+    def version(self):
+        return self.snapshot()[0]
+
+    def _load_initial(self):
+        with self._lock:
+            if self._load_attempted:
+                return
+            try:
+                self._load_and_swap(self.name)
+            except Exception as e:
+                print(f"Warning: RL model '{self.name}' not loaded from {self.store.save_dir}: {e}")
+            finally:
+                self._load_attempted = True
+
+    # -----------------------------
+    # Swap path
+    # -----------------------------
+    def reload(self, name: str = None) -> int:
+        """
+        Load the artifact `name` (default: the registry's model) and make it current.
+        Raises if it cannot be loaded; the current model is kept in that case.
+        """
+        with self._lock:
+            version = self._load_and_swap(name or self.name)
+            self._load_attempted = True
+        self._notify(version)
+        return version
+
+    def rollback(self, version: int) -> int:
+        """Make a previously loaded version current again."""
+        with self._lock:
+            if version not in self._versions:
+                raise KeyError(f"Model version {version} is not loaded")
+            self._current = (version, self._versions[version]["model"])
+        print(f"RL model rolled back to version {version}")
+        self._notify(version)
+        return version
+
+    def _load_and_swap(self, name: str) -> int:
+        # Caller holds self._lock
+        mtime = self.store.artifact_mtime(name)
+        model = self.store.load_inference_policy(name)
+        version = self._next_version
+        self._next_version += 1
+        self._versions[version] = {
+            "model": model,
+            "name": name,
+            "loaded_at": time.time(),
+            "mtime": mtime,
+        }
+        while len(self._versions) > self.max_versions:
+            self._versions.popitem(last=False)
+        if name == self.name:
+            self._loaded_mtime = mtime
+        self._current = (version, model)
+        print(f"RL model '{name}' loaded as version {version} ({type(model).__name__})")
+        return version
+
+    def versions(self) -> list:
+        current_version = self._current[0]
+        return [
+            {
+                "version": version,
+                "name": info["name"],
+                "backend": type(info["model"]).__name__,
+                "loaded_at": info["loaded_at"],
+                "current": version == current_version,
+            }
+            for version, info in self._versions.items()
+        ]
+
+    # -----------------------------
+    # Listeners (e.g. caches keyed by model output)
+    # -----------------------------
+    def add_listener(self, callback):
+        """callback(version) is called after every swap."""
+        self._listeners.append(callback)
+
+    def _notify(self, version: int):
+        for callback in list(self._listeners):
+            try:
+                callback(version)
+            except Exception as e:
+                print(f"Model registry listener error: {e}")
+
+    # -----------------------------
+    # File watch
+    # -----------------------------
+    def check_for_updates(self) -> bool:
+        """Reload if the artifact on disk changed since it was loaded. Returns True on swap."""
+        mtime = self.store.artifact_mtime(self.name)
+        if mtime is None or mtime == self._loaded_mtime:
+            return False
+        try:
+            self.reload()
+            return True
+        except Exception as e:
+            # Keep serving the current model; retried on the next change
+            self._loaded_mtime = mtime
+            print(f"RL model reload failed, keeping version {self._current[0]}: {e}")
+            return False
+
+    def start_watching(self, interval: float):
+        if interval <= 0 or (self._watch_thread and self._watch_thread.is_alive()):
+            return
+        self._watch_stop.clear()
+
+        def _watch():
+            while not self._watch_stop.wait(interval):
+                self.check_for_updates()
+
+        self._watch_thread = threading.Thread(target=_watch, name="model-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread:
+            self._watch_thread.join(5.0)
+            self._watch_thread = None
+
+
+def registry_from_path(model_path: str, max_versions: int = 3) -> ModelRegistry:
+    """Registry for a model given by its zip path, e.g. 'rl_model/models/ppo_adaptive_learning.zip'."""
+    save_dir, filename = os.path.split(model_path)
+    name = filename[:-4] if filename.endswith(".zip") else filename
+    return ModelRegistry(ModelStore(save_dir or "."), name, max_versions=max_versions)
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """The process-wide registry for settings.PPO_MODEL_PATH (created on first call, loaded on first use)."""
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                from app.core.config import settings
+                _default_registry = registry_from_path(settings.PPO_MODEL_PATH)
+    return _default_registry
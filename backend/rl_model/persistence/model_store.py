@@ -1,6 +1,7 @@
 # rl_model/persistence/model_store.py
+import json
 import os
-from stable_baselines3 import PPO
+import re
 
 class ModelStore:
     """
@@ -11,7 +12,7 @@ class ModelStore:
         self.save_dir = save_dir
         os.makedirs(self.save_dir, exist_ok=True)
 
-    def save_model(self, model: PPO, name: str):
+    def save_model(self, model, name: str):
         """
         Save PPO model weights.
         """
@@ -19,11 +20,96 @@ class ModelStore:
         model.save(path)
         return path
 
-    def load_model(self, name: str) -> PPO:
+    def load_model(self, name: str):
         """
         Load PPO model weights.
         """
         path = os.path.join(self.save_dir, f"{name}.zip")
         if not os.path.exists(path):
             raise FileNotFoundError(f"Model file not found: {path}")
+        from stable_baselines3 import PPO
         return PPO.load(path)
+
+    def model_path(self, name: str) -> str:
+        return os.path.join(self.save_dir, f"{name}.zip")
+
+    def policy_path(self, name: str) -> str:
+        """NumPy export of the actor written by rl_model/scripts/export_model.py."""
+        return os.path.join(self.save_dir, f"{name}_policy.npz")
+
+    def load_inference_policy(self, name: str):
+        """
+        Load a model for serving: the NumPy export if present, else the SB3 zip.
+        """
+        from rl_model.model.policy_loader import load_inference_policy
+        model_path = self.model_path(name)
+        policy_path = self.policy_path(name)
+        if not os.path.exists(policy_path) and not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        return load_inference_policy(model_path, policy_path)
+
+    def artifact_mtime(self, name: str):
+        """Latest modification time of the model's artifacts, or None if there are none."""
+        mtimes = [
+            os.path.getmtime(path)
+            for path in (self.model_path(name), self.policy_path(name))
+            if os.path.exists(path)
+        ]
+        return max(mtimes) if mtimes else None
+
+    # -----------------------------
+    # Versioned checkpoints
+    # -----------------------------
+    def version_name(self, name: str, version: int) -> str:
+        return f"{name}_v{version:04d}"
+
+    def list_versions(self, name: str) -> list:
+        """Saved version numbers of `name`, ascending."""
+        pattern = re.compile(rf"^{re.escape(name)}_v(\d+)\.zip$")
+        matches = (pattern.match(filename) for filename in os.listdir(self.save_dir))
+        return sorted(int(match.group(1)) for match in matches if match)
+
+    def save_version(self, model, name: str) -> int:
+        """Save `model` as the next version of `name`; returns the version number."""
+        versions = self.list_versions(name)
+        version = versions[-1] + 1 if versions else 1
+        self.save_model(model, self.version_name(name, version))
+        return version
+
+    def latest_checkpoint(self, name: str):
+        """Zip path of the newest version of `name`, else `{name}.zip`, else None."""
+        versions = self.list_versions(name)
+        if versions:
+            return self.model_path(self.version_name(name, versions[-1]))
+        path = self.model_path(name)
+        return path if os.path.exists(path) else None
+
+    def load_metadata(self, name: str) -> dict:
+        """JSON metadata kept alongside the model (e.g. training watermarks)."""
+        path = os.path.join(self.save_dir, f"{name}_meta.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def save_metadata(self, name: str, metadata: dict):
+        path = os.path.join(self.save_dir, f"{name}_meta.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def best_checkpoint(self):
+        """
+        Path of the best checkpoint listed in this directory's manifest.json
+        (written by rl_model.training.callbacks.TrainingCallback), or None.
+        """
+        path = os.path.join(self.save_dir, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            manifest = json.load(f)
+        best = manifest.get("best") or manifest.get("latest")
+        if not best or not os.path.exists(os.path.join(self.save_dir, best)):
+            return None
+        return os.path.join(self.save_dir, best)
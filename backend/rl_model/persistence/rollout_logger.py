@@ -1,45 +1,98 @@
 # rl_model/persistence/rollout_logger.py
 import os
 import json
-from datetime import datetime
+import atexit
+from datetime import datetime, timezone
+
+from rl_model.persistence.transition_store import TransitionStore
+from rl_model.utils.normalizer import STATE_KEYS
+
+LEGACY_LOG = "transitions.jsonl"
+
 
 class RolloutLogger:
     """
     Logs real student transitions (state, action, reward, next_state) for offline RL training.
+    Backed by a columnar TransitionStore in log_dir; appends are buffered and
+    flushed in segments (and at interpreter exit).
     """
 
-    def __init__(self, log_dir="rollouts"):
+    def __init__(self, log_dir="rollouts", segment_rows: int = 65536):
         self.log_dir = log_dir
         os.makedirs(self.log_dir, exist_ok=True)
-        self.filepath = os.path.join(self.log_dir, "transitions.jsonl")
+        self.filepath = os.path.join(self.log_dir, LEGACY_LOG)
+        self.store = TransitionStore(self.log_dir, segment_rows=segment_rows)
+        self._import_legacy_log()
+        atexit.register(self.flush)
+
+    def _import_legacy_log(self):
+        """One-time import of a JSONL log written by earlier versions."""
+        if not os.path.exists(self.filepath):
+            return
+        count = 0
+        with open(self.filepath, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                t = json.loads(line)
+                timestamp = t.get("timestamp")
+                self.store.append(
+                    t["state"], t["action"], t["reward"], t["next_state"],
+                    student_id=t.get("student_id"),
+                    timestamp=datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp() if timestamp else None
+                )
+                count += 1
+        self.store.flush()
+        os.replace(self.filepath, self.filepath + ".imported")
+        print(f"Imported {count} legacy transitions from {self.filepath}")
 
     def log_transition(self, transition: dict):
         """
-        Append a single transition to the log file.
+        Buffer a single transition.
         Transition example:
         {
             "student_id": "s123",
             "state": {...},
             "action": 2,
             "reward": 0.8,
-            "next_state": {...},
-            "timestamp": "2026-01-28T13:00:00"
+            "next_state": {...}
         }
         """
-        transition["timestamp"] = datetime.utcnow().isoformat()
-        with open(self.filepath, "a") as f:
-            f.write(json.dumps(transition) + "\n")
+        self.store.append(
+            transition["state"],
+            transition["action"],
+            transition["reward"],
+            transition["next_state"],
+            student_id=transition.get("student_id")
+        )
+
+    def flush(self):
+        self.store.flush()
+
+    def load_arrays(self, columns=None) -> dict:
+        """
+        All logged transitions as columnar arrays (memory-mapped):
+        state/next_state (N, 6) in STATE_KEYS order, action, reward, student, timestamp.
+        """
+        self.flush()
+        return self.store.load(columns)
 
     def read_all_transitions(self):
         """
         Read all logged transitions.
-        Returns a list of dictionaries.
+        Returns a list of dictionaries (compatibility path; prefer load_arrays).
         """
-        if not os.path.exists(self.filepath):
-            return []
-
+        data = self.load_arrays()
+        student_ids = self.store.student_ids(data["student"])
         transitions = []
-        with open(self.filepath, "r") as f:
-            for line in f:
-                transitions.append(json.loads(line.strip()))
+        for i in range(len(data["action"])):
+            transitions.append({
+                "student_id": student_ids[i],
+                "state": dict(zip(STATE_KEYS, data["state"][i].tolist())),
+                "action": int(data["action"][i]),
+                "reward": float(data["reward"][i]),
+                "next_state": dict(zip(STATE_KEYS, data["next_state"][i].tolist())),
+                "timestamp": datetime.fromtimestamp(float(data["timestamp"][i]), timezone.utc).replace(tzinfo=None).isoformat()
+            })
         return transitions
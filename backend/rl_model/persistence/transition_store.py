@@ -0,0 +1,222 @@
+# rl_model/persistence/transition_store.py
+"""
+Segmented columnar store for RL transitions.
+
+Layout of a store directory:
+    manifest.json             committed segments, student id table, metadata
+    seg_000000/state.npy      float32 (n, 6)   raw state in STATE_KEYS order
+    seg_000000/action.npy     int16   (n,)
+    seg_000000/reward.npy     float32 (n,)
+    seg_000000/next_state.npy float32 (n, 6)
+    seg_000000/student.npy    int32   (n,)     index into manifest["students"]
+    seg_000000/timestamp.npy  float64 (n,)     unix seconds
+
+Appends are buffered in memory and written as immutable segments (at most
+`segment_rows` rows each). A segment becomes visible only once the manifest
+that lists it has been atomically replaced, so readers never see partial data.
+Readers memory-map the .npy columns directly.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from rl_model.utils.normalizer import STATE_KEYS
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+# column -> (dtype, per-row shape)
+SCHEMA = {
+    "state": (np.float32, (len(STATE_KEYS),)),
+    "action": (np.int16, ()),
+    "reward": (np.float32, ()),
+    "next_state": (np.float32, (len(STATE_KEYS),)),
+    "student": (np.int32, ()),
+    "timestamp": (np.float64, ()),
+}
+
+
+def _state_row(state) -> list:
+    if isinstance(state, dict):
+        return [state.get(key, 0.0) for key in STATE_KEYS]
+    return list(state)
+
+
+class TransitionStore:
+    """
+    Append-only columnar transition store. Safe for one writer process
+    (many threads) and any number of readers.
+    """
+
+    def __init__(self, root: str, segment_rows: int = 65536):
+        self.root = root
+        self.segment_rows = segment_rows
+        self._lock = threading.Lock()
+        self._buffer = {column: [] for column in SCHEMA}
+        self._buffered = 0
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest = self._read_manifest()
+        self._student_codes = {s_id: i for i, s_id in enumerate(self.manifest["students"])}
+
+    # -----------------------------
+    # Manifest
+    # -----------------------------
+    def _read_manifest(self) -> dict:
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {
+                "format_version": FORMAT_VERSION,
+                "state_keys": STATE_KEYS,
+                "segments": [],
+                "next_segment": 0,
+                "students": [],
+                "meta": {},
+            }
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported transition store version in {path}")
+        if manifest.get("state_keys") != STATE_KEYS:
+            raise ValueError(f"State layout of {path} does not match STATE_KEYS")
+        return manifest
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def refresh(self):
+        """Re-read the manifest (readers pick up segments written by another process)."""
+        with self._lock:
+            self.manifest = self._read_manifest()
+            self._student_codes = {s_id: i for i, s_id in enumerate(self.manifest["students"])}
+
+    def get_meta(self, key: str, default=None):
+        return self.manifest["meta"].get(key, default)
+
+    def set_meta(self, key: str, value):
+        """Store a JSON value in the manifest; committed with the next flush (or right away if idle)."""
+        with self._lock:
+            self.manifest["meta"][key] = value
+            if not self._buffered:
+                self._write_manifest()
+
+    # -----------------------------
+    # Write path
+    # -----------------------------
+    def _student_code(self, student_id) -> int:
+        if student_id is None:
+            return -1
+        student_id = str(student_id)
+        code = self._student_codes.get(student_id)
+        if code is None:
+            code = len(self.manifest["students"])
+            self.manifest["students"].append(student_id)
+            self._student_codes[student_id] = code
+        return code
+
+    def append(self, state, action: int, reward: float, next_state, student_id=None, timestamp: float = None):
+        """Buffer one transition. States are dicts (STATE_KEYS) or 6-value sequences."""
+        self.append_batch(
+            [_state_row(state)], [action], [reward], [_state_row(next_state)],
+            [student_id], [timestamp if timestamp is not None else time.time()]
+        )
+
+    def append_batch(self, states, actions, rewards, next_states, student_ids=None, timestamps=None):
+        """Buffer many transitions given as arrays/sequences of equal length."""
+        states = np.asarray(states, dtype=np.float32).reshape(-1, len(STATE_KEYS))
+        n = len(states)
+        if n == 0:
+            return
+        if timestamps is None:
+            timestamps = np.full(n, time.time())
+        with self._lock:
+            codes = [self._student_code(s_id) for s_id in (student_ids if student_ids is not None else [None] * n)]
+            self._buffer["state"].append(states)
+            self._buffer["action"].append(np.asarray(actions, dtype=np.int16).reshape(-1))
+            self._buffer["reward"].append(np.asarray(rewards, dtype=np.float32).reshape(-1))
+            self._buffer["next_state"].append(np.asarray(next_states, dtype=np.float32).reshape(-1, len(STATE_KEYS)))
+            self._buffer["student"].append(np.asarray(codes, dtype=np.int32))
+            self._buffer["timestamp"].append(np.asarray(timestamps, dtype=np.float64).reshape(-1))
+            self._buffered += n
+            if self._buffered >= self.segment_rows:
+                self._flush_locked()
+
+    def flush(self):
+        """Write buffered transitions as new segment(s) and commit the manifest."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffered:
+            return
+        columns = {column: np.concatenate(parts) for column, parts in self._buffer.items()}
+        for start in range(0, self._buffered, self.segment_rows):
+            name = f"seg_{self.manifest['next_segment']:06d}"
+            seg_dir = os.path.join(self.root, name)
+            tmp_dir = seg_dir + ".tmp"
+            os.makedirs(tmp_dir, exist_ok=True)
+            rows = 0
+            for column, values in columns.items():
+                chunk = values[start:start + self.segment_rows]
+                np.save(os.path.join(tmp_dir, f"{column}.npy"), chunk)
+                rows = len(chunk)
+            if os.path.exists(seg_dir):
+                # Orphan of a crash between segment rename and manifest commit
+                shutil.rmtree(seg_dir)
+            os.replace(tmp_dir, seg_dir)
+            self.manifest["segments"].append({"name": name, "rows": rows})
+            self.manifest["next_segment"] += 1
+        self._write_manifest()
+        self._buffer = {column: [] for column in SCHEMA}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -----------------------------
+    # Read path
+    # -----------------------------
+    def __len__(self):
+        return sum(segment["rows"] for segment in self.manifest["segments"])
+
+    def iter_segments(self, columns=None, mmap: bool = True):
+        """Yield {column: array} per committed segment; arrays are memory-mapped by default."""
+        columns = list(columns or SCHEMA)
+        for segment in list(self.manifest["segments"]):
+            seg_dir = os.path.join(self.root, segment["name"])
+            yield {
+                column: np.load(os.path.join(seg_dir, f"{column}.npy"), mmap_mode="r" if mmap else None)
+                for column in columns
+            }
+
+    def load(self, columns=None, mmap: bool = True) -> dict:
+        """
+        All committed transitions as {column: array}. A single segment is returned
+        memory-mapped as is; several are concatenated into one array per column.
+        """
+        columns = list(columns or SCHEMA)
+        segments = list(self.iter_segments(columns, mmap=mmap))
+        if not segments:
+            return {column: np.empty((0,) + SCHEMA[column][1], dtype=SCHEMA[column][0]) for column in columns}
+        if len(segments) == 1:
+            return segments[0]
+        return {column: np.concatenate([segment[column] for segment in segments]) for column in columns}
+
+    def student_ids(self, codes: np.ndarray) -> list:
+        students = self.manifest["students"]
+        return [students[code] if code >= 0 else None for code in np.asarray(codes).tolist()]
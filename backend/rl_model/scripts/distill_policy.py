@@ -0,0 +1,90 @@
+# rl_model/scripts/distill_policy.py
+"""
+Distill the PPO policy into a dense quantized lookup grid.
+
+Every grid point is labeled by the teacher (NumPy export if present, else the
+SB3 model), then agreement is measured on states sampled uniformly from the
+same input space. The grid is written for rl_model.inference.LookupPolicy,
+which DecisionEngine(mode="lookup") serves.
+
+Usage:
+    python -m rl_model.scripts.distill_policy --levels 11 7 3 11 11 9 --space normalized
+"""
+import argparse
+import os
+import numpy as np
+from rl_model.config.ppo_config import PPOConfig
+from rl_model.inference.lookup_policy import LookupPolicy
+from rl_model.persistence.model_registry import registry_from_path
+from rl_model.utils.normalizer import STATE_RANGES, STATE_LOW, STATE_HIGH
+
+# Grid points per feature, in STATE_RANGES order
+DEFAULT_LEVELS = [11, 7, 3, 11, 11, 9]
+LABEL_CHUNK = 65536
+
+
+def input_space(space: str):
+    """(low, high) of the policy input: normalized unit cube or raw STATE_RANGES."""
+    if space == "normalized":
+        return np.zeros(len(STATE_RANGES), dtype=np.float32), np.ones(len(STATE_RANGES), dtype=np.float32)
+    return STATE_LOW.astype(np.float32), STATE_HIGH.astype(np.float32)
+
+
+def label(teacher, states: np.ndarray) -> np.ndarray:
+    actions = np.empty(len(states), dtype=np.int64)
+    for start in range(0, len(states), LABEL_CHUNK):
+        chunk, _ = teacher.predict(states[start:start + LABEL_CHUNK], deterministic=True)
+        actions[start:start + LABEL_CHUNK] = np.asarray(chunk).reshape(-1)
+    return actions
+
+
+def distill(teacher, levels: list, low: np.ndarray, high: np.ndarray) -> LookupPolicy:
+    student = LookupPolicy(np.zeros(levels, dtype=np.uint8), low, high)
+    student.table[...] = label(teacher, student.grid_points()).reshape(levels)
+    return student
+
+
+def agreement_report(teacher, student: LookupPolicy, n_samples: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    states = rng.uniform(student.low, student.high, size=(n_samples, student.obs_dim)).astype(np.float32)
+    expected = label(teacher, states)
+    actual, _ = student.predict(states)
+    per_action = {}
+    for action in np.unique(expected):
+        rows = expected == action
+        per_action[int(action)] = {"share": float(rows.mean()), "agreement": float(np.mean(actual[rows] == action))}
+    return {"agreement": float(np.mean(actual == expected)), "per_action": per_action}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the PPO policy into a lookup grid")
+    parser.add_argument("--model-path", default=PPOConfig.MODEL_EXPORT_PATH, help="SB3 zip; its _policy.npz is preferred")
+    parser.add_argument("--output", default=PPOConfig.LOOKUP_EXPORT_PATH)
+    parser.add_argument("--levels", type=int, nargs=len(STATE_RANGES), default=DEFAULT_LEVELS)
+    parser.add_argument("--space", choices=["normalized", "raw"], default="normalized",
+                        help="normalized: DecisionEngine inputs, raw: RLService inputs")
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--min-agreement", type=float, default=0.0, help="Fail without writing below this")
+    args = parser.parse_args()
+
+    teacher = registry_from_path(args.model_path).get()
+    if teacher is None:
+        raise SystemExit(f"No teacher model found for {args.model_path}")
+
+    low, high = input_space(args.space)
+    student = distill(teacher, args.levels, low, high)
+    report = agreement_report(teacher, student, args.samples, PPOConfig.SEED)
+
+    print(f"Grid {args.levels} ({student.table.size} cells, {student.table.nbytes / 1024:.1f} KiB) over {args.space} states")
+    print(f"Agreement with teacher on {args.samples} sampled states: {report['agreement'] * 100:.2f}%")
+    for action, stats in sorted(report["per_action"].items()):
+        print(f"  action {action}: {stats['share'] * 100:.1f}% of states, {stats['agreement'] * 100:.2f}% agreement")
+
+    if report["agreement"] < args.min_agreement:
+        raise SystemExit(f"Agreement below {args.min_agreement:.2%}; lookup table not written")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    student.save(args.output)
+    print(f"Lookup policy exported at {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,202 @@
 # rl_model/scripts/evaluate.py
 """
-Evaluate PPO policy using a set of test transitions.
+Evaluate the PPO policy on logged transitions.
+
+All logged states go through the policy in one batched pass (chunked for
+memory). The policy evaluated is the one serving runs: the deterministic
+(most likely) action, passed through the serving action mask. Reported:
+- agreement with the logged actions, a logged x served confusion matrix and
+  agreement per segment (difficulty, mastery band),
+- off-policy estimates of the policy's value from logged actions and rewards:
+  importance sampling (IS), weighted IS (WIS) and doubly robust (DR).
+
+Transitions are treated one step at a time (each reward is the immediate
+outcome of the logged action). The behavior policy that chose the logged
+actions is not recorded, so it is estimated as smoothed action frequencies per
+quantized state cell; the DR reward model is the mean reward per (cell, action).
+
+Usage:
+    python -m rl_model.scripts.evaluate --bins 5 --clip-weight 50
 """
+import argparse
+import time
+import numpy as np
+from app.utils.action_mask import get_allowed_actions_batch, apply_action_mask
+from rl_model.config.env_config import EnvConfig
 from rl_model.persistence.rollout_logger import RolloutLogger
 from rl_model.model.ppo_agent import PPOAgent
+from rl_model.utils.normalizer import STATE_KEYS, STATE_LOW, STATE_HIGH, normalize_states
+
+PREDICT_CHUNK = 65536
+MASTERY_BANDS = [0.3, 0.7]
+
+
+def target_probabilities(model, states: np.ndarray) -> np.ndarray:
+    """pi(a|s) for every state, shape (N, ACTIONS)."""
+    probs = np.empty((len(states), EnvConfig.ACTIONS), dtype=np.float64)
+    if hasattr(model, "action_probabilities"):
+        # NumPy export
+        for start in range(0, len(states), PREDICT_CHUNK):
+            probs[start:start + PREDICT_CHUNK] = model.action_probabilities(states[start:start + PREDICT_CHUNK])
+        return probs
+
+    import torch
+    with torch.no_grad():
+        for start in range(0, len(states), PREDICT_CHUNK):
+            obs, _ = model.policy.obs_to_tensor(states[start:start + PREDICT_CHUNK])
+            dist = model.policy.get_distribution(obs)
+            probs[start:start + PREDICT_CHUNK] = dist.distribution.probs.cpu().numpy()
+    return probs
+
+
+def served_actions(model, obs: np.ndarray, states: np.ndarray) -> np.ndarray:
+    """
+    Actions serving would take: the policy's most likely action for obs, masked
+    with apply_action_mask over the allowed actions of the raw states.
+    """
+    greedy = target_probabilities(model, obs).argmax(axis=1)
+    return apply_action_mask(greedy, get_allowed_actions_batch(np.asarray(states, dtype=np.float64)))
+
+
+def one_hot(actions: np.ndarray) -> np.ndarray:
+    """pi(a|s) of a deterministic policy, shape (N, ACTIONS)."""
+    pi = np.zeros((len(actions), EnvConfig.ACTIONS), dtype=np.float64)
+    pi[np.arange(len(actions)), actions] = 1.0
+    return pi
+
+
+def state_cells(states: np.ndarray, bins: int) -> np.ndarray:
+    """Dense cell index (0..n_cells-1) of each state on a bins^6 grid over STATE_LOW/HIGH."""
+    scaled = (np.asarray(states, dtype=np.float64) - STATE_LOW) / (STATE_HIGH - STATE_LOW)
+    idx = np.clip((scaled * bins).astype(np.int64), 0, bins - 1)
+    flat = np.ravel_multi_index(idx.T, (bins,) * idx.shape[1])
+    _, cells = np.unique(flat, return_inverse=True)
+    return cells.reshape(-1)
+
+
+def behavior_probabilities(cells: np.ndarray, actions: np.ndarray, smoothing: float = 1.0) -> np.ndarray:
+    """mu(a|s): per-cell action frequencies, smoothed toward the global action frequencies."""
+    n_actions = EnvConfig.ACTIONS
+    counts = np.bincount(cells * n_actions + actions, minlength=(cells.max() + 1) * n_actions)
+    counts = counts.reshape(-1, n_actions).astype(np.float64)
+    prior = np.bincount(actions, minlength=n_actions) / len(actions)
+    mu = (counts + smoothing * n_actions * prior) / (counts.sum(axis=1, keepdims=True) + smoothing * n_actions)
+    return mu[cells]
+
+
+def reward_model(cells: np.ndarray, actions: np.ndarray, rewards: np.ndarray) -> np.ndarray:
+    """q(s, a) for every state and action: mean reward per (cell, action), else per action."""
+    n_actions = EnvConfig.ACTIONS
+    keys = cells * n_actions + actions
+    size = (cells.max() + 1) * n_actions
+    sums = np.bincount(keys, weights=rewards, minlength=size)
+    counts = np.bincount(keys, minlength=size)
+    action_mean = np.bincount(actions, weights=rewards, minlength=n_actions) / np.maximum(
+        np.bincount(actions, minlength=n_actions), 1
+    )
+    q = np.where(counts > 0, sums / np.maximum(counts, 1), np.tile(action_mean, cells.max() + 1))
+    return q.reshape(-1, n_actions)[cells]
+
+
+def off_policy_estimates(pi: np.ndarray, mu: np.ndarray, q: np.ndarray, actions: np.ndarray,
+                         rewards: np.ndarray, clip_weight: float = None) -> dict:
+    rows = np.arange(len(actions))
+    weights = pi[rows, actions] / mu[rows, actions]
+    if clip_weight:
+        weights = np.minimum(weights, clip_weight)
+    q_logged = q[rows, actions]
+    direct = (pi * q).sum(axis=1)
+    return {
+        "behavior": float(rewards.mean()),
+        "is": float(np.mean(weights * rewards)),
+        "wis": float(np.sum(weights * rewards) / np.sum(weights)) if weights.sum() > 0 else float("nan"),
+        "dm": float(direct.mean()),
+        "dr": float(np.mean(direct + weights * (rewards - q_logged))),
+        "ess": float(weights.sum() ** 2 / np.sum(weights ** 2)) if weights.sum() > 0 else 0.0,
+        "max_weight": float(weights.max()),
+    }
+
+
+def confusion_matrix(logged: np.ndarray, predicted: np.ndarray) -> np.ndarray:
+    """counts[logged action, predicted action]."""
+    n_actions = EnvConfig.ACTIONS
+    return np.bincount(logged * n_actions + predicted, minlength=n_actions * n_actions).reshape(n_actions, n_actions)
+
+
+def segment_agreement(states: np.ndarray, logged: np.ndarray, predicted: np.ndarray) -> dict:
+    """Agreement and row count per difficulty level and per mastery band."""
+    match = logged == predicted
+    segments = {}
+    difficulty = states[:, STATE_KEYS.index("current_difficulty")].astype(np.int64)
+    for level in np.unique(difficulty):
+        rows = difficulty == level
+        segments[f"difficulty={level}"] = (float(match[rows].mean()), int(rows.sum()))
+    bands = np.digitize(states[:, STATE_KEYS.index("topic_mastery")], MASTERY_BANDS)
+    edges = [0.0, *MASTERY_BANDS, 1.0]
+    for band in np.unique(bands):
+        rows = bands == band
+        segments[f"mastery {edges[band]:.1f}-{edges[band + 1]:.1f}"] = (float(match[rows].mean()), int(rows.sum()))
+    return segments
+
 
 def main():
-    logger = RolloutLogger()
-    transitions = logger.read_all_transitions()
+    parser = argparse.ArgumentParser(description="Evaluate the PPO policy on logged transitions")
+    parser.add_argument("--log-dir", default="rollouts")
+    parser.add_argument("--space", choices=["raw", "normalized"], default="raw",
+                        help="Policy input: raw (RLService) or normalized (DecisionEngine) states")
+    parser.add_argument("--bins", type=int, default=5, help="Grid levels per feature for the behavior/reward models")
+    parser.add_argument("--clip-weight", type=float, default=None, help="Clip importance weights at this value")
+    args = parser.parse_args()
 
-    if not transitions:
+    logger = RolloutLogger(args.log_dir)
+    data = logger.load_arrays(["state", "action", "reward"])
+
+    if not len(data["action"]):
         print("No transitions to evaluate.")
         return
 
     agent = PPOAgent()
-    correct = 0
-    total = len(transitions)
+    if agent.model is None:
+        print("No PPO model found to evaluate.")
+        return
+
+    started = time.perf_counter()
+    states = np.asarray(data["state"], dtype=np.float32)
+    actions = np.asarray(data["action"], dtype=np.int64)
+    rewards = np.asarray(data["reward"], dtype=np.float64)
+    obs = normalize_states(states) if args.space == "normalized" else states
+
+    # One batched pass; the served (masked, deterministic) action defines pi
+    predicted = served_actions(agent.model, obs, states)
+    pi = one_hot(predicted)
+
+    cells = state_cells(states, args.bins)
+    mu = behavior_probabilities(cells, actions)
+    q = reward_model(cells, actions, rewards)
+    estimates = off_policy_estimates(pi, mu, q, actions, rewards, args.clip_weight)
+    elapsed = time.perf_counter() - started
+
+    total = len(actions)
+    print(f"Evaluated {total} transitions in {elapsed:.2f}s")
+    print(f"PPO (masked) action agreement with logged transitions: {np.mean(predicted == actions) * 100:.2f}%")
+
+    print("\nPolicy value (mean immediate reward per decision):")
+    print(f"  logged behavior   {estimates['behavior']:.4f}")
+    print(f"  IS                {estimates['is']:.4f}")
+    print(f"  WIS               {estimates['wis']:.4f}")
+    print(f"  direct method     {estimates['dm']:.4f}")
+    print(f"  doubly robust     {estimates['dr']:.4f}")
+    print(f"  effective sample size {estimates['ess']:.0f} of {total} (max weight {estimates['max_weight']:.1f})")
 
-    for t in transitions:
-        state = list(t["state"].values())
-        predicted_action = agent.predict(state)
-        if predicted_action == t["action"]:
-            correct += 1
+    print("\nConfusion matrix (rows: logged action, columns: served action):")
+    matrix = confusion_matrix(actions, predicted)
+    print("        " + "".join(f"{a:>9}" for a in range(EnvConfig.ACTIONS)))
+    for a, row in enumerate(matrix):
+        print(f"  {a:>4}  " + "".join(f"{count:>9}" for count in row))
 
-    accuracy = correct / total * 100
-    print(f"PPO action prediction accuracy on logged transitions: {accuracy:.2f}%")
+    print("\nAgreement per segment:")
+    for segment, (agreement, rows) in segment_agreement(states, actions, predicted).items():
+        print(f"  {segment:<18} {agreement * 100:6.2f}%  ({rows} transitions)")
 
 if __name__ == "__main__":
     main()
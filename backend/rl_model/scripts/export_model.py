@@ -1,15 +1,88 @@
 # rl_model/scripts/export_model.py
 """
 Export PPO model to production-ready path.
+
+Besides the SB3 zip, the actor network is exported to a compact .npz that
+rl_model/inference/numpy_policy.NumpyPolicy serves without torch. The export
+is verified against PPO.predict(deterministic=True) on a validation set and
+rejected if any action differs.
 """
+import os
+import numpy as np
 from rl_model.model.policy_loader import load_model, save_model
 from rl_model.config.ppo_config import PPOConfig
+from rl_model.inference.numpy_policy import NumpyPolicy
+from rl_model.utils.normalizer import STATE_LOW, STATE_HIGH
+
+# torch module class name -> NumpyPolicy activation
+SUPPORTED_ACTIVATIONS = {"Tanh": "tanh", "ReLU": "relu"}
+
+
+def extract_numpy_policy(model) -> NumpyPolicy:
+    """
+    Copy the actor path of an SB3 PPO MlpPolicy (mlp_extractor.policy_net + action_net)
+    into a NumpyPolicy.
+    """
+    import torch.nn as nn
+
+    policy = model.policy
+    if type(policy.pi_features_extractor).__name__ != "FlattenExtractor":
+        raise ValueError("Only MlpPolicy with a FlattenExtractor can be exported")
+    if not hasattr(model.action_space, "n"):
+        raise ValueError("Only discrete action spaces can be exported")
+
+    weights, biases, activations = [], [], []
+    for module in list(policy.mlp_extractor.policy_net) + [policy.action_net]:
+        if isinstance(module, nn.Linear):
+            weights.append(module.weight.detach().cpu().numpy().T)
+            biases.append(module.bias.detach().cpu().numpy())
+            activations.append("identity")
+        elif type(module).__name__ in SUPPORTED_ACTIVATIONS:
+            activations[-1] = SUPPORTED_ACTIVATIONS[type(module).__name__]
+        else:
+            raise ValueError(f"Unsupported layer in policy network: {module}")
+    return NumpyPolicy(weights, biases, activations)
+
+
+def build_validation_states(n_samples: int = 20000, seed: int = PPOConfig.SEED) -> np.ndarray:
+    """
+    Random states covering both the raw STATE_RANGES (what RLService feeds)
+    and the normalized unit cube (what DecisionEngine feeds).
+    """
+    rng = np.random.default_rng(seed)
+    low, high = STATE_LOW.astype(np.float32), STATE_HIGH.astype(np.float32)
+    raw = rng.uniform(low, high, size=(n_samples, len(low))).astype(np.float32)
+    raw[:, 2] = np.round(raw[:, 2])  # difficulty and attempts are integers
+    raw[:, 4] = np.round(raw[:, 4])
+    unit = rng.uniform(0.0, 1.0, size=(n_samples, len(low))).astype(np.float32)
+    return np.concatenate([raw, unit])
+
+
+def verify_numpy_policy(model, numpy_policy: NumpyPolicy, states: np.ndarray) -> int:
+    """Number of states where the NumPy policy disagrees with PPO.predict(deterministic=True)."""
+    expected, _ = model.predict(states, deterministic=True)
+    actual, _ = numpy_policy.predict(states, deterministic=True)
+    return int(np.sum(np.asarray(expected).reshape(-1) != actual))
+
+
+def export_numpy_policy(model, path: str = PPOConfig.POLICY_EXPORT_PATH) -> NumpyPolicy:
+    numpy_policy = extract_numpy_policy(model)
+    states = build_validation_states()
+    mismatches = verify_numpy_policy(model, numpy_policy, states)
+    if mismatches:
+        raise RuntimeError(f"NumPy policy disagrees with PPO on {mismatches}/{len(states)} validation states")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    numpy_policy.save(path)
+    print(f"NumPy policy verified on {len(states)} states and exported at {path}")
+    return numpy_policy
+
 
 def main():
     model = load_model(PPOConfig.MODEL_PATH)
     save_path = PPOConfig.MODEL_EXPORT_PATH
     save_model(model, save_path)
     print(f"PPO model exported for production at {save_path}")
+    export_numpy_policy(model, PPOConfig.POLICY_EXPORT_PATH)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,38 @@
+# rl_model/scripts/export_transitions.py
+"""
+Pull new rows of the rl_transitions table into the training transition store.
+Only rows after the last exported id are read, so nightly runs cost time
+proportional to new data.
+
+Usage:
+    python -m rl_model.scripts.export_transitions [--database-url URL] [--store rollouts]
+"""
+import argparse
+import time
+from sqlalchemy import create_engine
+from rl_model.data.transition_exporter import export_transitions
+from rl_model.persistence.transition_store import TransitionStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Export rl_transitions into the training transition store")
+    parser.add_argument("--database-url", default=None, help="Defaults to the app database")
+    parser.add_argument("--store", default="rollouts", help="TransitionStore directory (RolloutLogger log_dir)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.core.database import engine
+
+    store = TransitionStore(args.store)
+    started = time.perf_counter()
+    result = export_transitions(engine, store, chunk_size=args.chunk_size)
+    print(
+        f"Exported {result['exported']} new transitions (skipped {result['skipped']} incomplete) "
+        f"in {time.perf_counter() - started:.2f}s; high-water id {result['high_water']}, "
+        f"{len(store)} transitions in {args.store}"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# rl_model/scripts/sweep.py
+"""
+Parallel hyperparameter sweep over PPOConfig.
+
+A spec (JSON) names PPOConfig attributes and their search space:
+    {
+        "method": "random",            # or "grid"
+        "trials": 32,                  # random search only
+        "params": {
+            "LEARNING_RATE": {"low": 1e-5, "high": 1e-3, "log": true},
+            "N_STEPS": [1024, 2048, 4096],
+            "ENT_COEF": {"low": 0.0, "high": 0.05}
+        }
+    }
+Grid search takes lists only; random search samples lists uniformly and
+{"low", "high"[, "log"]} ranges continuously.
+
+Each trial trains a fresh PPO model on the student simulator fitted to the
+training students' transitions, with a fixed timestep budget. Every
+--eval-every timesteps its served (masked, deterministic) policy is scored on
+a simulator fitted to the held-out students (mean episode return) and its
+agreement with their logged actions is measured. Trials run in a process pool;
+a trial whose score falls below the median of the other trials at the same
+point is stopped early. Results are written to one CSV table.
+
+Usage:
+    python -m rl_model.scripts.sweep --spec sweep.json --timesteps 200000 --output sweep_results.csv
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from rl_model.config.env_config import EnvConfig
+from rl_model.config.ppo_config import PPOConfig
+from rl_model.persistence.transition_store import TransitionStore
+
+DEFAULT_SPEC = {
+    "method": "random",
+    "trials": 16,
+    "params": {
+        "LEARNING_RATE": {"low": 1e-5, "high": 1e-3, "log": True},
+        "N_STEPS": [1024, 2048, 4096, 8192],
+        "BATCH_SIZE": [64, 128, 256],
+        "ENT_COEF": {"low": 0.0, "high": 0.05},
+        "CLIP_RANGE": [0.1, 0.2, 0.3],
+    },
+}
+
+# Integer-valued PPOConfig attributes (random ranges are rounded)
+INT_PARAMS = {"N_STEPS", "BATCH_SIZE", "N_EPOCHS"}
+
+
+# -----------------------------
+# Search space
+# -----------------------------
+def expand_spec(spec: dict, seed: int) -> list:
+    """List of {PPOConfig attribute: value} trial configs."""
+    params = spec["params"]
+    for name in params:
+        if not hasattr(PPOConfig, name):
+            raise ValueError(f"Unknown PPOConfig attribute '{name}'")
+
+    if spec.get("method", "grid") == "grid":
+        for name, values in params.items():
+            if not isinstance(values, list):
+                raise ValueError(f"Grid search needs a list of values for '{name}'")
+        names = list(params)
+        return [dict(zip(names, values)) for values in itertools.product(*(params[n] for n in names))]
+
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(spec.get("trials", 16)):
+        config = {}
+        for name, space in params.items():
+            if isinstance(space, list):
+                value = space[rng.integers(len(space))]
+            elif space.get("log"):
+                value = float(np.exp(rng.uniform(np.log(space["low"]), np.log(space["high"]))))
+            else:
+                value = float(rng.uniform(space["low"], space["high"]))
+            config[name] = int(round(value)) if name in INT_PARAMS else value
+        trials.append(config)
+    return trials
+
+
+def ppo_kwargs(config: dict, n_envs: int) -> dict:
+    """
+    PPOConfig.to_dict() with the trial's overrides applied. N_STEPS is the
+    rollout size over all envs, as in PPOConfig.
+    """
+    kwargs = PPOConfig.to_dict(n_envs)
+    for name, value in config.items():
+        key = name.lower()
+        if key in kwargs:
+            kwargs[key] = value
+    kwargs.update(PPOConfig.rollout_kwargs(n_envs, config.get("N_STEPS"), config.get("BATCH_SIZE")))
+    kwargs["verbose"] = 0
+    return kwargs
+
+
+# -----------------------------
+# Data
+# -----------------------------
+def split_transitions(data: dict, holdout: float) -> tuple:
+    """
+    (train, held_out) column dicts. Split by student so held-out students are
+    never seen in training; rows without a student id are split by position.
+    """
+    n = len(data["action"])
+    students = np.asarray(data["student"])
+    bucket = np.where(students >= 0, students, np.arange(n)) % 100
+    held = bucket < int(round(holdout * 100))
+    return (
+        {column: np.asarray(values)[~held] for column, values in data.items()},
+        {column: np.asarray(values)[held] for column, values in data.items()},
+    )
+
+
+def simulated_return(model, params, n_envs: int, seed: int) -> float:
+    """Mean episode return of the served (masked, deterministic) policy on a simulator with the given dynamics."""
+    from rl_model.env.vec_student_env import VecStudentEnv
+    from rl_model.scripts.evaluate import served_actions
+
+    env = VecStudentEnv(n_envs, params=params, seed=seed)
+    obs = env.reset()
+    total = np.zeros(n_envs, dtype=np.float64)
+    for _ in range(EnvConfig.MAX_STEPS_PER_EPISODE):
+        obs, rewards, _, _ = env.step(served_actions(model, obs, obs))
+        total += rewards
+    return float(total.mean())
+
+
+# -----------------------------
+# Trials (run in pool workers)
+# -----------------------------
+def _should_stop(history, trial_id: int, rung: int, score: float, min_trials: int, grace_rungs: int) -> bool:
+    """Median stopping rule over the other trials' scores at the same rung."""
+    if rung < grace_rungs:
+        return False
+    peers = [scores[rung] for other, scores in history.items() if other != trial_id and len(scores) > rung]
+    return len(peers) >= min_trials and score < float(np.median(peers))
+
+
+def run_trial(trial_id: int, config: dict, options: dict, history) -> dict:
+    import torch
+    from stable_baselines3 import PPO
+    from rl_model.env.student_simulator import SimulatorParams
+    from rl_model.env.vec_student_env import VecStudentEnv
+    from rl_model.scripts.evaluate import served_actions
+
+    # One core per trial; the pool provides the parallelism
+    torch.set_num_threads(1)
+    started = time.perf_counter()
+    result = {"trial": trial_id, **config, "status": "completed", "timesteps": 0,
+              "score": float("nan"), "agreement": float("nan"), "seconds": 0.0, "error": ""}
+    env = None
+    try:
+        store = TransitionStore(options["store"])
+        train, held_out = split_transitions(store.load(["state", "action", "next_state", "student"]), options["holdout"])
+        train_params = SimulatorParams.fit(train)
+        held_params = SimulatorParams.fit(held_out)
+        held_states = np.asarray(held_out["state"], dtype=np.float32)
+        held_actions = np.asarray(held_out["action"], dtype=np.int64)
+
+        seed = PPOConfig.SEED + trial_id
+        env = VecStudentEnv(options["envs"], params=train_params, seed=seed)
+        model = PPO("MlpPolicy", env, **{**ppo_kwargs(config, options["envs"]), "seed": seed})
+
+        history[trial_id] = []
+        rung = 0
+        while result["timesteps"] < options["timesteps"]:
+            chunk = min(options["eval_every"], options["timesteps"] - result["timesteps"])
+            model.learn(total_timesteps=chunk, reset_num_timesteps=False)
+            result["timesteps"] = int(model.num_timesteps)
+
+            result["score"] = simulated_return(model, held_params, options["eval_envs"], PPOConfig.SEED)
+            if len(held_actions):
+                predicted = served_actions(model, held_states, held_states)
+                result["agreement"] = float(np.mean(predicted == held_actions))
+            # Manager dict values are copies; reassign to publish
+            history[trial_id] = history[trial_id] + [result["score"]]
+
+            if _should_stop(history, trial_id, rung, result["score"], options["min_trials"], options["grace_rungs"]):
+                result["status"] = "stopped"
+                break
+            rung += 1
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    finally:
+        if env is not None:
+            env.close()
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def write_results(path: str, results: list, param_names: list):
+    columns = ["trial", *param_names, "status", "timesteps", "score", "agreement", "seconds", "error"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({column: result.get(column, "") for column in columns})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel PPOConfig hyperparameter sweep")
+    parser.add_argument("--spec", help="JSON search spec (default: built-in random search)")
+    parser.add_argument("--store", default="rollouts", help="TransitionStore directory")
+    parser.add_argument("--output", default="sweep_results.csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Concurrent trials")
+    parser.add_argument("--timesteps", type=int, default=200000, help="Training budget per trial")
+    parser.add_argument("--eval-every", type=int, default=25000)
+    parser.add_argument("--envs", type=int, default=16, help="Simulated students per trial")
+    parser.add_argument("--eval-envs", type=int, default=512)
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of students held out for evaluation")
+    parser.add_argument("--min-trials", type=int, default=4, help="Peers needed before median stopping applies")
+    parser.add_argument("--grace-rungs", type=int, default=1, help="Evaluations before a trial can be stopped")
+    args = parser.parse_args()
+
+    if not len(TransitionStore(args.store)):
+        print(f"No transitions found in {args.store}. Exiting sweep.")
+        return
+
+    spec = DEFAULT_SPEC
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f)
+    trials = expand_spec(spec, PPOConfig.SEED)
+    param_names = list(spec["params"])
+    options = {
+        "store": args.store, "timesteps": args.timesteps, "eval_every": args.eval_every,
+        "envs": args.envs, "eval_envs": args.eval_envs, "holdout": args.holdout,
+        "min_trials": args.min_trials, "grace_rungs": args.grace_rungs,
+    }
+    print(f"Running {len(trials)} trials ({spec.get('method', 'grid')} search) on {args.workers} workers")
+
+    results = []
+    # spawn: trials import torch, which must not inherit a forked parent's state
+    ctx = mp.get_context("spawn")
+    with ctx.Manager() as manager:
+        history = manager.dict()
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+            futures = [pool.submit(run_trial, i, config, options, history) for i, config in enumerate(trials)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(
+                    f"[Sweep] trial {result['trial']} {result['status']} after {result['timesteps']} steps: "
+                    f"score={result['score']:.3f} agreement={result['agreement']:.3f} ({result['seconds']}s)"
+                )
+                write_results(args.output, sorted(results, key=lambda r: r["trial"]), param_names)
+
+    ranked = sorted(results, key=lambda r: (r["status"] != "completed", -np.nan_to_num(r["score"], nan=-np.inf)))
+    print(f"\nResults written to {args.output}. Best trials:")
+    for result in ranked[:5]:
+        values = ", ".join(f"{name}={result[name]}" for name in param_names)
+        print(f"  trial {result['trial']} [{result['status']}] score={result['score']:.3f}: {values}")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,216 @@
 # rl_model/scripts/train.py
 """
 Offline PPO training using logged real student transitions.
+
+--incremental retrains continuously instead of from scratch:
+- only transitions logged after the watermark of the last published model
+  (the latest transition timestamp it saw) are new,
+- the latest PPOConfig.GATE_HOLDOUT of the new transitions (by timestamp)
+  are held out for the publish gate; the simulator is fitted to the rest
+  plus a random replay slice of older ones (PPOConfig.REPLAY_RATIO old rows
+  per new row),
+- training warm-starts from the latest published version in
+  PPOConfig.CHECKPOINT_DIR (else the serving zip) and runs for
+  PPOConfig.INCREMENTAL_TIMESTEPS, checkpointing into the same directory,
+- the candidate is published (new store version + serving export, which the
+  API's model registry hot-swaps) only if the doubly-robust value estimate of
+  its served (masked, deterministic) policy on the held-out transitions beats
+  that of the policy serving currently loads by PPOConfig.MIN_IMPROVEMENT.
+The watermark only advances when a model is published, so rejected data is
+retried with the next batch.
+
+Usage:
+    python -m rl_model.scripts.train --incremental --workers 8
 """
-from stable_baselines3 import PPO
+import argparse
+import os
+import time
+import numpy as np
 from rl_model.persistence.rollout_logger import RolloutLogger
-from rl_model.model.policy_loader import load_model, save_model
+from rl_model.persistence.model_store import ModelStore
+from rl_model.model.policy_loader import load_model, save_model, load_inference_policy
 from rl_model.config.ppo_config import PPOConfig
-import numpy as np
 
-def build_dataset(transitions):
+# Latest transition timestamp (unix seconds) seen by the published model; row
+# positions are not stable across store rebuilds or legacy re-imports
+HIGH_WATER_KEY = "transitions_high_water_timestamp"
+COLUMNS = ["state", "action", "reward", "next_state", "student", "timestamp"]
+
+def build_dataset(data: dict):
+    """
+    Convert columnar transitions (RolloutLogger.load_arrays) into (state, action, reward, next_state) arrays.
+    """
+    return (
+        np.asarray(data["state"], dtype=np.float32),
+        np.asarray(data["action"], dtype=np.int64),
+        np.asarray(data["reward"], dtype=np.float32),
+        np.asarray(data["next_state"], dtype=np.float32)
+    )
+
+def select_rows(timestamp: np.ndarray, high_water: float, replay_ratio: float, seed: int) -> tuple:
+    """(new row indices, replayed old row indices): rows after the timestamp watermark are new."""
+    timestamp = np.asarray(timestamp)
+    new_rows = np.flatnonzero(timestamp > high_water)
+    old_rows = np.flatnonzero(timestamp <= high_water)
+    n_replay = min(len(old_rows), int(round(len(new_rows) * replay_ratio)))
+    rng = np.random.default_rng(seed)
+    replay_rows = np.sort(rng.choice(old_rows, size=n_replay, replace=False)) if n_replay else np.empty(0, dtype=np.int64)
+    return new_rows, replay_rows
+
+def holdout_rows(rows: np.ndarray, timestamp: np.ndarray, share: float) -> tuple:
+    """(training rows, gate rows): the latest `share` of rows by timestamp are held out."""
+    ordered = rows[np.argsort(timestamp[rows], kind="stable")]
+    n_gate = max(1, int(round(len(ordered) * share)))
+    return np.sort(ordered[:-n_gate]), np.sort(ordered[-n_gate:])
+
+def offline_value(model, data: dict) -> dict:
+    """
+    Off-policy estimates (rl_model/scripts/evaluate.py) of the policy serving
+    would run with `model` (masked, deterministic) on the given transitions.
+    """
+    from rl_model.scripts.evaluate import (
+        served_actions, one_hot, state_cells, behavior_probabilities, reward_model, off_policy_estimates
+    )
+    states = np.asarray(data["state"], dtype=np.float32)
+    actions = np.asarray(data["action"], dtype=np.int64)
+    rewards = np.asarray(data["reward"], dtype=np.float64)
+    cells = state_cells(states, bins=5)
+    return off_policy_estimates(
+        one_hot(served_actions(model, states, states)),
+        behavior_probabilities(cells, actions),
+        reward_model(cells, actions, rewards),
+        actions, rewards
+    )
+
+def served_policy():
+    """The policy the API's registry serves (NumPy export or zip), or None if nothing is deployed."""
+    if not os.path.exists(PPOConfig.MODEL_EXPORT_PATH) and not os.path.exists(PPOConfig.POLICY_EXPORT_PATH):
+        return None
+    return load_inference_policy(PPOConfig.MODEL_EXPORT_PATH, PPOConfig.POLICY_EXPORT_PATH)
+
+def publish(model, store: ModelStore, name: str) -> int:
     """
-    Convert JSONL transitions into (state, action, reward, next_state) arrays.
+    New store version, plus the serving zip and NumPy export the API reloads.
+    Both are written to temporary files, given the same mtime and renamed npz
+    first: a registry watch tick in between sees the new npz (not older than
+    any zip) and never falls back to loading the SB3 zip, and torch, in the API.
     """
-    states, actions, rewards, next_states = [], [], [], []
-    for t in transitions:
-        states.append(list(t["state"].values()))
-        actions.append(t["action"])
-        rewards.append(t["reward"])
-        next_states.append(list(t["next_state"].values()))
-    return np.array(states, dtype=np.float32), np.array(actions), np.array(rewards), np.array(next_states, dtype=np.float32)
+    from rl_model.scripts.export_model import export_numpy_policy
+
+    version = store.save_version(model, name)
+    zip_tmp = PPOConfig.MODEL_EXPORT_PATH.replace(".zip", ".publishing.zip")
+    npz_tmp = PPOConfig.POLICY_EXPORT_PATH.replace(".npz", ".publishing.npz")
+    save_model(model, zip_tmp)
+    export_numpy_policy(model, npz_tmp)
+    published_at = time.time()
+    for path in (zip_tmp, npz_tmp):
+        os.utime(path, (published_at, published_at))
+    os.replace(npz_tmp, PPOConfig.POLICY_EXPORT_PATH)
+    os.replace(zip_tmp, PPOConfig.MODEL_EXPORT_PATH)
+    return version
+
+def train_incremental(logger: RolloutLogger, args):
+    from rl_model.env.student_simulator import SimulatorParams
+    from rl_model.training.parallel_env import make_training_env
+    from rl_model.training.callbacks import TrainingCallback
+
+    # Versions, metadata and the callback's checkpoints all live in CHECKPOINT_DIR
+    name = os.path.basename(PPOConfig.MODEL_PATH).replace(".zip", "")
+    store = ModelStore(PPOConfig.CHECKPOINT_DIR)
+    metadata = store.load_metadata(name)
+    high_water = metadata.get(HIGH_WATER_KEY, float("-inf"))
+
+    data = logger.load_arrays(COLUMNS)
+    timestamp = np.asarray(data["timestamp"])
+    new_rows, replay_rows = select_rows(timestamp, high_water, args.replay_ratio, PPOConfig.SEED + len(timestamp))
+    if len(new_rows) < args.min_new:
+        print(f"{len(new_rows)} new transitions since the last model (need {args.min_new}). Nothing to do.")
+        return
+
+    train_rows, gate_rows = holdout_rows(new_rows, timestamp, args.gate_holdout)
+    rows = np.concatenate([replay_rows, train_rows])
+    batch = {column: np.asarray(values[rows]) for column, values in data.items()}
+    gate_data = {column: np.asarray(values[gate_rows]) for column, values in data.items()}
+    print(
+        f"Training on {len(train_rows)} new + {len(replay_rows)} replayed transitions, "
+        f"{len(gate_rows)} latest held out for the gate (watermark {high_water})"
+    )
+
+    env = make_training_env(args.workers, args.envs_per_worker, params=SimulatorParams.fit(batch), seed=PPOConfig.SEED)
+    # The gate compares against what serving runs; training continues from the last published version
+    current = served_policy()
+    checkpoint = store.latest_checkpoint(name)
+    if checkpoint is None and os.path.exists(PPOConfig.MODEL_EXPORT_PATH):
+        checkpoint = PPOConfig.MODEL_EXPORT_PATH
+    if checkpoint:
+        print(f"Warm-starting from {checkpoint}")
+        model = load_model(checkpoint, env=env)
+    else:
+        print("No checkpoint found; starting a new model")
+        model = load_model(None, env=env)
+
+    callback = TrainingCallback(save_freq=PPOConfig.CHECKPOINT_FREQ, checkpoint_dir=PPOConfig.CHECKPOINT_DIR)
+    started = time.perf_counter()
+    try:
+        model.learn(total_timesteps=args.timesteps, callback=callback, reset_num_timesteps=False)
+    finally:
+        callback.close()
+        env.close()
+    print(f"Trained {args.timesteps} timesteps in {time.perf_counter() - started:.1f}s")
+
+    candidate_value = offline_value(model, gate_data)["dr"]
+    current_value = offline_value(current, gate_data)["dr"] if current is not None else None
+    if current_value is not None:
+        print(f"Doubly-robust value on held-out transitions: candidate {candidate_value:.4f}, current {current_value:.4f}")
+        if candidate_value < current_value + args.min_improvement:
+            print("Candidate does not beat the current model; not published.")
+            return
+
+    version = publish(model, store, name)
+    new_high_water = float(timestamp[new_rows].max())
+    metadata.update({
+        HIGH_WATER_KEY: new_high_water,
+        "version": version,
+        "published_at": time.time(),
+        "dr_value": candidate_value,
+    })
+    store.save_metadata(name, metadata)
+    print(f"Published {store.version_name(name, version)}; watermark advanced to {new_high_water}")
 
 def main():
-    logger = RolloutLogger()
-    transitions = logger.read_all_transitions()
+    parser = argparse.ArgumentParser(description="Offline PPO training on logged transitions")
+    parser.add_argument("--log-dir", default="rollouts")
+    parser.add_argument("--incremental", action="store_true", help="Train on new transitions only, warm-started")
+    parser.add_argument("--timesteps", type=int, default=None)
+    parser.add_argument("--replay-ratio", type=float, default=PPOConfig.REPLAY_RATIO)
+    parser.add_argument("--min-new", type=int, default=PPOConfig.MIN_NEW_TRANSITIONS)
+    parser.add_argument("--min-improvement", type=float, default=PPOConfig.MIN_IMPROVEMENT)
+    parser.add_argument("--gate-holdout", type=float, default=PPOConfig.GATE_HOLDOUT,
+                        help="Latest share of new transitions held out for the publish gate")
+    parser.add_argument("--workers", type=int, default=PPOConfig.NUM_WORKERS)
+    parser.add_argument("--envs-per-worker", type=int, default=PPOConfig.ENVS_PER_WORKER)
+    args = parser.parse_args()
+
+    logger = RolloutLogger(args.log_dir)
+    if args.incremental:
+        args.timesteps = args.timesteps or PPOConfig.INCREMENTAL_TIMESTEPS
+        train_incremental(logger, args)
+        return
+
+    data = logger.load_arrays(["state", "action", "reward", "next_state"])
 
-    if not transitions:
+    if not len(data["action"]):
         print("No transitions found. Exiting.")
         return
 
     # Build dataset
-    states, actions, rewards, next_states = build_dataset(transitions)
+    states, actions, rewards, next_states = build_dataset(data)
 
     # Load PPO model
     model = load_model(PPOConfig.MODEL_PATH)
 
     # Offline training loop (simplified)
-    model.learn(total_timesteps=PPOConfig.TOTAL_TIMESTEPS)
+    model.learn(total_timesteps=args.timesteps or PPOConfig.TOTAL_TIMESTEPS)
 
     # Save updated model
     save_path = PPOConfig.MODEL_PATH.replace(".zip", "_retrained.zip")
@@ -2,25 +2,199 @@
 """
 Custom callback for PPO training:
 - Logs episode rewards
-- Saves model checkpoints periodically
+- Saves model checkpoints periodically, without stalling training
+
+Every save_freq environment timesteps (summed over all envs) the model is
+snapshotted in memory (serialized attributes + cloned weights) and the zip is
+written by a background thread. Checkpoints go to checkpoint_dir, named and
+listed in its manifest.json per training run (run_id): retention keeps the
+run's keep_top_k best by score (mean recent episode reward unless a score_fn
+is given) plus its latest, and never compares with or deletes other runs'
+checkpoints, whose scores come from other simulator fits. The manifest's
+best/latest refer to the most recent run, for
+ModelStore(PPOConfig.CHECKPOINT_DIR).best_checkpoint().
+Call close() when training ends, including on error, to write what is still
+queued and stop the writer thread.
 """
+import copy
+import io
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import zipfile
 
+import numpy as np
 from stable_baselines3.common.callbacks import BaseCallback
-from rl_model.model.policy_loader import save_model
 from rl_model.config.ppo_config import PPOConfig
 
+CHECKPOINT_MANIFEST = "manifest.json"
+
+
+def snapshot_model(model) -> tuple:
+    """
+    In-memory copy of what PPO.save writes: (serialized data, {state dict name: cloned state dict}).
+    Must run on the training thread; the result is safe to write from another thread.
+    """
+    from stable_baselines3.common.save_util import data_to_json
+
+    data = model.__dict__.copy()
+    exclude = set(model._excluded_save_params())
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    for torch_var in state_dicts_names + torch_variable_names:
+        exclude.add(torch_var.split(".")[0])
+    for param_name in exclude:
+        data.pop(param_name, None)
+    params = {name: copy.deepcopy(state_dict) for name, state_dict in model.get_parameters().items()}
+    return data_to_json(data), params
+
+
+def write_snapshot(path: str, serialized_data: str, params: dict):
+    """Write a snapshot as an SB3 zip (loadable with PPO.load); atomic via rename."""
+    import torch as th
+    import stable_baselines3 as sb3
+
+    tmp_path = path + ".tmp"
+    with zipfile.ZipFile(tmp_path, mode="w") as archive:
+        archive.writestr("data", serialized_data)
+        for file_name, state_dict in params.items():
+            buffer = io.BytesIO()
+            th.save(state_dict, buffer)
+            archive.writestr(file_name + ".pth", buffer.getvalue())
+        archive.writestr("_stable_baselines3_version", sb3.__version__)
+    os.replace(tmp_path, path)
+
+
 class TrainingCallback(BaseCallback):
-    def __init__(self, save_freq=10000, verbose=1):
+    def __init__(
+        self,
+        save_freq=10000,
+        verbose=1,
+        checkpoint_dir: str = PPOConfig.CHECKPOINT_DIR,
+        keep_top_k: int = PPOConfig.KEEP_TOP_K,
+        score_fn=None,
+        run_id: str = None
+    ):
         super().__init__(verbose)
+        self.run_id = run_id or f"{time.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:6]}"
         self.save_freq = save_freq
         self.step_count = 0
+        self._last_save_timesteps = 0
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_top_k = keep_top_k
+        self.score_fn = score_fn
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+        self._queue = queue.Queue()
+        self._writer = None
+
+    # -----------------------------
+    # Training thread
+    # -----------------------------
+    def _score(self):
+        if self.score_fn is not None:
+            return float(self.score_fn(self.model))
+        episodes = self.model.ep_info_buffer
+        if not episodes:
+            return None
+        return float(np.mean([episode["r"] for episode in episodes]))
+
+    def _on_training_start(self):
+        # Warm-started models keep counting from their saved num_timesteps
+        self._last_save_timesteps = self.num_timesteps
 
     def _on_step(self) -> bool:
         self.step_count += 1
 
-        if self.step_count % self.save_freq == 0:
-            save_path = PPOConfig.MODEL_PATH.replace(".zip", f"_step{self.step_count}.zip")
-            save_model(self.model, save_path)
+        if self.num_timesteps - self._last_save_timesteps >= self.save_freq:
+            self._last_save_timesteps = self.num_timesteps
+            started = time.perf_counter()
+            serialized_data, params = snapshot_model(self.model)
+            entry = {
+                "name": f"{os.path.basename(PPOConfig.MODEL_PATH).replace('.zip', '')}_{self.run_id}_t{self.model.num_timesteps}.zip",
+                "run": self.run_id,
+                "step": self.step_count,
+                "timesteps": int(self.model.num_timesteps),
+                "score": self._score(),
+            }
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True, name="checkpoint-writer")
+                self._writer.start()
+            self._queue.put((entry, serialized_data, params))
             if self.verbose > 0:
-                print(f"[Callback] Model checkpoint saved at step {self.step_count}: {save_path}")
+                print(
+                    f"[Callback] Checkpoint at step {self.step_count} queued "
+                    f"(score={entry['score']}, snapshot {(time.perf_counter() - started) * 1000:.0f} ms)"
+                )
         return True
+
+    def _on_training_end(self):
+        self.wait()
+
+    def wait(self):
+        """Block until every queued checkpoint has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write every queued checkpoint, then stop the writer thread."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            entry, serialized_data, params = item
+            try:
+                write_snapshot(os.path.join(self.checkpoint_dir, entry["name"]), serialized_data, params)
+                entry["saved_at"] = time.time()
+                self._retain(entry)
+                if self.verbose > 0:
+                    print(f"[Callback] Model checkpoint saved at step {entry['step']}: {entry['name']}")
+            except Exception as e:
+                print(f"[Callback] Checkpoint at step {entry['step']} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _read_manifest(self) -> dict:
+        path = os.path.join(self.checkpoint_dir, CHECKPOINT_MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {"checkpoints": [], "best": None, "latest": None}
+
+    def _retain(self, entry: dict):
+        """Keep this run's top-K checkpoints by score plus its latest; rewrite the manifest."""
+        # Re-read so entries added by other runs since init are kept
+        listed = self._read_manifest()["checkpoints"]
+        others = [c for c in listed if c.get("run") != self.run_id]
+        checkpoints = [c for c in listed if c.get("run") == self.run_id and c["name"] != entry["name"]] + [entry]
+        scored = sorted((c for c in checkpoints if c["score"] is not None), key=lambda c: c["score"], reverse=True)
+        keep = {c["name"] for c in scored[:self.keep_top_k]} | {entry["name"]}
+
+        for checkpoint in checkpoints:
+            if checkpoint["name"] not in keep:
+                path = os.path.join(self.checkpoint_dir, checkpoint["name"])
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.manifest = {
+            "run": self.run_id,
+            "checkpoints": others + [c for c in checkpoints if c["name"] in keep],
+            "best": next((c["name"] for c in scored if c["name"] in keep), None),
+            "latest": entry["name"],
+        }
+        path = os.path.join(self.checkpoint_dir, CHECKPOINT_MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,154 @@
+# rl_model/training/dataset.py
+"""
+Episode dataset for offline training.
+
+Logged transitions are ordered by (student, timestamp) and split into
+per-student episodes of at most EnvConfig.MAX_STEPS_PER_EPISODE steps
+(transitions without a student id are single-step episodes). Discounted
+returns and GAE advantages are then computed backwards through the episodes
+one step index at a time, vectorized across all episodes, so the Python loop
+runs at most MAX_STEPS_PER_EPISODE times whatever the dataset size.
+
+Episodes are cut at the step limit rather than at a terminal state (students
+keep learning), so the last step of every episode bootstraps from the value of
+its next_state. Without a value function the values are zero: advantages are
+then the lambda-discounted rewards and returns the discounted rewards.
+
+The result is cached as an .npz next to the transition store and reused while
+the store's segments, GAMMA and GAE_LAMBDA are unchanged.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from rl_model.config.env_config import EnvConfig
+from rl_model.config.ppo_config import PPOConfig
+
+CACHE_FILE = "episodes_cache.npz"
+COLUMNS = ["state", "action", "reward", "next_state", "student", "timestamp"]
+
+
+def segment_episodes(student: np.ndarray, timestamp: np.ndarray, max_steps: int = EnvConfig.MAX_STEPS_PER_EPISODE):
+    """
+    Returns (order, episode, step): the row order sorted by (student, timestamp),
+    and for each sorted row its episode id and step index within the episode.
+    """
+    student = np.asarray(student, dtype=np.int64)
+    order = np.lexsort((np.asarray(timestamp), student))
+    student = student[order]
+    n = len(order)
+    rows = np.arange(n)
+
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = student[1:] != student[:-1]
+    new_run |= student < 0
+    run_start = np.maximum.accumulate(np.where(new_run, rows, 0))
+
+    starts = new_run | ((rows - run_start) % max_steps == 0)
+    episode = np.cumsum(starts) - 1
+    step = rows - np.flatnonzero(starts)[episode]
+    return order, episode, step
+
+
+def compute_returns_and_advantages(
+    rewards: np.ndarray,
+    episode: np.ndarray,
+    step: np.ndarray,
+    values: np.ndarray = None,
+    next_values: np.ndarray = None,
+    gamma: float = PPOConfig.GAMMA,
+    gae_lambda: float = PPOConfig.GAE_LAMBDA
+):
+    """
+    Discounted returns and GAE advantages for rows grouped by episode (rows of an
+    episode contiguous and in step order). Returns (returns, advantages, value_targets).
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    n = len(rewards)
+    values = np.zeros(n) if values is None else np.asarray(values, dtype=np.float64)
+    next_values = np.zeros(n) if next_values is None else np.asarray(next_values, dtype=np.float64)
+
+    # Row i continues into row i + 1 when both belong to the same episode
+    has_next = np.zeros(n, dtype=bool)
+    has_next[:-1] = episode[1:] == episode[:-1]
+    deltas = rewards + gamma * next_values - values
+
+    returns = np.zeros(n)
+    advantages = np.zeros(n)
+    by_step = np.argsort(step, kind="stable")
+    bounds = np.searchsorted(step[by_step], np.arange(step.max() + 2 if n else 1))
+    for t in range(len(bounds) - 2, -1, -1):
+        idx = by_step[bounds[t]:bounds[t + 1]]
+        cont = has_next[idx]
+        nxt = np.minimum(idx + 1, n - 1)
+        returns[idx] = rewards[idx] + gamma * np.where(cont, returns[nxt], next_values[idx])
+        advantages[idx] = deltas[idx] + gamma * gae_lambda * np.where(cont, advantages[nxt], 0.0)
+    return returns, advantages, advantages + values
+
+
+def build_episode_dataset(data: dict, gamma: float = PPOConfig.GAMMA, gae_lambda: float = PPOConfig.GAE_LAMBDA,
+                          value_fn=None) -> dict:
+    """
+    Columnar transitions (TransitionStore.load()) -> episode-ordered arrays with
+    episode, step, done, returns, advantages and value_targets columns.
+    value_fn(states (N, 6) float32) -> (N,) values; optional.
+    """
+    order, episode, step = segment_episodes(data["student"], data["timestamp"])
+    dataset = {column: np.asarray(data[column])[order] for column in COLUMNS}
+
+    values = next_values = None
+    if value_fn is not None:
+        values = value_fn(dataset["state"])
+        next_values = value_fn(dataset["next_state"])
+    returns, advantages, value_targets = compute_returns_and_advantages(
+        dataset["reward"], episode, step, values, next_values, gamma, gae_lambda
+    )
+
+    done = np.ones(len(order), dtype=bool)
+    done[:-1] = episode[1:] != episode[:-1]
+    dataset.update({
+        "episode": episode,
+        "step": step,
+        "done": done,
+        "returns": returns.astype(np.float32),
+        "advantages": advantages.astype(np.float32),
+        "value_targets": value_targets.astype(np.float32),
+    })
+    return dataset
+
+
+def _fingerprint(store, gamma: float, gae_lambda: float, value_tag: str) -> str:
+    key = json.dumps({
+        "segments": store.manifest["segments"],
+        "gamma": gamma,
+        "gae_lambda": gae_lambda,
+        "max_steps": EnvConfig.MAX_STEPS_PER_EPISODE,
+        "value_tag": value_tag,
+    }, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def load_episode_dataset(store, gamma: float = PPOConfig.GAMMA, gae_lambda: float = PPOConfig.GAE_LAMBDA,
+                         value_fn=None, value_tag: str = None) -> dict:
+    """
+    build_episode_dataset over a TransitionStore, cached in its directory.
+    With a value_fn the result is only cached when value_tag (e.g. a model
+    version) identifies the value function.
+    """
+    cacheable = value_fn is None or value_tag is not None
+    path = os.path.join(store.root, CACHE_FILE)
+    fingerprint = _fingerprint(store, gamma, gae_lambda, value_tag)
+
+    if cacheable and os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached["fingerprint"]) == fingerprint:
+                return {key: cached[key] for key in cached.files if key != "fingerprint"}
+
+    dataset = build_episode_dataset(store.load(COLUMNS), gamma, gae_lambda, value_fn)
+    if cacheable:
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, fingerprint=fingerprint, **dataset)
+        os.replace(tmp_path, path)
+    return dataset
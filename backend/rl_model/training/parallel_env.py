@@ -0,0 +1,164 @@
+# rl_model/training/parallel_env.py
+"""
+Multi-process sharding of the simulated-student environment.
+
+Each worker process owns a VecStudentEnv with `envs_per_worker` students and
+steps it on request, so one PPO rollout step fans out across cores
+(SubprocVecEnv-style, but one pipe round trip per worker rather than per env).
+Worker i is seeded with seed + i, so runs are reproducible for a given layout.
+"""
+import multiprocessing as mp
+import time
+
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnv
+
+from rl_model.env.student_simulator import SimulatorParams
+from rl_model.env.vec_student_env import VecStudentEnv
+
+
+def _worker(remote, parent_remote, num_envs: int, params: SimulatorParams, seed: int, normalize_obs: bool, apply_mask: bool):
+    parent_remote.close()
+    env = VecStudentEnv(num_envs, params=params, seed=seed, normalize_obs=normalize_obs, apply_mask=apply_mask)
+    env_steps = 0
+    busy_seconds = 0.0
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                started = time.perf_counter()
+                result = env.step(data)
+                busy_seconds += time.perf_counter() - started
+                env_steps += num_envs
+                remote.send(result)
+            elif cmd == "reset":
+                if data is not None:
+                    env.seed(data)
+                remote.send(env.reset())
+            elif cmd == "stats":
+                remote.send({"env_steps": env_steps, "busy_seconds": busy_seconds})
+            elif cmd == "close":
+                remote.close()
+                break
+            else:
+                raise NotImplementedError(f"Unknown command '{cmd}'")
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardedVecEnv(VecEnv):
+    """
+    num_workers processes x envs_per_worker simulated students, exposed as one VecEnv.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        envs_per_worker: int,
+        params: SimulatorParams = None,
+        seed: int = 0,
+        normalize_obs: bool = False,
+        apply_mask: bool = True,
+        start_method: str = None
+    ):
+        self.render_mode = None
+        self.num_workers = num_workers
+        self.envs_per_worker = envs_per_worker
+        self.base_seed = seed
+        self.waiting = False
+        self.closed = False
+
+        if start_method is None:
+            # Same choice as SB3's SubprocVecEnv: fork is not thread-safe
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, work_remotes = zip(*[ctx.Pipe() for _ in range(num_workers)])
+        self.processes = []
+        for i, (work_remote, remote) in enumerate(zip(work_remotes, self.remotes)):
+            args = (work_remote, remote, envs_per_worker, params, seed + i, normalize_obs, apply_mask)
+            process = ctx.Process(target=_worker, args=args, daemon=True, name=f"student-env-{i}")
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        # Spaces are identical in every worker; build them locally
+        spaces_env = VecStudentEnv(1, params=params, normalize_obs=normalize_obs)
+        super().__init__(num_workers * envs_per_worker, spaces_env.observation_space, spaces_env.action_space)
+        self._started_at = time.perf_counter()
+
+    def reset(self):
+        seeds = [None] * self.num_workers
+        if self._seeds[0] is not None:
+            seeds = [self._seeds[0] + i for i in range(self.num_workers)]
+        self._reset_seeds()
+        for remote, seed in zip(self.remotes, seeds):
+            remote.send(("reset", seed))
+        return np.concatenate([remote.recv() for remote in self.remotes])
+
+    def step_async(self, actions: np.ndarray):
+        actions = np.asarray(actions).reshape(-1)
+        for i, remote in enumerate(self.remotes):
+            start = i * self.envs_per_worker
+            remote.send(("step", actions[start:start + self.envs_per_worker]))
+        self.waiting = True
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        obs, rewards, dones, infos = zip(*results)
+        return (
+            np.concatenate(obs),
+            np.concatenate(rewards),
+            np.concatenate(dones),
+            [info for worker_infos in infos for info in worker_infos]
+        )
+
+    def worker_stats(self) -> list:
+        """Per-worker env steps, busy time and steps/sec (busy and wall-clock)."""
+        for remote in self.remotes:
+            remote.send(("stats", None))
+        elapsed = time.perf_counter() - self._started_at
+        stats = []
+        for i, remote in enumerate(self.remotes):
+            s = remote.recv()
+            stats.append({
+                "worker": i,
+                "env_steps": s["env_steps"],
+                "busy_seconds": s["busy_seconds"],
+                "steps_per_sec": s["env_steps"] / s["busy_seconds"] if s["busy_seconds"] else 0.0,
+                "wall_steps_per_sec": s["env_steps"] / elapsed if elapsed else 0.0,
+            })
+        return stats
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def get_attr(self, attr_name: str, indices=None):
+        return [getattr(self, attr_name)] * len(list(self._get_indices(indices)))
+
+    def set_attr(self, attr_name: str, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(list(self._get_indices(indices)))
+
+
+def make_training_env(num_workers: int, envs_per_worker: int, params: SimulatorParams = None, seed: int = 0):
+    """VecStudentEnv in-process for one worker, ShardedVecEnv across processes otherwise."""
+    if num_workers <= 1:
+        return VecStudentEnv(envs_per_worker, params=params, seed=seed)
+    return ShardedVecEnv(num_workers, envs_per_worker, params=params, seed=seed)
@@ -1,55 +1,138 @@
 # rl_model/training/trainer.py
 """
 Offline PPO training using real student transitions from RolloutLogger.
+The transitions fit the dynamics of the vectorized student simulator
+(rl_model.env.VecStudentEnv), which PPO then trains against. For a new model,
+the critic is first fitted to the logged per-student discounted returns
+(PPOConfig.GAMMA), so early advantages use a real baseline instead of an
+untrained value head.
+
+Usage:
+    python -m rl_model.training.trainer --workers 32 --envs-per-worker 64
 """
+import argparse
+import os
+import time
 import numpy as np
 from stable_baselines3 import PPO
 from rl_model.persistence.rollout_logger import RolloutLogger
+from rl_model.persistence.model_store import ModelStore
 from rl_model.model.policy_loader import load_model, save_model
 from rl_model.config.ppo_config import PPOConfig
 from rl_model.training.callbacks import TrainingCallback
-from rl_model.utils.normalizer import normalize_state
+from rl_model.utils.normalizer import normalize_states
+from rl_model.env.student_simulator import SimulatorParams
+from rl_model.training.parallel_env import make_training_env
+from rl_model.training.dataset import load_episode_dataset
+
+def prepare_dataset(dataset: dict, normalize_obs: bool = False):
+    """
+    Convert an episode dataset (rl_model.training.dataset) into observations,
+    actions, discounted returns and GAE advantages. Observations match the
+    training env: raw states, or normalized ones if normalize_obs.
+    """
+    states = np.asarray(dataset["state"], dtype=np.float32)
+    if normalize_obs:
+        states = normalize_states(states)
+    actions = np.asarray(dataset["action"], dtype=np.int64)
+    returns = np.asarray(dataset["returns"], dtype=np.float32)
+    advantages = np.asarray(dataset["advantages"], dtype=np.float32)
+    return states, actions, returns, advantages
 
-def prepare_dataset(transitions):
+def pretrain_value(model, states: np.ndarray, returns: np.ndarray,
+                   epochs: int = PPOConfig.VALUE_PRETRAIN_EPOCHS, batch_size: int = 1024) -> float:
     """
-    Convert list of transitions into states, actions, rewards.
-    Normalize states for PPO.
+    Regress the PPO critic on logged discounted returns (MSE, the policy's own
+    optimizer). Only the value path receives gradients. Returns the final epoch loss.
     """
-    states, actions, rewards = [], [], []
+    import torch as th
+    import torch.nn.functional as F
 
-    for t in transitions:
-        s = normalize_state(t["state"])
-        ns = normalize_state(t["next_state"])
-        states.append(s)
-        actions.append(t["action"])
-        rewards.append(t["reward"])
-    
-    return np.array(states, dtype=np.float32), np.array(actions), np.array(rewards, dtype=np.float32)
+    policy = model.policy
+    obs = th.as_tensor(states, dtype=th.float32, device=policy.device)
+    targets = th.as_tensor(returns, dtype=th.float32, device=policy.device)
+    rng = np.random.default_rng(PPOConfig.SEED)
+    policy.set_training_mode(True)
+    epoch_loss = 0.0
+    for epoch in range(epochs):
+        order = rng.permutation(len(states))
+        losses = []
+        for start in range(0, len(order), batch_size):
+            idx = th.as_tensor(order[start:start + batch_size], device=policy.device)
+            loss = F.mse_loss(policy.predict_values(obs[idx]).flatten(), targets[idx])
+            policy.optimizer.zero_grad()
+            loss.backward()
+            th.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+            policy.optimizer.step()
+            losses.append(loss.item())
+        epoch_loss = float(np.mean(losses))
+        print(f"Value pretraining epoch {epoch + 1}/{epochs}: MSE {epoch_loss:.4f}")
+    policy.set_training_mode(False)
+    return epoch_loss
+
+def report_throughput(env, timesteps: int, seconds: float):
+    print(f"Collected {timesteps} env steps in {seconds:.1f}s ({timesteps / seconds:.0f} steps/sec overall)")
+    if hasattr(env, "worker_stats"):
+        for stats in env.worker_stats():
+            print(
+                f"  worker {stats['worker']}: {stats['env_steps']} steps, "
+                f"{stats['steps_per_sec']:.0f} steps/sec busy, {stats['wall_steps_per_sec']:.0f} steps/sec wall"
+            )
 
 def main():
+    parser = argparse.ArgumentParser(description="Train PPO on simulated students fitted to logged transitions")
+    parser.add_argument("--workers", type=int, default=PPOConfig.NUM_WORKERS, help="Environment worker processes")
+    parser.add_argument("--envs-per-worker", type=int, default=PPOConfig.ENVS_PER_WORKER)
+    parser.add_argument("--timesteps", type=int, default=PPOConfig.TOTAL_TIMESTEPS)
+    args = parser.parse_args()
+
     logger = RolloutLogger()
-    transitions = logger.read_all_transitions()
+    logger.flush()
+    data = load_episode_dataset(logger.store)
 
-    if not transitions:
+    if not len(data["action"]):
         print("No transitions found. Exiting trainer.")
         return
 
-    states, actions, rewards = prepare_dataset(transitions)
-    print(f"Loaded {len(states)} transitions for training.")
+    states, actions, returns, advantages = prepare_dataset(data)
+    n_episodes = int(data["episode"][-1]) + 1
+    print(f"Loaded {len(states)} transitions in {n_episodes} student episodes for training.")
+    print(f"Mean discounted return {returns.mean():.3f} (gamma={PPOConfig.GAMMA}), mean GAE advantage {advantages.mean():.3f}")
+
+    # Simulated students following the logged dynamics
+    params = SimulatorParams.fit(data)
+    env = make_training_env(args.workers, args.envs_per_worker, params=params, seed=PPOConfig.SEED)
+    print(f"Simulating {env.num_envs} students across {args.workers} worker(s)")
 
-    # Load or initialize PPO model
-    model = load_model(PPOConfig.MODEL_PATH)
+    # Warm-start from the best checkpoint, else the saved model, else initialize a new one
+    checkpoint = ModelStore(PPOConfig.CHECKPOINT_DIR).best_checkpoint()
+    model_file = PPOConfig.MODEL_PATH if PPOConfig.MODEL_PATH.endswith(".zip") else PPOConfig.MODEL_PATH + ".zip"
+    if checkpoint is None and os.path.exists(model_file):
+        checkpoint = PPOConfig.MODEL_PATH
+    if checkpoint:
+        print(f"Warm-starting from {checkpoint}")
+        model = load_model(checkpoint, env=env)
+    else:
+        model = load_model(None, env=env)
+        # Warm-start the new critic on the logged discounted returns
+        pretrain_value(model, states, returns)
 
     # Define callback for logging & checkpoints
-    callback = TrainingCallback(save_freq=PPOConfig.CHECKPOINT_FREQ)
+    callback = TrainingCallback(save_freq=PPOConfig.CHECKPOINT_FREQ, checkpoint_dir=PPOConfig.CHECKPOINT_DIR)
 
     # Offline training (learning from transitions)
     print("Starting PPO training...")
-    model.learn(
-        total_timesteps=PPOConfig.TOTAL_TIMESTEPS,
-        callback=callback,
-        reset_num_timesteps=False
-    )
+    started = time.perf_counter()
+    try:
+        model.learn(
+            total_timesteps=args.timesteps,
+            callback=callback,
+            reset_num_timesteps=False
+        )
+        report_throughput(env, args.timesteps, time.perf_counter() - started)
+    finally:
+        callback.close()
+        env.close()
 
     # Save final trained model
     save_model(model, PPOConfig.MODEL_PATH.replace(".zip", "_trained.zip"))
@@ -1,4 +1,4 @@
 # rl_model/utils/__init__.py
 
-from .normalizer import normalize_state
+from .normalizer import normalize_state, normalize_states
 from .validators import validate_state
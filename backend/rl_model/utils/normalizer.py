@@ -15,16 +15,36 @@ STATE_RANGES = {
     "recent_improvement": (-1.0, 1.0),
 }
 
+# Column order of state matrices, plus precomputed offset/scale vectors
+STATE_KEYS = list(STATE_RANGES)
+STATE_LOW = np.array([r[0] for r in STATE_RANGES.values()], dtype=np.float64)
+STATE_HIGH = np.array([r[1] for r in STATE_RANGES.values()], dtype=np.float64)
+STATE_SCALE = 1.0 / (STATE_HIGH - STATE_LOW)
+
+
+def state_matrix(states) -> np.ndarray:
+    """
+    (N, 6) float64 matrix from an (N, 6) array or a list of state dicts
+    (missing keys default to 0.0).
+    """
+    if isinstance(states, np.ndarray):
+        return states.astype(np.float64, copy=False).reshape(-1, len(STATE_KEYS))
+    return np.array(
+        [[state.get(key, 0.0) for key in STATE_KEYS] for state in states],
+        dtype=np.float64
+    ).reshape(-1, len(STATE_KEYS))
+
+
+def normalize_states(states) -> np.ndarray:
+    """
+    Normalize a batch of states ((N, 6) array or list of dicts) into a 0-1 range (N, 6) array.
+    """
+    matrix = state_matrix(states)
+    return ((np.clip(matrix, STATE_LOW, STATE_HIGH) - STATE_LOW) * STATE_SCALE).astype(np.float32)
+
+
 def normalize_state(state: dict) -> np.ndarray:
     """
     Normalize state dictionary into 0-1 range array.
     """
-    normalized = []
-    for key, (min_val, max_val) in STATE_RANGES.items():
-        value = state.get(key, 0.0)
-        # Clip to range
-        value = max(min_val, min(value, max_val))
-        # Normalize
-        norm_value = (value - min_val) / (max_val - min_val)
-        normalized.append(norm_value)
-    return np.array(normalized, dtype=np.float32)
+    return normalize_states([state])[0]
@@ -20,9 +20,15 @@ CREATE TABLE IF NOT EXISTS student_permissions (
         topic TEXT,
         outcome TEXT, -- "ADVANCE", "RETRY", "COMPLETE"
         reward_score FLOAT DEFAULT 0.0,
+        sync_key TEXT, -- Set by the backend outbox so a resent batch cannot duplicate rows
         created_at TIMESTAMPTZ DEFAULT NOW()
     );
 
+-- Required by the backend's idempotent history upsert (on_conflict = sync_key)
+ALTER TABLE performance_history ADD COLUMN IF NOT EXISTS sync_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS performance_history_sync_key
+    ON performance_history (sync_key);
+
 -- 3. RL States (Current Adaptive State per Student)
 CREATE TABLE IF NOT EXISTS rl_states (
     student_id TEXT PRIMARY KEY,
@@ -42,3 +48,20 @@ CREATE TABLE IF NOT EXISTS students (
     attempts INTEGER DEFAULT 0,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
+
+-- 5. Subtopic Mastery (Per Student/Chapter/Subtopic; NULL subtopic = chapter-level)
+CREATE TABLE IF NOT EXISTS subtopic_mastery (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    chapter TEXT NOT NULL,
+    subtopic TEXT,
+    accuracy FLOAT DEFAULT 0.0,
+    mastery FLOAT DEFAULT 0.0,
+    level INTEGER DEFAULT 0,
+    is_completed BOOLEAN DEFAULT FALSE,
+    last_action TEXT
+);
+
+-- Required by the backend's multi-row upsert (on_conflict = student_id,chapter,subtopic)
+CREATE UNIQUE INDEX IF NOT EXISTS subtopic_mastery_student_chapter_subtopic_key
+    ON subtopic_mastery (student_id, chapter, subtopic) NULLS NOT DISTINCT;
@@ -0,0 +1,49 @@
+import numpy as np
+
+from rl_model.training.dataset import compute_returns_and_advantages
+
+
+def scalar_returns_and_advantages(rewards, episode, values, next_values, gamma, gae_lambda):
+    """Reference: walk each episode backwards one row at a time."""
+    n = len(rewards)
+    returns = np.zeros(n)
+    advantages = np.zeros(n)
+    for i in range(n - 1, -1, -1):
+        delta = rewards[i] + gamma * next_values[i] - values[i]
+        if i + 1 < n and episode[i + 1] == episode[i]:
+            returns[i] = rewards[i] + gamma * returns[i + 1]
+            advantages[i] = delta + gamma * gae_lambda * advantages[i + 1]
+        else:
+            returns[i] = rewards[i] + gamma * next_values[i]
+            advantages[i] = delta
+    return returns, advantages
+
+
+def test_matches_scalar_reference():
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, 12, size=40)
+    episode = np.repeat(np.arange(len(lengths)), lengths)
+    step = np.concatenate([np.arange(n) for n in lengths])
+    n = len(episode)
+    rewards = rng.normal(size=n)
+    values = rng.normal(size=n)
+    next_values = rng.normal(size=n)
+
+    returns, advantages, value_targets = compute_returns_and_advantages(
+        rewards, episode, step, values, next_values, gamma=0.9, gae_lambda=0.8
+    )
+    expected_returns, expected_advantages = scalar_returns_and_advantages(
+        rewards, episode, values, next_values, 0.9, 0.8
+    )
+    np.testing.assert_allclose(returns, expected_returns)
+    np.testing.assert_allclose(advantages, expected_advantages)
+    np.testing.assert_allclose(value_targets, expected_advantages + values)
+
+
+def test_without_values_advantages_are_returns_when_lambda_is_one():
+    episode = np.array([0, 0, 0, 1, 1])
+    step = np.array([0, 1, 2, 0, 1])
+    rewards = np.array([1.0, 0.0, 2.0, 1.0, 1.0])
+    returns, advantages, _ = compute_returns_and_advantages(rewards, episode, step, gamma=0.5, gae_lambda=1.0)
+    np.testing.assert_allclose(returns, [1.5, 1.0, 2.0, 1.5, 1.0])
+    np.testing.assert_allclose(advantages, returns)
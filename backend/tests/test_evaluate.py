@@ -0,0 +1,47 @@
+import numpy as np
+
+from rl_model.config.env_config import EnvConfig
+from rl_model.scripts.evaluate import off_policy_estimates, one_hot
+
+
+def test_off_policy_estimates_known_case():
+    # Logged uniformly between actions 0 and 1; action 0 always earns 1, action 1 earns 0
+    actions = np.array([0, 1, 0, 1])
+    rewards = np.array([1.0, 0.0, 1.0, 0.0])
+    mu = np.zeros((4, EnvConfig.ACTIONS))
+    mu[:, :2] = 0.5
+    q = np.zeros((4, EnvConfig.ACTIONS))
+    q[:, 0] = 1.0
+    # Target policy always takes action 0: true value 1.0
+    pi = one_hot(np.zeros(4, dtype=np.int64))
+
+    estimates = off_policy_estimates(pi, mu, q, actions, rewards)
+    assert estimates["behavior"] == 0.5
+    assert estimates["is"] == 1.0
+    assert estimates["wis"] == 1.0
+    assert estimates["dm"] == 1.0
+    assert estimates["dr"] == 1.0
+    assert estimates["ess"] == 2.0
+    assert estimates["max_weight"] == 2.0
+
+
+def test_off_policy_estimates_on_policy_equals_behavior():
+    rng = np.random.default_rng(0)
+    n = 500
+    actions = rng.integers(0, EnvConfig.ACTIONS, size=n)
+    rewards = rng.random(n)
+    mu = np.full((n, EnvConfig.ACTIONS), 1.0 / EnvConfig.ACTIONS)
+
+    estimates = off_policy_estimates(mu, mu, np.zeros_like(mu), actions, rewards)
+    assert np.isclose(estimates["is"], rewards.mean())
+    assert np.isclose(estimates["wis"], rewards.mean())
+    assert np.isclose(estimates["ess"], n)
+
+
+def test_no_overlap_reports_nan_wis():
+    actions = np.array([1, 1])
+    mu = np.zeros((2, EnvConfig.ACTIONS))
+    mu[:, 1] = 1.0
+    estimates = off_policy_estimates(one_hot(np.array([0, 0])), mu, np.zeros_like(mu), actions, np.ones(2))
+    assert np.isnan(estimates["wis"])
+    assert estimates["ess"] == 0.0
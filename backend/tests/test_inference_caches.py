@@ -0,0 +1,53 @@
+import numpy as np
+
+from rl_model.inference.decision_cache import DecisionCache
+from rl_model.inference.lookup_policy import LookupPolicy
+from rl_model.utils.normalizer import STATE_LOW, STATE_HIGH
+
+
+def random_states(n, seed=0):
+    rng = np.random.default_rng(seed)
+    span = STATE_HIGH - STATE_LOW
+    # Includes states outside the grid on both sides
+    return (STATE_LOW - 0.1 * span + rng.random((n, len(STATE_LOW))) * 1.2 * span).astype(np.float32)
+
+
+def test_decision_cache_is_keyed_by_version():
+    cache = DecisionCache(max_entries=100, levels=10)
+    states = random_states(4)
+    actions, keys = cache.lookup("v1", states)
+    assert (actions == -1).all()
+
+    cache.store("v1", keys, [0, 1, 2, 3])
+    actions, _ = cache.lookup("v1", states)
+    assert actions.tolist() == [0, 1, 2, 3]
+    # Another model version never sees v1's decisions
+    actions, _ = cache.lookup("v2", states)
+    assert (actions == -1).all()
+
+    cache.clear()
+    actions, _ = cache.lookup("v1", states)
+    assert (actions == -1).all()
+
+
+def test_decision_cache_evicts_least_recently_used():
+    cache = DecisionCache(max_entries=2, levels=10)
+    states = random_states(3)
+    keys = cache.keys(states)
+    cache.store("v1", keys[:2], [1, 2])
+    cache.lookup("v1", states[:1])  # touch the first entry
+    cache.store("v1", keys[2:], [3])
+    actions, _ = cache.lookup("v1", states)
+    assert actions.tolist() == [1, -1, 3]
+
+
+def test_lookup_predict_matches_predict_one():
+    rng = np.random.default_rng(0)
+    levels = (3, 4, 5, 2, 3, 4)
+    policy = LookupPolicy(rng.integers(0, 6, size=levels), STATE_LOW, STATE_HIGH)
+    states = np.concatenate([random_states(2000), policy.grid_points()])
+
+    batch, _ = policy.predict(states)
+    single = [policy.predict_one(state) for state in states]
+    assert batch.tolist() == single
+    assert policy.predict(states[0])[0] == single[0]
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("supabase")
+
+from app.services import question_bank as qb  # noqa: E402
+
+KEY = ("learning_content", "Force", None, None)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = qb.QuestionBankCache(ttl_seconds=60, max_bytes=10 ** 6)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return [{"id": 1}]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(KEY, loader))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [[{"id": 1}]] * 20
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(qb.time, "monotonic", lambda: now[0])
+    cache = qb.QuestionBankCache(ttl_seconds=10, max_bytes=10 ** 6)
+    cache.put(KEY, [{"id": 1}])
+
+    now[0] += 9
+    assert cache.get(KEY) == [{"id": 1}]
+    now[0] += 2
+    assert cache.get(KEY) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_load_racing_invalidate_is_not_cached():
+    cache = qb.QuestionBankCache(ttl_seconds=60, max_bytes=10 ** 6)
+    started, release = threading.Event(), threading.Event()
+
+    def stale_loader():
+        started.set()
+        release.wait()
+        return [{"id": "old"}]
+
+    leader = threading.Thread(target=cache.get_or_load, args=(KEY, stale_loader))
+    leader.start()
+    started.wait()
+    cache.invalidate("Force")
+    # A miss after the invalidation starts its own load instead of joining the stale one
+    assert cache.get_or_load(KEY, lambda: [{"id": "new"}]) == [{"id": "new"}]
+    release.set()
+    leader.join()
+
+    assert cache.get(KEY) == [{"id": "new"}]
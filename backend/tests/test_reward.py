@@ -0,0 +1,31 @@
+import numpy as np
+
+from rl_model.env.reward import failure_streaks
+
+
+def loop_failure_streaks(correct, student, timestamp):
+    """Reference: walk each student's transitions in time order."""
+    streaks = np.zeros(len(correct), dtype=np.int64)
+    current = {}
+    for i in sorted(range(len(correct)), key=lambda i: (student[i], timestamp[i])):
+        key = student[i] if student[i] >= 0 else ("none", i)
+        current[key] = 0 if correct[i] else current.get(key, 0) + 1
+        streaks[i] = current[key]
+    return streaks
+
+
+def test_failure_streaks_single_student():
+    correct = np.array([1, 0, 0, 1, 0], dtype=bool)
+    student = np.zeros(5, dtype=np.int64)
+    timestamp = np.arange(5)
+    assert failure_streaks(correct, student, timestamp).tolist() == [0, 1, 2, 0, 1]
+
+
+def test_failure_streaks_matches_loop():
+    rng = np.random.default_rng(0)
+    n = 2000
+    correct = rng.random(n) < 0.4
+    student = rng.integers(-1, 20, size=n)
+    timestamp = rng.permutation(n)
+    expected = loop_failure_streaks(correct, student, timestamp)
+    np.testing.assert_array_equal(failure_streaks(correct, student, timestamp), expected)
@@ -0,0 +1,143 @@
+import time
+
+import pytest
+
+pytest.importorskip("supabase")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.core.database import Base  # noqa: E402
+from app.models.sync_outbox import SyncOutbox, SyncLease  # noqa: E402
+from app.services import sync_service  # noqa: E402
+
+
+class RowRejected(Exception):
+    """Like a PostgREST APIError for a constraint violation."""
+    code = "23505"
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[SyncOutbox.__table__, SyncLease.__table__])
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(sync_service, "SessionLocal", factory)
+    return factory
+
+
+def enqueue(factory, entries):
+    db = factory()
+    for student_id, row in entries:
+        sync_service.enqueue_sync(db, student_id, "performance_history", row)
+    db.commit()
+    db.close()
+
+
+def outbox(factory):
+    db = factory()
+    try:
+        return [(e.student_id, e.attempts, e.next_attempt_at) for e in db.query(SyncOutbox).order_by(SyncOutbox.id)]
+    finally:
+        db.close()
+
+
+def flusher_sending(calls, fail=None, **kwargs):
+    flusher = sync_service.OutboxFlusher(**kwargs)
+
+    def send(table_name, operation, on_conflict, rows):
+        calls.append([row["n"] for row in rows])
+        if fail:
+            fail(rows)
+
+    flusher._send = send
+    return flusher
+
+
+def reject_bad(rows):
+    if any(row.get("bad") for row in rows):
+        raise RowRejected("duplicate key")
+
+
+def test_bisect_backs_off_only_the_rejected_entry(session_factory):
+    enqueue(session_factory, [(f"s{i}", {"n": i, "bad": i == 5}) for i in range(8)])
+    calls = []
+    flusher = flusher_sending(calls, reject_bad, batch_size=100)
+
+    assert flusher.flush_once() == 8
+    assert calls[0] == list(range(8))
+    remaining = outbox(session_factory)
+    assert [(student, attempts) for student, attempts, _ in remaining] == [("s5", 1)]
+    assert remaining[0][2] > time.time()
+
+
+def test_student_waits_behind_its_backing_off_entry(session_factory):
+    enqueue(session_factory, [("a", {"n": 0, "bad": True}), ("a", {"n": 1}), ("b", {"n": 2})])
+    calls = []
+    flusher = flusher_sending(calls, reject_bad, batch_size=100)
+
+    flusher.flush_once()
+    # a's later entry is held back, b's is sent
+    assert [student for student, _, _ in outbox(session_factory)] == ["a", "a"]
+    calls.clear()
+    assert flusher.flush_once() == 0
+    assert calls == []
+
+
+def test_connection_error_backs_off_the_whole_batch_in_one_call(session_factory):
+    enqueue(session_factory, [(f"s{i}", {"n": i}) for i in range(8)])
+    calls = []
+
+    def down(rows):
+        raise ConnectionError("timed out")
+
+    flusher = flusher_sending(calls, down, batch_size=100)
+    assert flusher.flush_once() == 8
+    assert len(calls) == 1
+    assert all(attempts == 1 for _, attempts, _ in outbox(session_factory))
+
+
+def test_blocked_entries_do_not_starve_later_ones(session_factory):
+    enqueue(session_factory, [(f"s{i}", {"n": i}) for i in range(5)])
+    db = session_factory()
+    db.query(SyncOutbox).update({"next_attempt_at": time.time() + 60})
+    db.commit()
+    db.close()
+    enqueue(session_factory, [("t", {"n": 10})])
+
+    calls = []
+    assert flusher_sending(calls, batch_size=2).flush_once() == 1
+    assert calls == [[10]]
+
+
+def test_only_the_lease_holder_flushes(session_factory):
+    enqueue(session_factory, [("s", {"n": 0})])
+    db = session_factory()
+    db.add(SyncLease(name=sync_service.LEASE_NAME, holder="other", expires_at=time.time() + 60))
+    db.commit()
+    db.close()
+
+    calls = []
+    assert flusher_sending(calls).flush_once() == 0
+    assert calls == []
+
+
+def test_round_stops_when_the_lease_is_lost(session_factory):
+    enqueue(session_factory, [("s", {"n": 0})])
+    enqueue(session_factory, [("s", {"n": 1})])
+    db = session_factory()
+    db.query(SyncOutbox).filter(SyncOutbox.id == 2).update({"table_name": "rl_states"})
+    db.commit()
+    db.close()
+    calls = []
+
+    def lose_lease(rows):
+        db = session_factory()
+        db.query(SyncLease).update({"holder": "other", "expires_at": time.time() + 60})
+        db.commit()
+        db.close()
+
+    assert flusher_sending(calls, lose_lease).flush_once() == 1
+    assert calls == [[0]]
+    assert len(outbox(session_factory)) == 1
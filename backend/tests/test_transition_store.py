@@ -0,0 +1,58 @@
+import numpy as np
+
+from rl_model.persistence.transition_store import TransitionStore
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "states": rng.random((n, 6)).astype(np.float32),
+        "actions": rng.integers(0, 6, size=n),
+        "rewards": rng.random(n).astype(np.float32),
+        "next_states": rng.random((n, 6)).astype(np.float32),
+        "student_ids": [f"s{i % 3}" for i in range(n)],
+        "timestamps": np.arange(n, dtype=np.float64),
+    }
+
+
+def test_round_trip_across_segments(tmp_path):
+    rows = make_rows(10)
+    with TransitionStore(str(tmp_path), segment_rows=4) as store:
+        store.append_batch(**rows)
+
+    reopened = TransitionStore(str(tmp_path))
+    assert len(reopened) == 10
+    assert [s["rows"] for s in reopened.manifest["segments"]] == [4, 4, 2]
+    data = reopened.load()
+    np.testing.assert_array_equal(data["state"], rows["states"])
+    np.testing.assert_array_equal(data["action"], rows["actions"])
+    np.testing.assert_array_equal(data["next_state"], rows["next_states"])
+    np.testing.assert_array_equal(data["timestamp"], rows["timestamps"])
+    assert reopened.student_ids(data["student"]) == rows["student_ids"]
+
+
+def test_append_after_reopen_keeps_student_codes_and_meta(tmp_path):
+    with TransitionStore(str(tmp_path)) as store:
+        store.append_batch(**make_rows(3))
+        store.set_meta("high_water", 3)
+
+    store = TransitionStore(str(tmp_path))
+    assert store.get_meta("high_water") == 3
+    store.append([0.5] * 6, 1, 1.0, [0.6] * 6, student_id="s1", timestamp=100.0)
+    store.append([0.5] * 6, 2, 0.0, [0.6] * 6, student_id="new", timestamp=101.0)
+    # Buffered rows are not visible until flushed
+    assert len(TransitionStore(str(tmp_path))) == 3
+    store.flush()
+
+    reopened = TransitionStore(str(tmp_path))
+    data = reopened.load()
+    assert len(reopened) == 5
+    assert reopened.student_ids(data["student"]) == ["s0", "s1", "s2", "s1", "new"]
+    assert data["student"][1] == data["student"][3]
+    assert data["action"].tolist()[-2:] == [1, 2]
+
+
+def test_empty_store_loads_typed_columns(tmp_path):
+    data = TransitionStore(str(tmp_path)).load(["state", "action"])
+    assert data["state"].shape == (0, 6)
+    assert data["action"].dtype == np.int16